@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, status
+
+from ..core.config import get_settings
+from ..db.vector_index import describe_vector_index, rebuild_vector_index
+from ..services import answer_cache, embeddings, llm_client, reranker, vector_store_mmap
+from ..services.chunk_cache import chunk_cache
+from ..services.query_cache import cache_stats as query_cache_stats
+from ..services.rerank_cache import score_cache as rerank_score_cache
+
+settings = get_settings()
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+_rebuild_task: Optional[asyncio.Task] = None
+_store_rebuild_task: Optional[asyncio.Task] = None
+
+
+@router.get("/stats")
+async def stats() -> dict:
+    """Cache, inference-batching and LLM timing counters for this API process."""
+    stats = {
+        "query_cache": query_cache_stats(),
+        "answer_cache": answer_cache.stats(),
+        "chunk_cache": chunk_cache.stats(),
+        "rerank_score_cache": rerank_score_cache.stats(),
+        "rerank_cascade": reranker.cascade_stats(),
+        "batching": {
+            "embedder": embeddings.batcher_stats(),
+            "reranker": reranker.batcher_stats(),
+        },
+        "llm": llm_client.stats(),
+    }
+    if settings.vector_backend == "mmap":
+        stats["vector_store"] = vector_store_mmap.get_store().stats()
+    return stats
+
+
+@router.get("/vector-index")
+async def vector_index() -> dict:
+    """Current ANN index definition, size and build progress."""
+    info = await describe_vector_index()
+    info["rebuild_running"] = _rebuild_task is not None and not _rebuild_task.done()
+    return info
+
+
+@router.post("/vector-index/rebuild", status_code=status.HTTP_202_ACCEPTED)
+async def rebuild_vector_index_endpoint() -> dict:
+    """
+    Rebuild the ANN index with the current settings (CREATE INDEX CONCURRENTLY),
+    in the background. Poll GET /admin/vector-index for progress.
+    """
+    global _rebuild_task
+    if _rebuild_task is not None and not _rebuild_task.done():
+        raise HTTPException(status_code=409, detail="Vector index rebuild already running")
+
+    async def _run() -> None:
+        try:
+            await rebuild_vector_index()
+        except Exception:
+            logger.exception("Vector index rebuild failed")
+
+    _rebuild_task = asyncio.create_task(_run())
+    return {"status": "started"}
+
+
+@router.post("/vector-store/rebuild", status_code=status.HTTP_202_ACCEPTED)
+async def rebuild_vector_store_endpoint() -> dict:
+    """
+    Rewrite the memory-mapped vector store from chunk_embeddings (compacting
+    deleted rows), in the background. Only relevant with VECTOR_BACKEND=mmap.
+    """
+    global _store_rebuild_task
+    if _store_rebuild_task is not None and not _store_rebuild_task.done():
+        raise HTTPException(status_code=409, detail="Vector store rebuild already running")
+
+    async def _run() -> None:
+        try:
+            await vector_store_mmap.get_store().rebuild_from_db()
+        except Exception:
+            logger.exception("Vector store rebuild failed")
+
+    _store_rebuild_task = asyncio.create_task(_run())
+    return {"status": "started"}
@@ -1,13 +1,15 @@
+from typing import List
 from uuid import UUID
 
-import asyncio
-
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..schemas.documents import DocumentCreateResponse, DocumentStatusResponse
-from ..services import storage_s3
-from ..services.ingestion import ingest_document
+from ..schemas.documents import (
+    BulkUploadResponse,
+    DocumentCreateResponse,
+    DocumentStatusResponse,
+)
+from ..services import bulk_upload, ingestion, job_queue, storage_s3
 from ..db.session import get_session
 
 router = APIRouter()
@@ -21,19 +23,79 @@ router = APIRouter()
 async def upload_document(file: UploadFile = File(...)) -> DocumentCreateResponse:
     """
     Upload a document, store it in object storage,
-    create a document record, and synchronously kick off ingestion.
+    create a document record, and queue it for ingestion.
     """
     if not file.filename:
         raise HTTPException(status_code=400, detail="Filename is required")
 
     document = await storage_s3.create_document_and_upload(file)
 
-    # Phase 2: run ingestion asynchronously so large documents don't block the request.
-    # In production this should be a real worker/queue, but for local dev this is enough.
+    # Ingestion runs in separate worker processes (python -m app.worker) so it never
+    # competes with query serving for CPU; the job row survives API restarts.
     from ..db.models import DocumentStatus
 
-    if document.status != DocumentStatus.ready.value:
-        asyncio.create_task(ingest_document(document_id=document.id))
+    # A duplicate of a READY or superseded (RETIRED) document needs no ingestion.
+    if document.status not in (DocumentStatus.ready.value, DocumentStatus.retired.value):
+        await job_queue.enqueue_ingestion(document.id, size_bytes=file.size or 0)
+
+    return DocumentCreateResponse(id=document.id)
+
+
+@router.post(
+    "/bulk",
+    response_model=BulkUploadResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def upload_documents_bulk(files: List[UploadFile] = File(...)) -> BulkUploadResponse:
+    """
+    Upload many documents (zip/tar archives are expanded) in one request. New
+    files are queued for ingestion as one batch; duplicates return the existing id.
+    """
+    if any(not f.filename for f in files):
+        raise HTTPException(status_code=400, detail="Filename is required")
+    try:
+        return await bulk_upload.create_documents_bulk(files)
+    except bulk_upload.BulkUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post(
+    "/{document_id}/versions",
+    response_model=DocumentCreateResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def upload_document_version(
+    document_id: UUID,
+    file: UploadFile = File(...),
+    session: AsyncSession = Depends(get_session),
+) -> DocumentCreateResponse:
+    """
+    Upload a new version of a document. Ingestion reuses the chunks, embeddings
+    and index entries of unchanged parent chunks, then retires the old version.
+    """
+    from ..db import models
+
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="Filename is required")
+    previous = await session.get(models.Document, document_id)
+    if not previous:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if previous.status == models.DocumentStatus.retired.value:
+        raise HTTPException(status_code=409, detail="Document has been superseded")
+
+    document = await storage_s3.create_document_and_upload(file, supersedes_id=document_id)
+    if document.supersedes_id != document_id:
+        # The bytes match an existing document (possibly this one); that row isn't
+        # a version of document_id, so it must not be queued as one.
+        raise HTTPException(
+            status_code=409,
+            detail=f"File is identical to existing document {document.id}",
+        )
+    if document.status not in (
+        models.DocumentStatus.ready.value,
+        models.DocumentStatus.retired.value,
+    ):
+        await job_queue.enqueue_ingestion(document.id, size_bytes=file.size or 0)
 
     return DocumentCreateResponse(id=document.id)
 
@@ -53,5 +115,22 @@ async def get_document_status(
         id=document.id,
         filename=document.filename,
         status=document.status,
+        supersedes_id=document.supersedes_id,
         created_at=document.created_at,
     )
+
+
+@router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_document(
+    document_id: UUID, session: AsyncSession = Depends(get_session)
+) -> None:
+    """Delete a document, its chunks and its stored file."""
+    from ..db import models
+
+    document = await session.get(models.Document, document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if document.status == models.DocumentStatus.processing.value:
+        raise HTTPException(status_code=409, detail="Document is being ingested")
+
+    await ingestion.delete_document(document_id)
@@ -1,7 +1,12 @@
+from typing import Any, AsyncIterator, List
+import json
+
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
 from ..schemas.query import QueryRequest, QueryResponse
-from ..services.query_pipeline import answer_question
+from ..services.generator import stream_answer_with_citations
+from ..services.query_pipeline import RetrievedContextChunk, answer_question, retrieve_context
 
 router = APIRouter()
 
@@ -21,3 +26,34 @@ async def query(request: QueryRequest) -> QueryResponse:
         raise HTTPException(status_code=404, detail="No relevant chunks found")
 
     return QueryResponse(answer=answer, citations=citations)
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _sse_stream(question: str, chunks: List[RetrievedContextChunk]) -> AsyncIterator[str]:
+    async for event, data in stream_answer_with_citations(question, chunks):
+        yield _sse(event, data)
+
+
+@router.post("/stream")
+async def query_stream(request: QueryRequest) -> StreamingResponse:
+    """
+    Streaming variant of POST /query as server-sent events: `context` (candidate
+    citations) once reranking is done, then `token` and `citation` events while
+    the answer is generated, then `done` with the full answer and citations.
+    """
+    chunks = await retrieve_context(
+        question=request.question,
+        top_k=request.top_k,
+        document_ids=request.document_ids or None,
+    )
+    if not chunks:
+        raise HTTPException(status_code=404, detail="No relevant chunks found")
+
+    return StreamingResponse(
+        _sse_stream(request.question, chunks),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
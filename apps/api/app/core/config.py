@@ -15,10 +15,39 @@ class Settings(BaseSettings):
     s3_secret_access_key: str = "minio123"
     s3_bucket: str = "docsearch-documents"
     s3_region: str = "us-east-1"
+    # Uploads are streamed to S3 in parts of this size (minimum 5 MiB).
+    s3_multipart_part_bytes: int = 8 * 1024 * 1024
+    # POST /documents/bulk: files and total bytes per request (after expanding
+    # archives), and concurrent uploads to S3 (boto3 pools 10 connections per client).
+    bulk_upload_max_files: int = 1000
+    bulk_upload_max_bytes: int = 2 * 1024 * 1024 * 1024
+    bulk_upload_concurrency: int = 8
 
     opensearch_host: str = "opensearch"
     opensearch_port: int = 9200
     opensearch_index: str = "chunks_v1"
+    # One async client per process; connections are kept alive and reused.
+    opensearch_pool_maxsize: int = 20
+    opensearch_timeout_seconds: float = 10.0
+    # Index settings applied by ensure_index when it creates the index; only the
+    # refresh interval is re-applied (once per process) to an existing one. The BM25
+    # "text" field is indexed without positions, so phrase queries aren't supported.
+    opensearch_number_of_shards: int = 1
+    opensearch_number_of_replicas: int = 0
+    opensearch_refresh_interval: str = "1s"
+    opensearch_text_analyzer: str = "standard"
+    # Bulk indexing: actions (and at most max_bytes) per request, concurrent
+    # requests per call, and retries with backoff of requests rejected with 429.
+    opensearch_bulk_chunk_size: int = 500
+    opensearch_bulk_max_bytes: int = 10 * 1024 * 1024
+    opensearch_bulk_workers: int = 2
+    opensearch_bulk_max_retries: int = 3
+    # Claimed ingestion jobs totalling at least this many upload bytes run in bulk
+    # ingest mode: refresh_interval is relaxed ("-1" = no periodic refresh) until
+    # they (and bulk ingests of other workers) finish, then restored and the index
+    # refreshed once. Documents are still refreshed before they become READY.
+    opensearch_bulk_ingest_min_bytes: int = 50 * 1024 * 1024
+    opensearch_bulk_refresh_interval: str = "-1"
 
     # Local embeddings / LLM
     embedding_model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
@@ -28,15 +57,109 @@ class Settings(BaseSettings):
     local_llm_base_url: str = "http://localhost:11434"
     # Default to a small widely-available Ollama model
     local_llm_model: str = "phi3:mini"
+    # Shared pooled client (see llm_client). keep_alive is sent with every request
+    # ("30m", or seconds; -1 keeps the model loaded); num_ctx/num_thread 0 = model default.
+    llm_timeout_seconds: float = 300.0
+    llm_max_connections: int = 10
+    llm_keep_alive: str = "30m"
+    llm_num_ctx: int = 0
+    llm_num_thread: int = 0
+    # Load the model on API startup, then ping it after this many idle seconds (0 = no pings).
+    llm_warmup_enabled: bool = True
+    llm_keep_warm_interval_seconds: float = 240.0
 
     # Cross-encoder reranker
     reranker_model_name: str = "BAAI/bge-reranker-v2-m3"
+    # Score cache: in-memory LRU budget, plus an optional SQLite file that
+    # survives restarts (empty path = memory only).
+    rerank_cache_max_bytes: int = 64 * 1024 * 1024
+    rerank_cache_path: str = ""
+    # Optional two-stage cascade: a cheap first stage ("cross_encoder" with
+    # rerank_cascade_model_name, or "bi_encoder": similarity to the chunk embeddings
+    # stored at ingestion) scores every candidate and only the top
+    # rerank_cascade_keep reach the heavy reranker.
+    rerank_cascade_enabled: bool = False
+    rerank_cascade_first_stage: str = "cross_encoder"
+    rerank_cascade_model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    rerank_cascade_keep: int = 30
+
+    # Dynamic micro-batching: concurrent embed/rerank calls are coalesced for up
+    # to inference_batch_max_wait_ms or until the batch holds max_items inputs.
+    inference_batch_max_wait_ms: float = 5.0
+    embedding_batch_max_items: int = 256
+    rerank_batch_max_items: int = 256
 
     # Chunking (character-based defaults)
     parent_chunk_chars: int = 4000
     parent_overlap_chars: int = 200
     child_chunk_chars: int = 1000
     child_overlap_chars: int = 100
+    # "fixed" (character windows, above) or "boundary" (see boundary_chunker):
+    # parents snap to sentence/paragraph boundaries within parent_chunk_chars,
+    # children are sized in embedding-model tokens (0 = the model's input limit).
+    # Changing it re-chunks documents differently, so re-ingest to apply it.
+    chunking_strategy: str = "fixed"
+    child_chunk_tokens: int = 0
+    child_overlap_tokens: int = 32
+
+    # PDF parsing (process pool; 0 workers = one per CPU)
+    pdf_parse_workers: int = 0
+    pdf_pages_per_task: int = 16
+    pdf_page_timeout_seconds: float = 30.0
+
+    # Ingestion worker (python -m app.worker)
+    ingestion_worker_concurrency: int = 2
+    ingestion_max_attempts: int = 5
+    ingestion_retry_base_seconds: float = 15.0
+    ingestion_retry_max_seconds: float = 900.0
+    ingestion_poll_interval_seconds: float = 1.0
+    # Running jobs renew their lease every third of this; expired ones are requeued.
+    ingestion_job_lease_seconds: int = 3600
+    # Jobs queued by one bulk upload are claimed up to this many at a time and
+    # ingested concurrently (one worker slot per claim).
+    ingestion_batch_claim_size: int = 16
+    # Documents are chunked as they are parsed; every this many child chunks are
+    # embedded, written and indexed before the next batch (bounds ingestion memory).
+    ingestion_batch_chunks: int = 256
+    # Chunks and embeddings are written with binary COPY in batches of this many rows.
+    bulk_write_batch_rows: int = 5000
+
+    # "per_document": every child chunk has its own text, embedding and OpenSearch
+    # document. "content_addressed" (see chunk_store.py): each distinct child text
+    # is stored, embedded and indexed once, keyed by chunk_hash, and child_chunks
+    # rows only record where it occurs. Always searched through pgvector.
+    # Re-ingest documents (into a fresh OPENSEARCH_INDEX) after changing it.
+    chunk_store: str = "per_document"
+
+    # Vector search backend: "pgvector" (Postgres) or "mmap" (in-process search
+    # over memory-mapped files under vector_store_path, appended by ingestion and
+    # shared by all API workers through the page cache). The ingestion worker and
+    # the API must see the same vector_store_path (a shared volume).
+    vector_backend: str = "pgvector"
+    vector_store_path: str = "./data/vectors"
+    # "float32", "float16", "int8" or "binary"; int8/binary keep a float32 copy
+    # on disk for rescoring. Changing it requires POST /admin/vector-store/rebuild.
+    vector_store_dtype: str = "float16"
+
+    # pgvector ANN index on chunk_embeddings (chunk_contents with the content-addressed
+    # chunk_store): "hnsw", "ivfflat" or "none".
+    # Build parameters apply when the index is (re)built; search knobs per query.
+    vector_index_type: str = "hnsw"
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 64
+    ivfflat_lists: int = 100
+    hnsw_ef_search: int = 100
+    ivfflat_probes: int = 10
+    # Document-filtered searches: pgvector >= 0.8 iterative index scans
+    # ("relaxed_order", "strict_order") keep scanning until enough rows pass the
+    # filter; empty = skip the ANN index and scan exactly (always limit rows, slower).
+    vector_iterative_scan: str = "relaxed_order"
+    vector_index_maintenance_work_mem: str = "512MB"
+    # Compact ANN index over the full-precision column: "none", "halfvec" or
+    # "binary". Quantized searches fetch limit * vector_rescore_factor candidates
+    # and re-rank them by exact cosine distance (also used by mmap int8/binary).
+    vector_index_quantization: str = "none"
+    vector_rescore_factor: int = 4
 
     # Retrieval tuning
     retrieve_k_keyword: int = 50
@@ -45,10 +168,35 @@ class Settings(BaseSettings):
     rerank_top_n: int = 15
     max_parent_chunks_for_llm: int = 10
     max_parent_chunk_chars_for_llm: int = 1500
+    # Cut the parent-text window around each candidate in SQL (see hydration.py),
+    # instead of fetching whole parent texts.
+    hydrate_slice_in_sql: bool = True
+    # Byte budget of the per-process parent chunk / document metadata cache used
+    # by hydration (0 = off: one joined query per request instead).
+    chunk_cache_max_bytes: int = 128 * 1024 * 1024
+    # Keyword and vector retrieval run concurrently; a branch exceeding its
+    # timeout (0 = none) is dropped and the query uses the other's results.
+    # The vector branch includes HyDE expansion and the query embedding.
+    retrieve_keyword_timeout_seconds: float = 2.0
+    retrieve_vector_timeout_seconds: float = 30.0
 
     # Query expansion (HyDE)
     hyde_enabled: bool = False
 
+    # Query-side cache (HyDE expansions, query embeddings). When shared, entries
+    # are also stored in Postgres so every API worker process sees them.
+    query_cache_max_entries: int = 10000
+    query_cache_ttl_seconds: float = 3600.0
+    query_cache_shared: bool = False
+
+    # Semantic answer cache: reuse the answer of a previous question whose embedding
+    # is at least this similar (same document_ids and top_k). Per API process;
+    # invalidated whenever the corpus generation changes.
+    answer_cache_enabled: bool = False
+    answer_cache_similarity: float = 0.95
+    answer_cache_max_entries: int = 2000
+    answer_cache_ttl_seconds: float = 86400.0
+
     # Debugging
     debug_prompts: bool = False
     debug_max_chars: int = 12000
@@ -2,6 +2,16 @@ from sqlalchemy import text
 
 from .models import Base
 from .session import engine
+from .vector_index import ensure_vector_index
+
+# Columns (and their indexes) added after the first release, for existing databases.
+_ADDED_COLUMNS = [
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS supersedes_id UUID "
+    "REFERENCES documents(id) ON DELETE SET NULL",
+    "ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS batch_id UUID",
+    "CREATE INDEX IF NOT EXISTS ix_ingestion_jobs_batch ON ingestion_jobs (batch_id, status)",
+    "CREATE INDEX IF NOT EXISTS ix_child_chunks_hash ON child_chunks (chunk_hash)",
+]
 
 
 async def init_db() -> None:
@@ -9,10 +19,16 @@ async def init_db() -> None:
     Dev-friendly DB init:
     - ensure pgvector extension exists
     - create tables if missing
+    - add columns introduced after a table was created
+    - create the pgvector ANN index if missing (concurrently, after the commit)
     """
     async with engine.begin() as conn:
         # pgvector is required for vector search; if the extension isn't available
         # in the Postgres image, this will fail with a clear error.
         await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
         await conn.run_sync(Base.metadata.create_all)
+        # create_all doesn't alter existing tables.
+        for statement in _ADDED_COLUMNS:
+            await conn.execute(text(statement))
+    await ensure_vector_index()
 
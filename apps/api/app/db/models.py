@@ -2,8 +2,20 @@ import enum
 from datetime import datetime
 from uuid import uuid4
 
-from sqlalchemy import DateTime, ForeignKey, String, Text, UniqueConstraint
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Sequence,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 from pgvector.sqlalchemy import Vector
@@ -13,11 +25,18 @@ class Base(DeclarativeBase):
     pass
 
 
+# Bumped whenever the searchable corpus changes (a document becomes READY or is
+# deleted); answer caches tag entries with it. See services.corpus_generation.
+corpus_generation_seq = Sequence("corpus_generation", metadata=Base.metadata)
+
+
 class DocumentStatus(str, enum.Enum):
     uploaded = "UPLOADED"
     processing = "PROCESSING"
     ready = "READY"
     failed = "FAILED"
+    # Replaced by a newer version (see Document.supersedes_id); has no chunks left.
+    retired = "RETIRED"
 
 
 class Document(Base):
@@ -35,6 +54,12 @@ class Document(Base):
     status: Mapped[str] = mapped_column(
         String(32), default=DocumentStatus.uploaded.value, nullable=False
     )
+    # Previous version this document replaces once its ingestion completes.
+    supersedes_id: Mapped[UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("documents.id", ondelete="SET NULL"),
+        nullable=True,
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=datetime.utcnow
     )
@@ -103,6 +128,9 @@ class ChildChunk(Base):
         "ChunkEmbedding", back_populates="child", uselist=False
     )
 
+    # Content-addressed store: a chunk's references are found by hash.
+    __table_args__ = (Index("ix_child_chunks_hash", "chunk_hash"),)
+
 
 class ChunkEmbedding(Base):
     __tablename__ = "chunk_embeddings"
@@ -119,3 +147,119 @@ class ChunkEmbedding(Base):
     )
 
     child: Mapped[ChildChunk] = relationship("ChildChunk", back_populates="embedding")
+
+
+class EmbeddingCacheEntry(Base):
+    """
+    Content-addressed embedding cache: identical chunk text is only encoded once
+    per embedding model, across documents and re-uploads.
+    """
+
+    __tablename__ = "embedding_cache"
+
+    chunk_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    model_name: Mapped[str] = mapped_column(String(128), primary_key=True)
+    embedding: Mapped[list[float]] = mapped_column(Vector(384), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=datetime.utcnow
+    )
+
+
+class ChunkContent(Base):
+    """
+    Content-addressed chunk store (chunk_store = "content_addressed"): the text
+    and embedding of a distinct child chunk, shared by every child_chunks row with
+    the same chunk_hash. Deleted once no child chunk references it.
+    """
+
+    __tablename__ = "chunk_contents"
+
+    chunk_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    embedding: Mapped[list[float]] = mapped_column(Vector(384), nullable=False)
+    model_name: Mapped[str] = mapped_column(String(128), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=datetime.utcnow
+    )
+
+
+class QueryCacheEntry(Base):
+    """
+    Optional cross-process tier of the query cache (HyDE text, query vectors).
+
+    UNLOGGED: it is only a cache, so skip WAL writes and accept losing it on crash.
+    """
+
+    __tablename__ = "query_cache"
+
+    namespace: Mapped[str] = mapped_column(String(64), primary_key=True)
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, index=True
+    )
+
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+
+class JobStatus(str, enum.Enum):
+    queued = "QUEUED"
+    running = "RUNNING"
+    succeeded = "SUCCEEDED"
+    failed = "FAILED"
+
+
+class IngestionJob(Base):
+    """
+    Durable ingestion work item, claimed by `app.worker` processes.
+
+    Lower `priority` runs first (we use the upload size in bytes, so small
+    documents are not stuck behind large ones).
+    """
+
+    __tablename__ = "ingestion_jobs"
+
+    id: Mapped[UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid4
+    )
+    document_id: Mapped[UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("documents.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    status: Mapped[str] = mapped_column(
+        String(32), default=JobStatus.queued.value, nullable=False
+    )
+    priority: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    # Set for jobs queued together by a bulk upload; workers claim them together.
+    batch_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False)
+    run_after: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    locked_by: Mapped[str] = mapped_column(String(128), nullable=True)
+    locked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+    __table_args__ = (
+        Index("ix_ingestion_jobs_claim", "status", "priority", "run_after"),
+        Index("ix_ingestion_jobs_batch", "batch_id", "status"),
+        # At most one pending/running job per document, so re-uploads of a
+        # duplicate file don't queue the same work twice.
+        Index(
+            "uq_ingestion_jobs_active_document",
+            "document_id",
+            unique=True,
+            postgresql_where=text("status IN ('QUEUED', 'RUNNING')"),
+        ),
+    )
@@ -0,0 +1,220 @@
+from typing import Any, Optional
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import get_settings
+from .session import engine
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Advisory lock serializing ANN index builds across processes (startup and rebuild).
+_BUILD_LOCK = 0x7665635F696478  # "vec_idx"
+
+
+def vector_table() -> str:
+    """Table holding the searched vectors for the configured chunk_store."""
+    return "chunk_contents" if settings.chunk_store == "content_addressed" else "chunk_embeddings"
+
+
+def index_name() -> str:
+    return f"ix_{vector_table()}_ann"
+
+
+def _rebuild_name() -> str:
+    return f"{index_name()}_rebuild"
+
+
+def index_ddl(*, name: Optional[str] = None, concurrently: bool = False) -> Optional[str]:
+    """
+    CREATE INDEX statement for the configured ANN index, or None if disabled.
+
+    Parameters come from Settings (ints only), so formatting them into DDL is safe.
+    """
+    kind = settings.vector_index_type.lower()
+    if kind == "none":
+        return None
+    if kind == "hnsw":
+        params = f"m = {int(settings.hnsw_m)}, ef_construction = {int(settings.hnsw_ef_construction)}"
+    elif kind == "ivfflat":
+        params = f"lists = {int(settings.ivfflat_lists)}"
+    else:
+        raise ValueError(f"Unsupported vector_index_type: {settings.vector_index_type!r}")
+
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name or index_name()} "
+        f"ON {vector_table()} USING {kind} ({_indexed_expression()}) WITH ({params})"
+    )
+
+
+def _indexed_expression() -> str:
+    """
+    Indexed expression + operator class for the configured quantization.
+
+    Compact forms are expression indexes over the full-precision column, so the
+    table keeps exact vectors for rescoring and existing rows need no rewrite:
+    switching quantization is just a (concurrent) index rebuild. The expressions
+    must match the ones vector_search orders by, or the planner won't use them.
+    """
+    dim = int(settings.embedding_dim)
+    quantization = settings.vector_index_quantization.lower()
+    if quantization == "none":
+        return "embedding vector_cosine_ops"
+    if quantization == "halfvec":
+        return f"(embedding::halfvec({dim})) halfvec_cosine_ops"
+    if quantization == "binary":
+        return f"(binary_quantize(embedding)::bit({dim})) bit_hamming_ops"
+    raise ValueError(
+        f"Unsupported vector_index_quantization: {settings.vector_index_quantization!r} "
+        "(int8 is only available with VECTOR_BACKEND=mmap)"
+    )
+
+
+async def ensure_vector_index() -> None:
+    """
+    Create the ANN index if it doesn't exist yet (used by init_db, after its
+    transaction has committed).
+
+    The index is built CONCURRENTLY, on an autocommit connection, by whichever
+    process takes the build lock first; others skip it. Building over a table
+    that already holds rows can take long, so startup only logs a warning then;
+    use rebuild_vector_index(), which also applies changed parameters to an
+    existing index. IVFFlat centroids are trained on the rows present at build
+    time, so rebuild it after bulk-loading a corpus.
+    """
+    ddl = index_ddl(concurrently=True)
+    if ddl is None:
+        return
+    async with engine.connect() as conn:
+        # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block.
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if not await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": _BUILD_LOCK}):
+            logger.info("Vector index is being built by another process; not waiting for it")
+            return
+        try:
+            valid = await conn.scalar(
+                text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+                {"name": index_name()},
+            )
+            if valid:
+                return
+            if await conn.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {vector_table()})")):
+                logger.warning(
+                    "%s has rows but no valid %s index; build it with "
+                    "POST /admin/vector-index/rebuild",
+                    vector_table(),
+                    index_name(),
+                )
+                return
+            await conn.execute(
+                text("SELECT set_config('maintenance_work_mem', :mem, false)"),
+                {"mem": settings.vector_index_maintenance_work_mem},
+            )
+            # An interrupted concurrent build leaves an INVALID index behind.
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name()}"))
+            await conn.execute(text(ddl))
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _BUILD_LOCK})
+
+
+async def apply_search_settings(session: AsyncSession, *, limit: int, filtered: bool) -> None:
+    """
+    Apply per-query ANN knobs for the current transaction (SET LOCAL semantics).
+
+    hnsw.ef_search must be at least `limit`, or HNSW returns fewer rows than asked.
+    A document filter is applied to the rows the index returns, so a filtered
+    search either scans the index iteratively until `limit` rows pass the filter,
+    or, with vector_iterative_scan off, doesn't use the index at all.
+    """
+    kind = settings.vector_index_type.lower()
+    if kind == "hnsw":
+        await session.execute(
+            text("SELECT set_config('hnsw.ef_search', :v, true)"),
+            {"v": str(max(int(settings.hnsw_ef_search), int(limit)))},
+        )
+    elif kind == "ivfflat":
+        await session.execute(
+            text("SELECT set_config('ivfflat.probes', :v, true)"),
+            {"v": str(int(settings.ivfflat_probes))},
+        )
+    else:
+        return
+
+    if not filtered:
+        return
+    if settings.vector_iterative_scan:
+        # pgvector >= 0.8: keep scanning the index until enough rows pass the
+        # document filter instead of post-filtering a fixed candidate set.
+        await session.execute(
+            text(f"SELECT set_config('{kind}.iterative_scan', :v, true)"),
+            {"v": settings.vector_iterative_scan},
+        )
+    else:
+        # ANN indexes only support plain index scans; without them the planner
+        # falls back to an exact scan of the filtered rows.
+        await session.execute(text("SELECT set_config('enable_indexscan', 'off', true)"))
+
+
+async def rebuild_vector_index() -> None:
+    """
+    Rebuild the ANN index with the current Settings without blocking queries or
+    ingestion: build a new index CONCURRENTLY, then swap it in for the old one.
+    Waits for a build another process is running.
+    """
+    rebuild_name = _rebuild_name()
+    ddl = index_ddl(name=rebuild_name, concurrently=True)
+    async with engine.connect() as conn:
+        # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block.
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _BUILD_LOCK})
+        try:
+            await conn.execute(
+                text("SELECT set_config('maintenance_work_mem', :mem, false)"),
+                {"mem": settings.vector_index_maintenance_work_mem},
+            )
+            # A previous interrupted rebuild leaves an INVALID index behind.
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {rebuild_name}"))
+            if ddl is not None:
+                logger.info("Building vector index: %s", ddl)
+                await conn.execute(text(ddl))
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name()}"))
+            if ddl is not None:
+                await conn.execute(text(f"ALTER INDEX {rebuild_name} RENAME TO {index_name()}"))
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _BUILD_LOCK})
+    logger.info("Vector index rebuild finished (type=%s)", settings.vector_index_type)
+
+
+async def describe_vector_index() -> dict[str, Any]:
+    """Current index definition and, while a build runs, its progress."""
+    async with engine.connect() as conn:
+        rows = (
+            await conn.execute(
+                text(
+                    "SELECT indexname, indexdef, "
+                    "pg_size_pretty(pg_relation_size(quote_ident(indexname)::regclass)) AS size "
+                    "FROM pg_indexes WHERE tablename = :table "
+                    "AND indexname IN (:name, :rebuild)"
+                ),
+                {"table": vector_table(), "name": index_name(), "rebuild": _rebuild_name()},
+            )
+        ).mappings().all()
+        progress = (
+            await conn.execute(
+                text(
+                    "SELECT phase, blocks_done, blocks_total, tuples_done, tuples_total "
+                    "FROM pg_stat_progress_create_index "
+                    "WHERE relid = CAST(:table AS regclass)"
+                ),
+                {"table": vector_table()},
+            )
+        ).mappings().all()
+    return {
+        "table": vector_table(),
+        "configured_type": settings.vector_index_type,
+        "configured_quantization": settings.vector_index_quantization,
+        "indexes": [dict(r) for r in rows],
+        "build_progress": [dict(p) for p in progress],
+    }
@@ -1,10 +1,12 @@
 from fastapi import FastAPI
 
+from .api.routes_admin import router as admin_router
 from .api.routes_documents import router as documents_router
 from .api.routes_query import router as query_router
 from .core.logging import configure_logging
 from .db.init_db import init_db
-from .services.opensearch_index import ensure_index
+from .services import llm_client
+from .services.opensearch_index import close_client, ensure_index
 
 
 def create_app() -> FastAPI:
@@ -13,6 +15,7 @@ def create_app() -> FastAPI:
 
     app.include_router(documents_router, prefix="/documents", tags=["documents"])
     app.include_router(query_router, prefix="/query", tags=["query"])
+    app.include_router(admin_router, prefix="/admin", tags=["admin"])
 
     @app.get("/health", tags=["system"])
     async def health() -> dict:
@@ -22,7 +25,14 @@ def create_app() -> FastAPI:
     async def _startup() -> None:
         await init_db()
         # Ensure OpenSearch index exists for keyword retrieval.
-        ensure_index()
+        await ensure_index()
+        # Load the LLM in the background so the first query doesn't pay for it.
+        llm_client.start_keep_warm()
+
+    @app.on_event("shutdown")
+    async def _shutdown() -> None:
+        await close_client()
+        await llm_client.close_client()
 
     return app
 
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel
@@ -8,8 +9,22 @@ class DocumentCreateResponse(BaseModel):
     id: UUID
 
 
+class BulkUploadItem(BaseModel):
+    filename: str
+    id: UUID
+    # True when the file matched an existing document (or an earlier file in the request).
+    duplicate: bool
+
+
+class BulkUploadResponse(BaseModel):
+    # Ingestion batch of the new documents; None if every file was a duplicate.
+    batch_id: Optional[UUID] = None
+    documents: List[BulkUploadItem]
+
+
 class DocumentStatusResponse(BaseModel):
     id: UUID
     filename: str
     status: str
+    supersedes_id: Optional[UUID] = None
     created_at: datetime
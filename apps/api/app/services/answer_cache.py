@@ -0,0 +1,189 @@
+"""
+Semantic answer cache in front of the query pipeline.
+
+A new question reuses a previous answer when its query embedding is close
+enough (cosine >= answer_cache_similarity) to that of a cached question with
+the same scope (document_ids filter and top_k). Entries are tagged with the
+corpus generation (see corpus_generation). When the generation moves, every
+entry is dropped, because any answer could change once the corpus has.
+
+The cache is in-process: each API worker keeps its own bounded set, evicting
+the least recently used entries.
+"""
+
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+from uuid import UUID
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from ..core.config import get_settings
+from ..schemas.query import Citation
+from .corpus_generation import current_generation
+from .embeddings import embed_query
+
+settings = get_settings()
+
+Scope = Tuple[int, Tuple[str, ...]]
+
+
+@dataclass
+class AnswerCacheProbe:
+    """Result of a lookup; pass it back to store() after a miss."""
+
+    embedding: Optional[np.ndarray]
+    scope: Scope
+    generation: int
+    answer: Optional[str] = None
+    citations: Optional[List[Citation]] = None
+    similarity: float = 0.0
+
+    @property
+    def hit(self) -> bool:
+        return self.answer is not None
+
+
+class SemanticAnswerCache:
+    def __init__(self, *, max_entries: int, dim: int, threshold: float, ttl_seconds: float) -> None:
+        self.max_entries = max(int(max_entries), 0)
+        self.threshold = float(threshold)
+        self.ttl_seconds = float(ttl_seconds)
+        self._vectors = np.zeros((self.max_entries, dim), dtype=np.float32)
+        self._valid = np.zeros(self.max_entries, dtype=bool)
+        self._last_used = np.zeros(self.max_entries, dtype=np.float64)
+        self._expires_at = np.zeros(self.max_entries, dtype=np.float64)
+        self._entries: List[Optional[tuple[Scope, str, List[Citation]]]] = [None] * self.max_entries
+        self._generation: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _sync_generation(self, generation: int) -> None:
+        """Drop everything cached against an older corpus (lock held)."""
+        if self._generation != generation:
+            if self._valid.any():
+                self.invalidations += 1
+            self._valid[:] = False
+            self._entries = [None] * self.max_entries
+            self._generation = generation
+
+    def lookup(
+        self, embedding: np.ndarray, scope: Scope, generation: int
+    ) -> Tuple[Optional[tuple[str, List[Citation]]], float]:
+        now = time.monotonic()
+        with self._lock:
+            self._sync_generation(generation)
+            self._valid &= self._expires_at > now
+            candidates = np.nonzero(self._valid)[0]
+            candidates = [i for i in candidates if self._entries[i][0] == scope]
+            if candidates:
+                sims = self._vectors[candidates] @ embedding
+                best = int(np.argmax(sims))
+                similarity = float(sims[best])
+                if similarity >= self.threshold:
+                    slot = candidates[best]
+                    self._last_used[slot] = now
+                    self.hits += 1
+                    _, answer, citations = self._entries[slot]
+                    return (answer, citations), similarity
+            self.misses += 1
+            return None, 0.0
+
+    def store(
+        self,
+        embedding: np.ndarray,
+        scope: Scope,
+        generation: int,
+        answer: str,
+        citations: List[Citation],
+    ) -> None:
+        if self.max_entries == 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._generation is not None and generation < self._generation:
+                # Computed against a corpus that has changed since.
+                return
+            self._sync_generation(generation)
+            free = np.nonzero(~self._valid)[0]
+            if free.size:
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self._last_used))
+                self.evictions += 1
+            self._vectors[slot] = embedding
+            self._valid[slot] = True
+            self._last_used[slot] = now
+            self._expires_at[slot] = now + self.ttl_seconds
+            self._entries[slot] = (scope, answer, list(citations))
+            self.stores += 1
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.answer_cache_enabled,
+            "entries": int(self._valid.sum()),
+            "max_entries": self.max_entries,
+            "generation": self._generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+_cache = SemanticAnswerCache(
+    max_entries=settings.answer_cache_max_entries,
+    dim=settings.embedding_dim,
+    threshold=settings.answer_cache_similarity,
+    ttl_seconds=settings.answer_cache_ttl_seconds,
+)
+
+
+def _scope(top_k: int, document_ids: Optional[Sequence[UUID]]) -> Scope:
+    return int(top_k), tuple(sorted(str(d) for d in (document_ids or [])))
+
+
+def _normalize(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+async def probe(
+    *,
+    question: str,
+    top_k: int,
+    document_ids: Optional[Sequence[UUID]] = None,
+) -> AnswerCacheProbe:
+    """Look up a cached answer for a semantically equivalent question."""
+    scope = _scope(top_k, document_ids)
+    if not settings.answer_cache_enabled:
+        return AnswerCacheProbe(embedding=None, scope=scope, generation=0)
+
+    # The raw-question embedding is reused by vector retrieval when HyDE is off.
+    generation, vector = await asyncio.gather(current_generation(), embed_query(question))
+    embedding = _normalize(vector)
+    result = AnswerCacheProbe(embedding=embedding, scope=scope, generation=generation)
+    found, result.similarity = _cache.lookup(embedding, scope, generation)
+    if found is not None:
+        result.answer, result.citations = found
+    return result
+
+
+def store(probe_result: AnswerCacheProbe, answer: str, citations: List[Citation]) -> None:
+    if probe_result.embedding is None:
+        return
+    _cache.store(probe_result.embedding, probe_result.scope, probe_result.generation, answer, citations)
+
+
+def stats() -> dict[str, Any]:
+    return _cache.stats()
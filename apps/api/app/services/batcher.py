@@ -0,0 +1,150 @@
+from collections import deque
+from typing import Any, Callable, Deque, Generic, List, Optional, Sequence, Tuple, TypeVar
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Coalesce concurrent model calls into batched forward passes.
+
+    Callers `submit` a list of inputs. The batcher waits up to `max_wait_ms` after
+    the first pending request (or until `max_batch_items` inputs are queued), sorts
+    the combined inputs by length to cut padding, runs `fn` once in a worker thread
+    and hands each caller its slice of the results. Only one forward pass per
+    batcher runs at a time; requests that arrive meanwhile form the next batch.
+
+    `fn` takes a list of inputs and returns one result per input, in order.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[T]], Sequence[R]],
+        *,
+        max_batch_items: int,
+        max_wait_ms: float,
+        length: Callable[[T], int] = len,  # type: ignore[assignment]
+        name: str = "batcher",
+    ) -> None:
+        self.fn = fn
+        self.max_batch_items = max(int(max_batch_items), 1)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+        self.length = length
+        self.name = name
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Deque[Tuple[List[T], asyncio.Future]] = deque()
+        self._pending_items = 0
+        self._has_work: Optional[asyncio.Event] = None
+        self._batch_full: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+
+        self.batches = 0
+        self.items = 0
+        self.requests = 0
+
+    def _ensure_runner(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._runner is None or self._runner.done():
+            # First use, or the previous event loop is gone (e.g. repeated asyncio.run).
+            self._loop = loop
+            self._pending.clear()
+            self._pending_items = 0
+            self._has_work = asyncio.Event()
+            self._batch_full = asyncio.Event()
+            self._runner = loop.create_task(self._run(), name=f"{self.name}-runner")
+
+    async def submit(self, items: List[T]) -> List[R]:
+        if not items:
+            return []
+        if len(items) >= self.max_batch_items:
+            # Already a full batch on its own; coalescing would only add latency.
+            return list(await asyncio.to_thread(self._call_sorted, items))
+
+        self._ensure_runner()
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._pending.append((items, future))
+        self._pending_items += len(items)
+        self._has_work.set()
+        if self._pending_items >= self.max_batch_items:
+            self._batch_full.set()
+        return await future
+
+    def _call_sorted(self, items: List[T]) -> List[R]:
+        order = sorted(range(len(items)), key=lambda i: self.length(items[i]))
+        sorted_results = self.fn([items[i] for i in order])
+        results: List[Any] = [None] * len(items)
+        for pos, idx in enumerate(order):
+            results[idx] = sorted_results[pos]
+        return results
+
+    def _take_batch(self) -> List[Tuple[List[T], asyncio.Future]]:
+        batch: List[Tuple[List[T], asyncio.Future]] = []
+        count = 0
+        while self._pending:
+            items, future = self._pending[0]
+            if batch and count + len(items) > self.max_batch_items:
+                break
+            self._pending.popleft()
+            self._pending_items -= len(items)
+            if future.done():
+                # Caller was cancelled while waiting.
+                continue
+            batch.append((items, future))
+            count += len(items)
+        if not self._pending:
+            self._has_work.clear()
+        self._batch_full.clear()
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._has_work.wait()
+
+            deadline = loop.time() + self.max_wait
+            while self._pending_items < self.max_batch_items:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = self._take_batch()
+            if not batch:
+                continue
+
+            flat: List[T] = [item for items, _ in batch for item in items]
+            try:
+                results = await asyncio.to_thread(self._call_sorted, flat)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(flat)
+            self.requests += len(batch)
+
+            offset = 0
+            for items, future in batch:
+                if not future.done():
+                    future.set_result(results[offset : offset + len(items)])
+                offset += len(items)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "items": self.items,
+            "avg_batch_items": (self.items / self.batches) if self.batches else 0.0,
+            "avg_requests_per_batch": (self.requests / self.batches) if self.batches else 0.0,
+        }
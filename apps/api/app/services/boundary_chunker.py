@@ -0,0 +1,246 @@
+"""
+Boundary-aware chunking (chunking_strategy = "boundary").
+
+The fixed chunker (chunker.simple_chunk / chunk_text_block) cuts character
+windows. A window can end mid-sentence, and a 1000-char child can exceed the
+embedding model's input limit (256 tokens for MiniLM), in which case the model
+silently drops its tail. This chunker works differently:
+
+- Text is split into units: sentences, and words for a sentence that is over
+  budget on its own.
+- Units are packed greedily up to a size budget, measured by a length function.
+  Parents are measured in characters. Children are measured in model tokens, so
+  every child fits the model.
+- A paragraph break closes a chunk once the chunk is at least half full.
+- Overlap repeats whole trailing units, never half a sentence.
+"""
+
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, Callable, List, Sequence, Tuple
+import re
+
+from .chunker import ChunkData, _find_page_range, hash_text
+
+# Texts -> their sizes (characters, or tokens of the embedding model).
+LengthFn = Callable[[List[str]], List[int]]
+
+_PARAGRAPH_BREAK_RE = re.compile(r"\n[ \t]*\n\s*")
+_SENTENCE_BREAK_RE = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+_WORD_RE = re.compile(r"\S+")
+
+# A paragraph break ends the chunk only if that leaves it at least this full.
+_PARAGRAPH_MIN_FILL = 0.5
+# Streaming: pack once this many budgets of text are buffered past the current chunk.
+_LOOKAHEAD_BUDGETS = 4
+
+
+def char_lengths(texts: List[str]) -> List[int]:
+    return [len(t) for t in texts]
+
+
+@dataclass(slots=True)
+class _Unit:
+    start: int
+    end: int
+    size: int
+    paragraph_end: bool = False
+
+
+def _spans(text: str, pattern: re.Pattern, start: int, end: int) -> List[Tuple[int, int]]:
+    """Pieces of text[start:end] between matches of pattern, whitespace-trimmed."""
+    spans: List[Tuple[int, int]] = []
+    cursor = start
+    for match in pattern.finditer(text, start, end):
+        spans.append((cursor, match.start()))
+        cursor = match.end()
+    spans.append((cursor, end))
+    trimmed = []
+    for a, b in spans:
+        while a < b and text[a].isspace():
+            a += 1
+        while b > a and text[b - 1].isspace():
+            b -= 1
+        if a < b:
+            trimmed.append((a, b))
+    return trimmed
+
+
+def _segment(text: str, *, max_size: int, length: LengthFn, char_mode: bool) -> List[_Unit]:
+    """Split text into units no larger than max_size."""
+    units: List[_Unit] = []
+    for para_start, para_end in _spans(text, _PARAGRAPH_BREAK_RE, 0, len(text)):
+        sentences = _spans(text, _SENTENCE_BREAK_RE, para_start, para_end)
+        sizes = length([text[a:b] for a, b in sentences])
+        for (a, b), size in zip(sentences, sizes):
+            if size <= max_size:
+                units.append(_Unit(a, b, size))
+                continue
+            words = [(m.start(), m.end()) for m in _WORD_RE.finditer(text, a, b)]
+            word_sizes = length([text[wa:wb] for wa, wb in words])
+            for (wa, wb), word_size in zip(words, word_sizes):
+                if word_size <= max_size:
+                    units.append(_Unit(wa, wb, word_size))
+                    continue
+                # A single "word" over budget (tables, base64...): hard cut. A token
+                # covers at least one character, so max_size characters always fit.
+                for ca in range(wa, wb, max_size):
+                    cb = min(ca + max_size, wb)
+                    units.append(_Unit(ca, cb, cb - ca if char_mode else length([text[ca:cb]])[0]))
+        if units:
+            units[-1].paragraph_end = True
+    return units
+
+
+class _Packer:
+    """Greedy packing of units into chunks of at most max_size (sizes via prefix sums)."""
+
+    def __init__(self, units: Sequence[_Unit], *, max_size: int, overlap: int, char_mode: bool) -> None:
+        self.units = units
+        self.max_size = max_size
+        self.overlap = overlap
+        # In character mode the whitespace between units counts too.
+        self._prefix = [0]
+        for k, unit in enumerate(units):
+            gap = unit.start - units[k - 1].end if char_mode and k > 0 else 0
+            self._prefix.append(self._prefix[-1] + gap + unit.size)
+        self._gaps = [
+            units[k].start - units[k - 1].end if char_mode and k > 0 else 0
+            for k in range(len(units))
+        ]
+
+    def size(self, i: int, j: int) -> int:
+        """Size of the chunk made of units i..j-1."""
+        return self._prefix[j] - self._prefix[i] - self._gaps[i]
+
+    def next_chunk(self, i: int) -> Tuple[int, int]:
+        """(end, next_start) unit indexes for the chunk starting at unit i."""
+        n = len(self.units)
+        j = i + 1
+        while j < n and self.size(i, j + 1) <= self.max_size:
+            j += 1
+        if j < n:
+            # Full: prefer to end at the last paragraph break, if that is not too early.
+            for p in range(j - 1, i, -1):
+                if self.size(i, p) < self.max_size * _PARAGRAPH_MIN_FILL:
+                    break
+                if self.units[p - 1].paragraph_end:
+                    j = p
+                    break
+        next_start = j
+        while next_start - 1 > i and self.size(next_start - 1, j) <= self.overlap:
+            next_start -= 1
+        return j, next_start
+
+
+def chunk_block(
+    text: str,
+    *,
+    page_start: int,
+    page_end: int,
+    base_char_start: int,
+    max_size: int,
+    overlap: int,
+    length: LengthFn = char_lengths,
+) -> List[ChunkData]:
+    """
+    Boundary-aware counterpart of chunker.chunk_text_block: chunk one block (a
+    parent chunk) with sizes measured by length, e.g. embeddings.token_lengths.
+    """
+    max_size = max(max_size, 1)
+    char_mode = length is char_lengths
+    units = _segment(text, max_size=max_size, length=length, char_mode=char_mode)
+    packer = _Packer(units, max_size=max_size, overlap=overlap, char_mode=char_mode)
+
+    chunks: List[ChunkData] = []
+    i = 0
+    while i < len(units):
+        j, next_start = packer.next_chunk(i)
+        start, end = units[i].start, units[j - 1].end
+        part = text[start:end]
+        chunks.append(
+            ChunkData(
+                text=part,
+                page_start=page_start,
+                page_end=page_end,
+                char_start=base_char_start + start,
+                char_end=base_char_start + end,
+                chunk_hash=hash_text(part),
+            )
+        )
+        i = next_start
+    return chunks
+
+
+async def iter_chunks(
+    pages: AsyncIterable[Tuple[int, str]],
+    max_chars: int = 2000,
+    overlap_chars: int = 200,
+) -> AsyncIterator[ChunkData]:
+    """
+    Boundary-aware counterpart of chunker.iter_chunks (character budget), streaming
+    pages the same way: text is packed once a few budgets are buffered, and only
+    chunks ending well before the buffer end are emitted. Packing then resumes
+    from the first unemitted chunk. The result is the same as a single pass,
+    except next to sentences longer than the budget.
+    """
+    max_chars = max(max_chars, 1)
+    buffer = ""
+    buffer_offset = 0  # global char offset of buffer[0]
+    page_offsets: List[tuple[int, int, int]] = []
+    cursor = 0
+
+    def pack(final: bool) -> Tuple[List[ChunkData], int]:
+        """Chunks that are safe to emit, and the global offset to resume from."""
+        units = _segment(buffer, max_size=max_chars, length=char_lengths, char_mode=True)
+        packer = _Packer(units, max_size=max_chars, overlap=overlap_chars, char_mode=True)
+        safe_end = len(buffer) if final else len(buffer) - max_chars
+        chunks: List[ChunkData] = []
+        i = 0
+        while i < len(units):
+            j, next_start = packer.next_chunk(i)
+            if units[j - 1].end > safe_end:
+                return chunks, buffer_offset + units[i].start
+            start, end = buffer_offset + units[i].start, buffer_offset + units[j - 1].end
+            part = buffer[units[i].start : units[j - 1].end]
+            page_start, page_end = _find_page_range(page_offsets, start, end)
+            chunks.append(
+                ChunkData(
+                    text=part,
+                    page_start=page_start,
+                    page_end=page_end,
+                    char_start=start,
+                    char_end=end,
+                    chunk_hash=hash_text(part),
+                )
+            )
+            i = next_start
+        return chunks, buffer_offset + len(buffer)
+
+    async for page_no, text in pages:
+        if not isinstance(text, str):
+            text = str(text)
+        if page_offsets and page_offsets[-1][0] == page_no:
+            buffer += text
+            cursor += len(text)
+            page_offsets[-1] = (page_no, page_offsets[-1][1], cursor)
+        else:
+            if page_offsets:
+                buffer += "\n"
+                cursor += 1
+            buffer += text
+            page_offsets.append((page_no, cursor, cursor + len(text)))
+            cursor += len(text)
+
+        if len(buffer) < _LOOKAHEAD_BUDGETS * max_chars:
+            continue
+        chunks, resume = pack(final=False)
+        for chunk in chunks:
+            yield chunk
+        buffer = buffer[resume - buffer_offset :]
+        buffer_offset = resume
+        while len(page_offsets) > 1 and page_offsets[1][2] <= resume:
+            page_offsets.pop(0)
+
+    chunks, _ = pack(final=True)
+    for chunk in chunks:
+        yield chunk
@@ -0,0 +1,362 @@
+"""
+Bulk document upload: many files, or zip/tar archives of them, in one request.
+
+Every file is spooled to a temporary file and hashed; archives are expanded
+within bulk_upload_max_bytes in total, so a zip bomb is cut off while spooling. All hashes are deduped
+against documents.file_sha256 with one query. New files go to S3 concurrently
+(bulk_upload_concurrency) through one shared client, their documents rows are
+inserted in one statement, and their ingestion jobs are queued as one batch.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Set
+from uuid import UUID, uuid4
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import tarfile
+import tempfile
+import zipfile
+
+from fastapi import UploadFile
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..core.config import get_settings
+from ..db import models
+from ..db.session import async_session
+from ..schemas.documents import BulkUploadItem, BulkUploadResponse
+from . import job_queue
+from .storage_s3 import _ensure_bucket_exists, _get_s3_client
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_COPY_BYTES = 1024 * 1024
+# Archive members larger than this are spooled to disk instead of memory (with
+# up to bulk_upload_max_files members in memory at once).
+_SPOOL_MAX_MEMORY = 64 * 1024
+# Rows / hashes per statement, well under asyncpg's 32767 bind-parameter limit
+# (about 9 per documents row).
+_STATEMENT_ROWS = 1000
+_ZIP_SUFFIXES = (".zip",)
+_TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+class BulkUploadError(ValueError):
+    """The request can't be accepted (e.g. too many files, unreadable archive)."""
+
+
+@dataclass
+class _BulkFile:
+    filename: str
+    content_type: str
+    file: BinaryIO
+    sha256: str = ""
+    size_bytes: int = 0
+    document_id: Optional[UUID] = None
+    duplicate: bool = False
+    s3_key: Optional[str] = None
+
+
+def _hash_file(f: BinaryIO) -> tuple[str, int]:
+    hasher = hashlib.sha256()
+    size = 0
+    f.seek(0)
+    while block := f.read(_COPY_BYTES):
+        hasher.update(block)
+        size += len(block)
+    f.seek(0)
+    return hasher.hexdigest(), size
+
+
+class _ByteBudget:
+    """Total (uncompressed) bytes one request may store; raises once exceeded."""
+
+    def __init__(self, limit: int) -> None:
+        self.remaining = limit
+
+    def take(self, size: int) -> None:
+        self.remaining -= size
+        if self.remaining < 0:
+            raise BulkUploadError(
+                f"Upload too large; at most {settings.bulk_upload_max_bytes} bytes "
+                "(after expanding archives) per request"
+            )
+
+
+def _spool(src: BinaryIO, budget: _ByteBudget) -> BinaryIO:
+    out = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_MEMORY)
+    try:
+        while block := src.read(_COPY_BYTES):
+            budget.take(len(block))
+            out.write(block)
+    except BaseException:
+        out.close()
+        raise
+    out.seek(0)
+    return out
+
+
+def _file_size(f: BinaryIO) -> int:
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    return size
+
+
+def _skip_member(name: str) -> bool:
+    base = os.path.basename(name)
+    return not base or base.startswith(".") or name.startswith("__MACOSX/")
+
+
+def _guess_content_type(name: str) -> str:
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+def _archive_members(
+    upload: UploadFile, budget: _ByteBudget
+) -> Optional[Iterator[tuple[str, BinaryIO]]]:
+    """Spooled (name, file) members of a zip/tar upload; None if it isn't an archive."""
+    name = (upload.filename or "").lower()
+    if name.endswith(_ZIP_SUFFIXES):
+
+        def zip_members() -> Iterator[tuple[str, BinaryIO]]:
+            with zipfile.ZipFile(upload.file) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or _skip_member(info.filename):
+                        continue
+                    with archive.open(info) as member:
+                        yield info.filename, _spool(member, budget)
+
+        return zip_members()
+
+    if name.endswith(_TAR_SUFFIXES):
+
+        def tar_members() -> Iterator[tuple[str, BinaryIO]]:
+            with tarfile.open(fileobj=upload.file, mode="r:*") as archive:
+                for info in archive:
+                    if not info.isfile() or _skip_member(info.name):
+                        continue
+                    member = archive.extractfile(info)
+                    if member is not None:
+                        yield info.name, _spool(member, budget)
+
+        return tar_members()
+
+    return None
+
+
+def _collect_files(uploads: Sequence[UploadFile]) -> List[_BulkFile]:
+    """Expand archives and hash every file (blocking; run in a thread)."""
+    files: List[_BulkFile] = []
+    budget = _ByteBudget(settings.bulk_upload_max_bytes)
+    try:
+        for upload in uploads:
+            members = _archive_members(upload, budget)
+            if members is None:
+                # Starlette already spooled the upload; hash it in place.
+                budget.take(_file_size(upload.file))
+                files.append(
+                    _BulkFile(
+                        filename=upload.filename or "",
+                        content_type=upload.content_type or "application/octet-stream",
+                        file=upload.file,
+                    )
+                )
+            else:
+                try:
+                    for member_name, spooled in members:
+                        files.append(
+                            _BulkFile(
+                                filename=member_name[-512:],
+                                content_type=_guess_content_type(member_name),
+                                file=spooled,
+                            )
+                        )
+                        if len(files) > settings.bulk_upload_max_files:
+                            break
+                except (zipfile.BadZipFile, tarfile.TarError) as e:
+                    raise BulkUploadError(f"Unreadable archive {upload.filename!r}: {e}") from e
+            if len(files) > settings.bulk_upload_max_files:
+                raise BulkUploadError(
+                    f"Too many files; at most {settings.bulk_upload_max_files} per request"
+                )
+
+        for item in files:
+            item.sha256, item.size_bytes = _hash_file(item.file)
+    except BaseException:
+        _close_files(files, uploads)
+        raise
+    return files
+
+
+def _close_files(files: Sequence[_BulkFile], uploads: Sequence[UploadFile]) -> None:
+    upload_files = {id(u.file) for u in uploads}
+    for item in files:
+        if id(item.file) not in upload_files:
+            item.file.close()
+
+
+async def _existing_documents(hashes: Sequence[str]) -> Dict[str, models.Document]:
+    unique = list(set(hashes))
+    found: Dict[str, models.Document] = {}
+    async with async_session() as session:
+        for i in range(0, len(unique), _STATEMENT_ROWS):
+            rows = await session.scalars(
+                select(models.Document).where(
+                    models.Document.tenant_id == "default",
+                    models.Document.file_sha256.in_(unique[i : i + _STATEMENT_ROWS]),
+                )
+            )
+            found.update((document.file_sha256, document) for document in rows)
+    return found
+
+
+async def _upload_all(s3: Any, items: Sequence[_BulkFile]) -> None:
+    """Upload concurrently; on any failure, delete what was uploaded and re-raise."""
+    slots = asyncio.Semaphore(max(settings.bulk_upload_concurrency, 1))
+
+    async def upload(item: _BulkFile) -> None:
+        async with slots:
+            await asyncio.to_thread(
+                s3.upload_fileobj,
+                item.file,
+                settings.s3_bucket,
+                item.s3_key,
+                ExtraArgs={"ContentType": item.content_type},
+            )
+
+    results = await asyncio.gather(*(upload(item) for item in items), return_exceptions=True)
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        await _delete_objects(
+            s3, [item for item, r in zip(items, results) if not isinstance(r, BaseException)]
+        )
+        raise errors[0]
+
+
+async def _delete_objects(s3: Any, items: Sequence[_BulkFile]) -> None:
+    keys = [{"Key": item.s3_key} for item in items if item.s3_key]
+    for i in range(0, len(keys), 1000):  # delete_objects limit
+        try:
+            await asyncio.to_thread(
+                s3.delete_objects,
+                Bucket=settings.s3_bucket,
+                Delete={"Objects": keys[i : i + 1000], "Quiet": True},
+            )
+        except Exception:
+            logger.warning("Failed to delete %d uploaded object(s)", len(keys[i : i + 1000]))
+
+
+async def _insert_documents(items: Sequence[_BulkFile]) -> None:
+    """
+    Insert one documents row per item, in statements of _STATEMENT_ROWS rows and
+    one transaction. Rows that lose a race on uq_doc_hash are skipped; those
+    items are pointed at the winning document and marked duplicate.
+    """
+    now = datetime.utcnow()
+    for item in items:
+        item.document_id = uuid4()
+    inserted: Set[UUID] = set()
+    async with async_session() as session:
+        for i in range(0, len(items), _STATEMENT_ROWS):
+            stmt = (
+                pg_insert(models.Document)
+                .values(
+                    [
+                        {
+                            "id": item.document_id,
+                            "tenant_id": "default",
+                            "filename": item.filename,
+                            "content_type": item.content_type,
+                            "s3_bucket": settings.s3_bucket,
+                            "s3_key": item.s3_key,
+                            "file_sha256": item.sha256,
+                            "status": models.DocumentStatus.uploaded.value,
+                            "created_at": now,
+                        }
+                        for item in items[i : i + _STATEMENT_ROWS]
+                    ]
+                )
+                .on_conflict_do_nothing()
+                .returning(models.Document.id)
+            )
+            inserted.update(await session.scalars(stmt))
+        await session.commit()
+
+    lost = [item for item in items if item.document_id not in inserted]
+    if lost:
+        existing = await _existing_documents([item.sha256 for item in lost])
+        for item in lost:
+            item.document_id = existing[item.sha256].id
+            item.duplicate = True
+
+
+async def create_documents_bulk(uploads: Sequence[UploadFile]) -> BulkUploadResponse:
+    """Store many uploads (archives expanded) and queue the new ones as one batch."""
+    files = await asyncio.to_thread(_collect_files, uploads)
+    try:
+        existing = await _existing_documents([item.sha256 for item in files]) if files else {}
+
+        new_files: List[_BulkFile] = []
+        first_by_hash: Dict[str, _BulkFile] = {}
+        requeue: Dict[UUID, int] = {}
+        for item in files:
+            document = existing.get(item.sha256)
+            if document is not None:
+                item.document_id, item.duplicate = document.id, True
+                # Only documents still waiting for ingestion; never READY or RETIRED ones.
+                if document.status in (
+                    models.DocumentStatus.uploaded.value,
+                    models.DocumentStatus.failed.value,
+                ):
+                    requeue[document.id] = item.size_bytes
+            elif item.sha256 in first_by_hash:
+                item.duplicate = True
+            else:
+                first_by_hash[item.sha256] = item
+                item.s3_key = f"documents/{uuid4()}-{os.path.basename(item.filename)}"
+                new_files.append(item)
+
+        if new_files:
+            s3 = _get_s3_client()
+            await asyncio.to_thread(_ensure_bucket_exists, s3, settings.s3_bucket)
+            await _upload_all(s3, new_files)
+            try:
+                await _insert_documents(new_files)
+            except BaseException:
+                await _delete_objects(s3, new_files)
+                raise
+            await _delete_objects(s3, [item for item in new_files if item.duplicate])
+
+        for item in files:
+            if item.document_id is None:
+                item.document_id = first_by_hash[item.sha256].document_id
+
+        to_queue = [
+            (item.document_id, item.size_bytes) for item in new_files if not item.duplicate
+        ] + list(requeue.items())
+        batch_id = uuid4() if to_queue else None
+        if batch_id is not None:
+            await job_queue.enqueue_ingestion_batch(to_queue, batch_id=batch_id)
+    finally:
+        _close_files(files, uploads)
+
+    logger.info(
+        "Bulk upload files=%d new=%d duplicates=%d batch_id=%s",
+        len(files),
+        sum(not item.duplicate for item in files),
+        sum(item.duplicate for item in files),
+        batch_id,
+    )
+    return BulkUploadResponse(
+        batch_id=batch_id,
+        documents=[
+            BulkUploadItem(filename=item.filename, id=item.document_id, duplicate=item.duplicate)
+            for item in files
+        ],
+    )
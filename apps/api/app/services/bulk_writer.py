@@ -0,0 +1,169 @@
+"""
+Bulk persistence of ingested chunks and embeddings with COPY.
+
+Rows go through asyncpg's binary COPY (copy_records_to_table) in batches of
+bulk_write_batch_rows. There are no ORM objects and no bind-parameter limit,
+and vectors are sent in pgvector's binary format rather than as text.
+
+COPY runs on a dedicated asyncpg connection with its own `vector` codec. Pooled
+SQLAlchemy connections keep binding vectors as text, so registering a binary
+codec on them would change every other query. Ingestion opens one such
+connection per document (connect) and writes each batch's chunks and
+embeddings in a single transaction over it.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Iterable, List, Optional, Sequence
+from uuid import UUID
+import contextlib
+import logging
+import struct
+import time
+
+import asyncpg
+import numpy as np
+
+from ..core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class ParentRow:
+    id: UUID
+    document_id: UUID
+    page_start: int | None
+    page_end: int | None
+    char_start: int | None
+    char_end: int | None
+    text: str
+    chunk_hash: str
+
+
+@dataclass(slots=True)
+class ChildRow:
+    id: UUID
+    document_id: UUID
+    parent_id: UUID
+    page_start: int | None
+    page_end: int | None
+    char_start: int | None
+    char_end: int | None
+    text: str
+    chunk_hash: str
+
+
+_PARENT_COLUMNS = [
+    "id", "document_id", "page_start", "page_end", "char_start", "char_end",
+    "text", "chunk_hash", "created_at",
+]
+_CHILD_COLUMNS = [
+    "id", "document_id", "parent_id", "page_start", "page_end", "char_start",
+    "char_end", "text", "chunk_hash", "created_at",
+]
+_EMBEDDING_COLUMNS = ["child_chunk_id", "embedding", "model_name", "created_at"]
+
+
+def _encode_vector(value: Any) -> bytes:
+    # pgvector binary format: int16 dim, int16 unused, dim x float4 (big-endian).
+    array = np.asarray(value, dtype=">f4")
+    return struct.pack(">HH", array.shape[0], 0) + array.tobytes()
+
+
+def _decode_vector(data: bytes) -> np.ndarray:
+    dim, _ = struct.unpack_from(">HH", data)
+    return np.frombuffer(data, dtype=">f4", count=dim, offset=4).astype(np.float32)
+
+
+@contextlib.asynccontextmanager
+async def connect() -> AsyncIterator[asyncpg.Connection]:
+    """A COPY connection with the binary vector codec, closed on exit."""
+    conn = await asyncpg.connect(
+        user=settings.postgres_user,
+        password=settings.postgres_password,
+        host=settings.postgres_host,
+        port=settings.postgres_port,
+        database=settings.postgres_db,
+    )
+    try:
+        await conn.set_type_codec(
+            "vector",
+            schema="public",
+            encoder=_encode_vector,
+            decoder=_decode_vector,
+            format="binary",
+        )
+        yield conn
+    finally:
+        await conn.close()
+
+
+async def _copy(
+    conn: asyncpg.Connection,
+    table: str,
+    columns: List[str],
+    records: Sequence[tuple],
+) -> None:
+    batch_rows = max(settings.bulk_write_batch_rows, 1)
+    started = time.perf_counter()
+    for i in range(0, len(records), batch_rows):
+        await conn.copy_records_to_table(
+            table, records=records[i : i + batch_rows], columns=columns
+        )
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "COPY %s rows=%d seconds=%.3f rows_per_second=%.0f",
+        table,
+        len(records),
+        elapsed,
+        len(records) / elapsed if elapsed > 0 else 0.0,
+    )
+
+
+async def write_chunks(
+    conn: asyncpg.Connection,
+    parents: Sequence[ParentRow],
+    children: Sequence[ChildRow],
+    *,
+    embeddings: Optional[Iterable[Any]] = None,
+    model_name: str = "",
+) -> None:
+    """
+    Insert parent and child chunks (parents first, for the FK) and, if given, the
+    children's embeddings in one transaction. Child ids are new on every ingestion
+    attempt, so there is nothing to upsert.
+    """
+    now = datetime.now(timezone.utc)
+    async with conn.transaction():
+        await _copy(
+            conn,
+            "parent_chunks",
+            _PARENT_COLUMNS,
+            [
+                (p.id, p.document_id, p.page_start, p.page_end, p.char_start,
+                 p.char_end, p.text, p.chunk_hash, now)
+                for p in parents
+            ],
+        )
+        await _copy(
+            conn,
+            "child_chunks",
+            _CHILD_COLUMNS,
+            [
+                (c.id, c.document_id, c.parent_id, c.page_start, c.page_end,
+                 c.char_start, c.char_end, c.text, c.chunk_hash, now)
+                for c in children
+            ],
+        )
+        if embeddings is not None:
+            await _copy(
+                conn,
+                "chunk_embeddings",
+                _EMBEDDING_COLUMNS,
+                [
+                    (c.id, vector, model_name, now)
+                    for c, vector in zip(children, embeddings)
+                ],
+            )
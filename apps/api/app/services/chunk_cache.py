@@ -0,0 +1,125 @@
+"""
+Process-local cache of parent chunks and document metadata for the query path.
+
+Parent chunks never change once ingested, so after the first query touching a
+hot document its parents are served from memory. Eviction is LRU by the
+approximate byte size of entries (chunk_cache_max_bytes), which bounds memory
+however long the parent texts are.
+
+Invalidation: ingestion and deletion call invalidate_document in their own
+process. Other processes can't serve stale parents either. Re-ingestion gives
+parents new ids, and a deleted document has no child chunks left to reach its
+entries, so those entries just age out.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterable
+from uuid import UUID
+import sys
+import threading
+
+from ..core.config import get_settings
+from .cache import SizedLRUCache
+
+settings = get_settings()
+
+# Rough per-entry overhead: OrderedDict slot, key tuple, dataclass instance.
+_ENTRY_OVERHEAD_BYTES = 250
+
+
+@dataclass(slots=True)
+class CachedParent:
+    document_id: UUID
+    char_start: int | None
+    page_start: int | None
+    page_end: int | None
+    text: str
+
+
+@dataclass(slots=True)
+class CachedDocument:
+    filename: str
+    content_type: str
+    tenant_id: str
+
+
+def _entry_size(key: Hashable, value: Any) -> int:
+    if isinstance(value, CachedParent):
+        payload = sys.getsizeof(value.text)
+    else:
+        payload = sys.getsizeof(value.filename) + sys.getsizeof(value.content_type)
+    return payload + _ENTRY_OVERHEAD_BYTES
+
+
+class ChunkCache:
+    def __init__(self, *, max_bytes: int) -> None:
+        self._cache = SizedLRUCache(
+            max_bytes=max_bytes,
+            size_of=_entry_size,
+            on_evict=self._forget,
+        )
+        # document id -> cached parent ids, so a document can be invalidated.
+        self._parents_by_document: Dict[UUID, set[UUID]] = {}
+        self._index_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._cache.max_bytes > 0
+
+    def _forget(self, key: Hashable, value: Any) -> None:
+        if key[0] == "parent":
+            self._unindex(value.document_id, key[1])
+
+    def _unindex(self, document_id: UUID, parent_id: UUID) -> None:
+        with self._index_lock:
+            ids = self._parents_by_document.get(document_id)
+            if ids is not None:
+                ids.discard(parent_id)
+                if not ids:
+                    del self._parents_by_document[document_id]
+
+    def get_parents(self, parent_ids: Iterable[UUID]) -> Dict[UUID, CachedParent]:
+        found: Dict[UUID, CachedParent] = {}
+        for parent_id in parent_ids:
+            value = self._cache.get(("parent", parent_id))
+            if value is not None:
+                found[parent_id] = value
+        return found
+
+    def get_documents(self, document_ids: Iterable[UUID]) -> Dict[UUID, CachedDocument]:
+        found: Dict[UUID, CachedDocument] = {}
+        for document_id in document_ids:
+            value = self._cache.get(("document", document_id))
+            if value is not None:
+                found[document_id] = value
+        return found
+
+    def put_parent(self, parent_id: UUID, parent: CachedParent) -> None:
+        if not self.enabled:
+            return
+        # Indexed before it is stored, so invalidate_document never misses a
+        # cached parent; taken back out if the cache rejects the entry.
+        with self._index_lock:
+            self._parents_by_document.setdefault(parent.document_id, set()).add(parent_id)
+        if not self._cache.set(("parent", parent_id), parent):
+            self._unindex(parent.document_id, parent_id)
+
+    def put_document(self, document_id: UUID, document: CachedDocument) -> None:
+        if self.enabled:
+            self._cache.set(("document", document_id), document)
+
+    def invalidate_document(self, document_id: UUID) -> None:
+        with self._index_lock:
+            parent_ids = self._parents_by_document.pop(document_id, set())
+        for parent_id in parent_ids:
+            self._cache.discard(("parent", parent_id))
+        self._cache.discard(("document", document_id))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            **self._cache.stats(),
+            "documents_indexed": len(self._parents_by_document),
+        }
+
+
+chunk_cache = ChunkCache(max_bytes=settings.chunk_cache_max_bytes)
@@ -0,0 +1,182 @@
+"""
+Content-addressed chunk store (chunk_store = "content_addressed").
+
+Identical child text (legal boilerplate, headers, repeated appendices) is
+stored, embedded and indexed once per chunk_hash instead of once per document:
+
+- chunk_contents holds the text and embedding of each distinct child chunk, and
+  is what the ANN index covers (see db.vector_index).
+- child_chunks rows keep their positions (document, parent, offsets, pages)
+  and the chunk_hash, with an empty text.
+- OpenSearch holds one document per chunk_hash with the ids of the documents
+  that reference it (see opensearch_index.index_shared_chunks).
+
+Retrieval ranks distinct hashes, reranks each text once and then expands it to
+every referencing document that passes the document_ids filter (see
+hydration.hydrate_chunk_hashes).
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Set
+import time
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import get_settings
+from ..db import models
+from ..db.session import async_session
+from .embedding_cache import EmbeddingCacheStats
+from .embeddings import embed_texts
+
+settings = get_settings()
+
+# Keep statements well under asyncpg's 32767 bind-parameter limit.
+_LOOKUP_BATCH = 5000
+_STORE_BATCH = 2000
+
+# Unreferenced contents go in the same transaction as the child rows that
+# referenced them (which sees its own deletes). The rows are locked first and
+# the DELETE re-checks references with a fresh snapshot, so a writer that
+# committed new references meanwhile keeps them; a writer that locks them
+# after the delete sees them gone and stores them again (see store_contents).
+# Both sides lock in chunk_hash order, so they can't deadlock.
+_LOCK_CONTENTS_FOR_DELETE = text(
+    """
+    SELECT chunk_hash FROM chunk_contents
+    WHERE chunk_hash = ANY(CAST(:hashes AS varchar[]))
+    ORDER BY chunk_hash
+    FOR UPDATE
+    """
+)
+_DELETE_UNREFERENCED = text(
+    """
+    DELETE FROM chunk_contents AS cc
+    WHERE cc.chunk_hash = ANY(CAST(:hashes AS varchar[]))
+      AND NOT EXISTS (SELECT 1 FROM child_chunks c WHERE c.chunk_hash = cc.chunk_hash)
+    """
+)
+
+
+def enabled() -> bool:
+    return settings.chunk_store == "content_addressed"
+
+
+async def _stored_hashes(
+    session: AsyncSession, hashes: Sequence[str], *, lock: bool
+) -> Set[str]:
+    """
+    Hashes that already have contents embedded with the current model. With
+    lock, they are locked (FOR KEY SHARE) until the session commits, so they
+    can't be collected meanwhile.
+    """
+    ordered = sorted(hashes)
+    found: Set[str] = set()
+    for i in range(0, len(ordered), _LOOKUP_BATCH):
+        stmt = (
+            select(models.ChunkContent.chunk_hash)
+            .where(
+                models.ChunkContent.model_name == settings.embedding_model_name,
+                models.ChunkContent.chunk_hash.in_(ordered[i : i + _LOOKUP_BATCH]),
+            )
+            .order_by(models.ChunkContent.chunk_hash)
+        )
+        if lock:
+            stmt = stmt.with_for_update(read=True, key_share=True)
+        found.update(await session.scalars(stmt))
+    return found
+
+
+async def store_contents(texts: Dict[str, str]) -> EmbeddingCacheStats:
+    """
+    Make sure every chunk_hash -> text has its chunk_contents row. Only hashes
+    without one (for the current embedding model) are embedded; vectors of known
+    hashes are never read back.
+
+    Embedding runs outside any transaction. A short one then locks the existing
+    rows, re-checks which hashes are still missing and inserts those, so
+    concurrent ingestions never wait on each other's inference.
+
+    Call it after the child rows referencing the hashes have committed: the
+    existing rows stay locked until the new ones are written, so a concurrent
+    remove_unreferenced either sees those references or has already deleted the
+    rows, which are then stored again.
+    """
+    stats = EmbeddingCacheStats(total=len(texts), unique=len(texts))
+    if not texts:
+        return stats
+
+    async with async_session() as session:
+        stored = await _stored_hashes(session, list(texts), lock=False)
+    vectors: Dict[str, Any] = {}
+    while True:
+        to_embed = [h for h in texts if h not in stored and h not in vectors]
+        if to_embed:
+            started = time.perf_counter()
+            vectors.update(zip(to_embed, await embed_texts([texts[h] for h in to_embed])))
+            stats.encode_seconds += time.perf_counter() - started
+
+        async with async_session() as session:
+            stored = await _stored_hashes(session, list(texts), lock=True)
+            if any(h not in stored and h not in vectors for h in texts):
+                # Collected since the first check; embed those too and try again.
+                await session.rollback()
+                continue
+            missing = [h for h in texts if h not in stored]
+            await _insert_contents(session, texts, missing, vectors)
+            await session.commit()
+            break
+
+    stats.hits = len(texts) - len(vectors)
+    stats.misses = len(vectors)
+    if vectors:
+        stats.saved_seconds = stats.hits * stats.encode_seconds / len(vectors)
+    return stats
+
+
+async def _insert_contents(
+    session: AsyncSession,
+    texts: Dict[str, str],
+    missing: Sequence[str],
+    vectors: Dict[str, Any],
+) -> None:
+    now = datetime.utcnow()
+    for i in range(0, len(missing), _STORE_BATCH):
+        stmt = pg_insert(models.ChunkContent).values(
+            [
+                {
+                    "chunk_hash": chunk_hash,
+                    "text": texts[chunk_hash],
+                    "embedding": vectors[chunk_hash],
+                    "model_name": settings.embedding_model_name,
+                    "created_at": now,
+                }
+                for chunk_hash in missing[i : i + _STORE_BATCH]
+            ]
+        )
+        # Rows embedded with another model are replaced; for rows a concurrent
+        # writer of the same text (same model) inserted first this does nothing.
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[models.ChunkContent.chunk_hash],
+                set_={
+                    "embedding": stmt.excluded.embedding,
+                    "model_name": stmt.excluded.model_name,
+                    "created_at": stmt.excluded.created_at,
+                },
+                where=models.ChunkContent.model_name != stmt.excluded.model_name,
+            )
+        )
+
+
+async def remove_unreferenced(session: AsyncSession, hashes: Sequence[str]) -> int:
+    """Delete contents of the given hashes that no child chunk references any more."""
+    unique: List[str] = list(set(hashes))
+    if not unique:
+        return 0
+    locked = list(await session.scalars(_LOCK_CONTENTS_FOR_DELETE, {"hashes": unique}))
+    if not locked:
+        return 0
+    result = await session.execute(_DELETE_UNREFERENCED, {"hashes": locked})
+    return result.rowcount or 0
@@ -1,6 +1,7 @@
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
 from hashlib import sha256
-from typing import List, Sequence, Tuple
+from typing import AsyncIterable, AsyncIterator, List, Sequence, Tuple
 
 
 def _find_page_range(
@@ -8,19 +9,20 @@ def _find_page_range(
     char_start: int,
     char_end: int,
 ) -> tuple[int, int]:
-    # page_offsets: (page_no, start, end) in the concatenated text space
+    # page_offsets: (page_no, start, end) in the concatenated text space, in order,
+    # so starts and ends are both non-decreasing and can be bisected.
     page_start = page_offsets[0][0] if page_offsets else 1
     page_end = page_offsets[-1][0] if page_offsets else 1
 
-    for page_no, start, end in page_offsets:
-        if end > char_start:
-            page_start = page_no
-            break
+    # First page ending after char_start.
+    i = bisect_right(page_offsets, char_start, key=lambda p: p[2])
+    if i < len(page_offsets):
+        page_start = page_offsets[i][0]
 
-    for page_no, start, end in reversed(page_offsets):
-        if start < char_end:
-            page_end = page_no
-            break
+    # Last page starting before char_end.
+    i = bisect_left(page_offsets, char_end, key=lambda p: p[1]) - 1
+    if i >= 0:
+        page_end = page_offsets[i][0]
 
     return page_start, page_end
 
@@ -35,7 +37,8 @@ class ChunkData:
     chunk_hash: str
 
 
-def _hash_text(text: str) -> str:
+def hash_text(text: str) -> str:
+    """chunk_hash of a text (also keys the embedding and rerank score caches)."""
     return sha256(text.encode("utf-8")).hexdigest()
 
 
@@ -87,7 +90,7 @@ def simple_chunk(
                     page_end=page_end,
                     char_start=start,
                     char_end=end,
-                    chunk_hash=_hash_text(text),
+                    chunk_hash=hash_text(text),
                 )
             )
         start += step
@@ -95,6 +98,76 @@ def simple_chunk(
     return chunks
 
 
+async def iter_chunks(
+    pages: AsyncIterable[Tuple[int, str]],
+    max_chars: int = 2000,
+    overlap_chars: int = 200,
+) -> AsyncIterator[ChunkData]:
+    """
+    Streaming simple_chunk: yields the same chunks while pages are still arriving.
+
+    Only the text from the current window onwards is buffered, so memory is bounded
+    by the page and window sizes, not the document. Consecutive pieces with the same
+    page number are one page (joined without the "\n" page separator), so a parser
+    may stream a long page in parts.
+    """
+    step = max(max_chars - overlap_chars, 1)
+    buffer = ""
+    buffer_offset = 0  # global char offset of buffer[0]
+    page_offsets: List[tuple[int, int, int]] = []
+    cursor = 0  # global length of the text seen so far
+    start = 0
+
+    def window(end: int) -> ChunkData | None:
+        text = buffer[start - buffer_offset : end - buffer_offset]
+        if not text.strip():
+            return None
+        page_start, page_end = _find_page_range(page_offsets, start, end)
+        return ChunkData(
+            text=text,
+            page_start=page_start,
+            page_end=page_end,
+            char_start=start,
+            char_end=end,
+            chunk_hash=hash_text(text),
+        )
+
+    async for page_no, text in pages:
+        if not isinstance(text, str):
+            text = str(text)
+        if page_offsets and page_offsets[-1][0] == page_no:
+            buffer += text
+            cursor += len(text)
+            page_offsets[-1] = (page_no, page_offsets[-1][1], cursor)
+        else:
+            if page_offsets:
+                buffer += "\n"
+                cursor += 1
+            buffer += text
+            page_offsets.append((page_no, cursor, cursor + len(text)))
+            cursor += len(text)
+
+        while start + max_chars <= cursor:
+            chunk = window(start + max_chars)
+            if chunk is not None:
+                yield chunk
+            start += step
+
+        # Drop text before the next window and pages that can no longer matter
+        # (the last one ending before it is kept for _find_page_range).
+        if start > buffer_offset:
+            buffer = buffer[min(start, cursor) - buffer_offset :]
+            buffer_offset = min(start, cursor)
+        while len(page_offsets) > 1 and page_offsets[1][2] <= start:
+            page_offsets.pop(0)
+
+    while start < cursor:
+        chunk = window(min(start + max_chars, cursor))
+        if chunk is not None:
+            yield chunk
+        start += step
+
+
 def chunk_text_block(
     text: str,
     *,
@@ -126,7 +199,7 @@ def chunk_text_block(
                     page_end=page_end,
                     char_start=base_char_start + start,
                     char_end=base_char_start + end,
-                    chunk_hash=_hash_text(part),
+                    chunk_hash=hash_text(part),
                 )
             )
         start += step
@@ -0,0 +1,26 @@
+"""
+Corpus generation counter, shared by every process through a Postgres sequence.
+
+Any change to the searchable corpus bumps it, so results derived from the old
+corpus (cached answers) can be recognised as stale. Bump only after the change
+is committed: a reader that sees the new generation must also see the new data.
+"""
+
+from sqlalchemy import text
+
+from ..db.session import async_session
+
+
+async def current_generation() -> int:
+    async with async_session() as session:
+        value = await session.scalar(
+            text("SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM corpus_generation")
+        )
+    return int(value or 0)
+
+
+async def bump_generation() -> int:
+    # nextval() is not transactional, so no commit is needed.
+    async with async_session() as session:
+        value = await session.scalar(text("SELECT nextval('corpus_generation')"))
+    return int(value)
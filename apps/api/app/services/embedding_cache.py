@@ -0,0 +1,128 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Sequence, Tuple
+import time
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..core.config import get_settings
+from ..db import models
+from ..db.session import async_session
+from .embeddings import embed_texts
+
+settings = get_settings()
+
+# Keep statements well under asyncpg's 32767 bind-parameter limit.
+_LOOKUP_BATCH = 5000
+_STORE_BATCH = 2000
+
+# Running estimate of encode cost per text, used to report time saved on documents
+# that were (almost) fully cached and so had nothing to measure themselves.
+_seconds_per_text: float | None = None
+
+
+@dataclass
+class EmbeddingCacheStats:
+    total: int = 0
+    unique: int = 0
+    hits: int = 0
+    misses: int = 0
+    encode_seconds: float = 0.0
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.unique if self.unique else 0.0
+
+    def add(self, other: "EmbeddingCacheStats") -> None:
+        """Accumulate another batch's stats (unique is then counted per batch)."""
+        self.total += other.total
+        self.unique += other.unique
+        self.hits += other.hits
+        self.misses += other.misses
+        self.encode_seconds += other.encode_seconds
+        self.saved_seconds += other.saved_seconds
+
+
+async def _lookup(hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+    found: Dict[str, np.ndarray] = {}
+    async with async_session() as session:
+        for i in range(0, len(hashes), _LOOKUP_BATCH):
+            batch = list(hashes[i : i + _LOOKUP_BATCH])
+            rows = await session.execute(
+                select(
+                    models.EmbeddingCacheEntry.chunk_hash,
+                    models.EmbeddingCacheEntry.embedding,
+                ).where(
+                    models.EmbeddingCacheEntry.model_name == settings.embedding_model_name,
+                    models.EmbeddingCacheEntry.chunk_hash.in_(batch),
+                )
+            )
+            for chunk_hash, embedding in rows:
+                found[chunk_hash] = embedding
+    return found
+
+
+async def _store(entries: Sequence[Tuple[str, np.ndarray]]) -> None:
+    if not entries:
+        return
+    now = datetime.utcnow()
+    async with async_session() as session:
+        for i in range(0, len(entries), _STORE_BATCH):
+            values = [
+                {
+                    "chunk_hash": chunk_hash,
+                    "model_name": settings.embedding_model_name,
+                    "embedding": vec,
+                    "created_at": now,
+                }
+                for chunk_hash, vec in entries[i : i + _STORE_BATCH]
+            ]
+            stmt = pg_insert(models.EmbeddingCacheEntry).values(values)
+            await session.execute(stmt.on_conflict_do_nothing())
+        await session.commit()
+
+
+async def embed_texts_cached(
+    texts: Sequence[str],
+    hashes: Sequence[str],
+) -> Tuple[List[np.ndarray], EmbeddingCacheStats]:
+    """
+    Embed texts, reusing cached vectors keyed by (chunk_hash, embedding model).
+
+    All hashes are looked up in bulk first; only cache misses (deduplicated by hash)
+    are sent to the model, and their vectors are written back to the cache.
+    """
+    global _seconds_per_text
+
+    stats = EmbeddingCacheStats(total=len(texts))
+    if not texts:
+        return [], stats
+
+    text_by_hash: Dict[str, str] = {}
+    for text, chunk_hash in zip(texts, hashes):
+        text_by_hash.setdefault(chunk_hash, text)
+    stats.unique = len(text_by_hash)
+
+    vectors = await _lookup(list(text_by_hash))
+    stats.hits = len(vectors)
+
+    miss_hashes = [h for h in text_by_hash if h not in vectors]
+    stats.misses = len(miss_hashes)
+    if miss_hashes:
+        started = time.perf_counter()
+        miss_vectors = await embed_texts([text_by_hash[h] for h in miss_hashes])
+        stats.encode_seconds = time.perf_counter() - started
+        _seconds_per_text = stats.encode_seconds / len(miss_hashes)
+
+        new_entries = list(zip(miss_hashes, miss_vectors))
+        vectors.update(new_entries)
+        await _store(new_entries)
+
+    if _seconds_per_text is not None:
+        # Duplicates within the document are saved encodes too.
+        stats.saved_seconds = (stats.total - stats.misses) * _seconds_per_text
+
+    return [vectors[h] for h in hashes], stats
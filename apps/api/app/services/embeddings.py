@@ -1,9 +1,11 @@
 from typing import List
-import asyncio
 
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
 from ..core.config import get_settings
+from .batcher import MicroBatcher
+from .query_cache import normalize_text, query_embedding_cache
 
 settings = get_settings()
 
@@ -17,26 +19,66 @@ def _get_model() -> SentenceTransformer:
     return _model
 
 
-async def embed_texts(texts: List[str]) -> List[list[float]]:
-    """
-    Embed a batch of texts using a local SentenceTransformer model.
-    """
+def token_lengths(texts: List[str]) -> List[int]:
+    """Token counts under the embedding model's tokenizer (without special tokens)."""
     if not texts:
         return []
+    encoded = _get_model().tokenizer(list(texts), add_special_tokens=False, verbose=False)
+    return [len(ids) for ids in encoded["input_ids"]]
 
+
+def max_input_tokens() -> int:
+    """Longest text, in tokens, that the model embeds without truncating it."""
     model = _get_model()
-    # Run blocking encode in a thread to avoid blocking the event loop.
-    embeddings = await asyncio.to_thread(
-        model.encode,
+    return model.max_seq_length - model.tokenizer.num_special_tokens_to_add()
+
+
+def _encode(texts: List[str]):
+    return _get_model().encode(
         texts,
         convert_to_numpy=True,
         show_progress_bar=False,
         batch_size=settings.embedding_batch_size,
     )
-    # embeddings is a 2D numpy array (len(texts), dim)
-    return embeddings.tolist()
+
+
+# Concurrent callers (e.g. many /query requests) share one forward pass.
+_batcher = MicroBatcher(
+    _encode,
+    max_batch_items=settings.embedding_batch_max_items,
+    max_wait_ms=settings.inference_batch_max_wait_ms,
+    name="embedder",
+)
+
+
+def batcher_stats() -> dict:
+    return _batcher.stats()
+
+
+async def embed_texts(texts: List[str]) -> List[np.ndarray]:
+    """
+    Embed a batch of texts using a local SentenceTransformer model.
+
+    Calls are coalesced with other concurrent callers by a micro-batcher; the
+    encode itself runs in a thread to avoid blocking the event loop.
+
+    Rows are returned as float32 numpy arrays of shape (dim,): pgvector binds
+    them directly, and they are ~8x smaller than Python float lists.
+    """
+    if not texts:
+        return []
+
+    rows = await _batcher.submit(list(texts))
+    return [np.asarray(row, dtype=np.float32) for row in rows]
 
 
 async def embed_query(text: str) -> list[float]:
-    (vector,) = await embed_texts([text])
+    """Embed a query string, reusing cached vectors for repeated queries."""
+    key = f"{settings.embedding_model_name}|{normalize_text(text)}"
+    vector = await query_embedding_cache.get(key)
+    if vector is None:
+        (row,) = await embed_texts([text])
+        # Plain list: the shared cache tier stores it as JSON.
+        vector = row.tolist()
+        await query_embedding_cache.set(key, vector)
     return vector
@@ -1,15 +1,18 @@
-from typing import List, Tuple
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, List, Tuple
 import re
 
 import logging
-import httpx
 
 from ..core.config import get_settings
 from ..schemas.query import Citation
+from . import llm_client
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+_MARKER_RE = re.compile(r"\[P(\d+)\]")
+
 
 def _truncate(s: str, limit: int) -> str:
     if s is None:
@@ -34,6 +37,17 @@ def _build_context(chunks: List, max_chunks: int, max_chars: int) -> str:
     return "\n\n".join(parts)
 
 
+def citation_for(chunk) -> Citation:
+    return Citation(
+        document_id=getattr(chunk, "document_id"),
+        filename=getattr(chunk, "filename", "document"),
+        page_start=getattr(chunk, "page_start", None),
+        page_end=getattr(chunk, "page_end", None),
+        excerpt=(getattr(chunk, "text", "") or "")[:300],
+        chunk_id=getattr(chunk, "chunk_id"),
+    )
+
+
 def _fallback_answer(chunks: List) -> Tuple[str, List[Citation]]:
     """Simple non-LLM answer: just stitch top chunks."""
     if not chunks:
@@ -43,32 +57,48 @@ def _fallback_answer(chunks: List) -> Tuple[str, List[Citation]]:
     citations: List[Citation] = []
     for idx, chunk in enumerate(chunks[: settings.max_parent_chunks_for_llm], start=1):
         marker = f"[P{idx}]"
-        excerpt = (getattr(chunk, "text", "") or "")[:300]
-        answer_parts.append(f"{marker} {excerpt}")
-        citations.append(
-            Citation(
-                document_id=getattr(chunk, "document_id"),
-                filename=getattr(chunk, "filename", "document"),
-                page_start=getattr(chunk, "page_start", None),
-                page_end=getattr(chunk, "page_end", None),
-                excerpt=excerpt,
-                chunk_id=getattr(chunk, "chunk_id"),
-            )
-        )
+        citation = citation_for(chunk)
+        answer_parts.append(f"{marker} {citation.excerpt}")
+        citations.append(citation)
     return "\n\n".join(answer_parts), citations
 
 
-async def generate_answer_with_citations(
-    question: str,
-    chunks: List,
-) -> Tuple[str, List[Citation]]:
+class CitationTracker:
     """
-    Use a local LLM (via Ollama-compatible API) to generate a grounded answer with citations.
-    Falls back to a simple stitched answer if the LLM is unavailable or times out.
+    Resolves [P#] markers into citations while an answer is still streaming.
+
+    Tokens may split a marker ("[P", "1]"), so scanning resumes from the last
+    unterminated "[" on each feed.
     """
-    if not chunks:
-        return "I could not find relevant information.", []
 
+    def __init__(self, chunks: List) -> None:
+        self.chunks = chunks
+        self.text = ""
+        self._scan_from = 0
+        self._cited: set[int] = set()
+
+    def feed(self, token: str) -> List[Tuple[int, Citation]]:
+        """Append a token; returns (marker index, citation) for newly cited chunks."""
+        self.text += token
+        new: List[Tuple[int, Citation]] = []
+        for match in _MARKER_RE.finditer(self.text, self._scan_from):
+            self._scan_from = match.end()
+            idx = int(match.group(1))
+            if 1 <= idx <= len(self.chunks) and idx not in self._cited:
+                self._cited.add(idx)
+                new.append((idx, citation_for(self.chunks[idx - 1])))
+        open_bracket = self.text.rfind("[", self._scan_from)
+        self._scan_from = open_bracket if open_bracket != -1 else len(self.text)
+        return new
+
+    def final_citations(self) -> List[Citation]:
+        """Cited chunks in marker order; the top chunk if the model cited nothing."""
+        if not self._cited:
+            return [citation_for(self.chunks[0])] if self.chunks else []
+        return [citation_for(self.chunks[idx - 1]) for idx in sorted(self._cited)]
+
+
+def _build_messages(question: str, chunks: List) -> List[dict]:
     context_text = _build_context(
         chunks,
         max_chunks=settings.max_parent_chunks_for_llm,
@@ -86,7 +116,7 @@ async def generate_answer_with_citations(
         "- Do not invent IDs; only use the ones you see in the context.\n"
     )
 
-    messages = [
+    return [
         {"role": "system", "content": system_prompt},
         {
             "role": "user",
@@ -98,75 +128,113 @@ async def generate_answer_with_citations(
         },
     ]
 
+
+def _log_request(messages: List[dict], *, stream: bool) -> None:
+    if settings.debug_prompts:
+        payload_preview = {
+            "model": settings.local_llm_model,
+            "messages": [
+                {"role": m["role"], "content": _truncate(m["content"], settings.debug_max_chars)}
+                for m in messages
+            ],
+            "stream": stream,
+        }
+        logger.info("Ollama request (truncated): %s", payload_preview)
+
+
+@dataclass
+class GeneratedAnswer:
+    answer: str
+    citations: List[Citation]
+    # False for the stitched fallback (LLM unavailable); such answers aren't cached.
+    from_llm: bool
+
+
+async def generate_answer(question: str, chunks: List) -> GeneratedAnswer:
+    """
+    Use a local LLM (via Ollama-compatible API) to generate a grounded answer with citations.
+    Falls back to a simple stitched answer if the LLM is unavailable or times out.
+    """
+    if not chunks:
+        return GeneratedAnswer("I could not find relevant information.", [], from_llm=False)
+
+    messages = _build_messages(question, chunks)
+
     try:
-        if settings.debug_prompts:
-            payload_preview = {
-                "model": settings.local_llm_model,
-                "messages": [
-                    {"role": m["role"], "content": _truncate(m["content"], settings.debug_max_chars)}
-                    for m in messages
-                ],
-                "stream": False,
-            }
-            logger.info("Ollama request (truncated): %s", payload_preview)
-
-        async with httpx.AsyncClient(
-            base_url=settings.local_llm_base_url,
-            timeout=httpx.Timeout(300.0),
-        ) as client:
-            resp = await client.post(
-                "/api/chat",
-                json={
-                    "model": settings.local_llm_model,
-                    "messages": messages,
-                    "stream": False,
-                },
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            # Ollama-style response: {"message": {"role": "assistant", "content": "..."}}
-            answer = data.get("message", {}).get("content", "") or ""
+        _log_request(messages, stream=False)
+
+        answer = await llm_client.chat(messages)
     except Exception:
         # On any error (timeout, connection issue, etc.), fall back to stitched chunks.
-        return _fallback_answer(chunks)
+        return GeneratedAnswer(*_fallback_answer(chunks), from_llm=False)
 
-    # Extract which chunk IDs were cited.
-    used_indices: set[int] = set()
-    for match in re.finditer(r"\[P(\d+)\]", answer):
-        try:
-            idx = int(match.group(1))
-            if 1 <= idx <= len(chunks):
-                used_indices.add(idx)
-        except ValueError:
-            continue
+    tracker = CitationTracker(chunks)
+    tracker.feed(answer)
+    return GeneratedAnswer(answer, tracker.final_citations(), from_llm=True)
 
-    citations: List[Citation] = []
-    for idx in sorted(used_indices):
-        chunk = chunks[idx - 1]
-        excerpt = (getattr(chunk, "text", "") or "")[:300]
-        citations.append(
-            Citation(
-                document_id=getattr(chunk, "document_id"),
-                filename=getattr(chunk, "filename", "document"),
-                page_start=getattr(chunk, "page_start", None),
-                page_end=getattr(chunk, "page_end", None),
-                excerpt=excerpt,
-                chunk_id=getattr(chunk, "chunk_id"),
-            )
-        )
 
-    # If the model did not include any citations, fall back to top-1 chunk.
-    if not citations and chunks:
-        chunk = chunks[0]
-        citations.append(
-            Citation(
-                document_id=getattr(chunk, "document_id"),
-                filename=getattr(chunk, "filename", "document"),
-                page_start=getattr(chunk, "page_start", None),
-                page_end=getattr(chunk, "page_end", None),
-                excerpt=(getattr(chunk, "text", "") or "")[:300],
-                chunk_id=getattr(chunk, "chunk_id"),
-            )
-        )
+async def generate_answer_with_citations(
+    question: str,
+    chunks: List,
+) -> Tuple[str, List[Citation]]:
+    """generate_answer, as an (answer, citations) pair."""
+    result = await generate_answer(question, chunks)
+    return result.answer, result.citations
+
+
+async def stream_answer_tokens(question: str, chunks: List) -> AsyncIterator[str]:
+    """
+    Stream answer tokens from the local LLM as they are generated.
+
+    Raises on connection/HTTP errors; callers decide how to fall back (nothing
+    has been yielded yet if the request itself failed).
+    """
+    messages = _build_messages(question, chunks)
+    _log_request(messages, stream=True)
+
+    async for token in llm_client.chat_stream(messages):
+        yield token
+
+
+async def stream_answer_with_citations(
+    question: str,
+    chunks: List,
+) -> AsyncIterator[Tuple[str, dict[str, Any]]]:
+    """
+    Streaming counterpart of generate_answer_with_citations; yields (event, data):
+    - "context": every chunk as a candidate citation, tagged P1..Pn, before generation
+    - "token": answer text as the LLM produces it
+    - "citation": a chunk the answer just cited (first [P#] occurrence)
+    - "done": the full answer and final citations (stitched fallback if the LLM
+      failed before producing any text)
+    """
+    yield "context", {
+        "chunks": [
+            {"marker": f"P{idx}", **citation_for(chunk).model_dump(mode="json")}
+            for idx, chunk in enumerate(chunks[: settings.max_parent_chunks_for_llm], start=1)
+        ]
+    }
+
+    tracker = CitationTracker(chunks)
+    try:
+        async for token in stream_answer_tokens(question, chunks):
+            yield "token", {"text": token}
+            for idx, citation in tracker.feed(token):
+                yield "citation", {"marker": f"P{idx}", **citation.model_dump(mode="json")}
+    except Exception:
+        logger.warning("LLM stream failed after %d chars", len(tracker.text), exc_info=True)
+        if not tracker.text:
+            answer, citations = _fallback_answer(chunks)
+            yield "token", {"text": answer}
+            yield "done", {
+                "answer": answer,
+                "citations": [c.model_dump(mode="json") for c in citations],
+                "fallback": True,
+            }
+            return
 
-    return answer, citations
+    yield "done", {
+        "answer": tracker.text,
+        "citations": [c.model_dump(mode="json") for c in tracker.final_citations()],
+        "fallback": False,
+    }
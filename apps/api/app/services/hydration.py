@@ -0,0 +1,302 @@
+"""
+Candidate hydration for the query path.
+
+One query loads every merged candidate child chunk together with its parent and
+document. Only the needed columns are selected, and rows come back as plain
+tuples instead of ORM entities. With hydrate_slice_in_sql, Postgres also cuts
+the parent text down to the LLM window around each child, so full parent texts
+never cross the wire.
+
+When the chunk cache is enabled (chunk_cache_max_bytes > 0), only the child
+rows are always read. Parents and documents come from the cache, and only
+misses are fetched, as whole parents so they can be cached.
+
+With the content-addressed chunk_store, candidates are chunk hashes;
+hydrate_chunk_hashes expands each one to its referencing child chunks first.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import Integer, cast, func, select
+
+from ..core.config import get_settings
+from ..db import models
+from ..db.session import async_session
+from .chunk_cache import CachedDocument, CachedParent, chunk_cache
+
+settings = get_settings()
+
+
+@dataclass(slots=True)
+class HydratedChild:
+    id: str
+    text: str
+    chunk_hash: str
+    parent_id: UUID
+    document_id: UUID
+    filename: str
+    # Pages of the parent chunk (what the LLM context cites).
+    page_start: int | None
+    page_end: int | None
+    # Parent text window around this child, at most max_parent_chunk_chars_for_llm.
+    window: str
+
+
+def _slice_window(
+    text: str,
+    *,
+    rel_start: int,
+    rel_end: int,
+    window_chars: int,
+) -> str:
+    """
+    Extract a window of text around a relevant span so the LLM sees the part
+    that triggered retrieval (avoids truncation hiding the answer).
+    """
+    if not text:
+        return ""
+
+    rel_start = max(rel_start, 0)
+    rel_end = max(rel_end, rel_start)
+    span_center = (rel_start + rel_end) // 2
+
+    half = max(window_chars // 2, 1)
+    start = max(span_center - half, 0)
+    end = min(start + window_chars, len(text))
+    start = max(end - window_chars, 0)
+    snippet = text[start:end]
+    return snippet.strip()
+
+
+def _sql_window(window_chars: int):
+    """_slice_window as a SQL expression (same arithmetic; substr is 1-based)."""
+    child, parent = models.ChildChunk, models.ParentChunk
+    parent_start = func.coalesce(parent.char_start, 0)
+    rel_start = func.greatest(func.coalesce(child.char_start, 0) - parent_start, 0)
+    rel_end = func.greatest(func.coalesce(child.char_end, 0) - parent_start, rel_start)
+    # Operands are non-negative, so floor division matches Python's "//"; the cast
+    # keeps every argument of substr() an integer (FLOOR returns double precision).
+    center = cast((rel_start + rel_end) // 2, Integer)
+    half = max(window_chars // 2, 1)
+    start = func.greatest(center - half, 0)
+    end = func.least(start + window_chars, func.char_length(parent.text))
+    start = func.greatest(end - window_chars, 0)
+    return func.substr(parent.text, start + 1, end - start)
+
+
+async def hydrate_children(child_ids: Sequence[UUID]) -> Dict[str, HydratedChild]:
+    """Load candidate child chunks with their parent window, keyed by child id string."""
+    if not child_ids:
+        return {}
+    if chunk_cache.enabled:
+        return await _hydrate_with_cache(child_ids)
+
+    child, parent, document = models.ChildChunk, models.ParentChunk, models.Document
+    window_chars = settings.max_parent_chunk_chars_for_llm
+    slice_in_sql = settings.hydrate_slice_in_sql
+
+    stmt = (
+        select(
+            child.id,
+            child.text,
+            child.chunk_hash,
+            child.parent_id,
+            child.document_id,
+            document.filename,
+            parent.page_start,
+            parent.page_end,
+            _sql_window(window_chars) if slice_in_sql else parent.text,
+            child.char_start,
+            child.char_end,
+            parent.char_start,
+        )
+        .join(parent, child.parent_id == parent.id)
+        .join(document, child.document_id == document.id)
+        .where(child.id.in_(list(child_ids)))
+    )
+
+    async with async_session() as session:
+        rows = (await session.execute(stmt)).all()
+
+    hydrated: Dict[str, HydratedChild] = {}
+    for (
+        cid,
+        text,
+        chunk_hash,
+        parent_id,
+        document_id,
+        filename,
+        page_start,
+        page_end,
+        parent_text,
+        char_start,
+        char_end,
+        parent_char_start,
+    ) in rows:
+        if slice_in_sql:
+            window = (parent_text or "").strip()
+        else:
+            window = _slice_window(
+                parent_text or "",
+                rel_start=(char_start or 0) - (parent_char_start or 0),
+                rel_end=(char_end or 0) - (parent_char_start or 0),
+                window_chars=window_chars,
+            )
+        hydrated[str(cid)] = HydratedChild(
+            id=str(cid),
+            text=text,
+            chunk_hash=chunk_hash,
+            parent_id=parent_id,
+            document_id=document_id,
+            filename=filename,
+            page_start=page_start,
+            page_end=page_end,
+            window=window,
+        )
+    return hydrated
+
+
+async def hydrate_chunk_hashes(
+    chunk_hashes: Sequence[str],
+    *,
+    document_ids: Optional[Sequence[UUID]] = None,
+    per_hash: int,
+) -> Dict[str, List[HydratedChild]]:
+    """
+    Content-addressed store: expand candidate hashes to the child chunks that
+    reference them (in document_ids only, if given), at most per_hash each in
+    document order, hydrated as usual but with the shared text.
+    """
+    if not chunk_hashes:
+        return {}
+    child, content = models.ChildChunk, models.ChunkContent
+
+    rank = func.row_number().over(
+        partition_by=child.chunk_hash,
+        order_by=(child.document_id, child.char_start),
+    )
+    refs = select(child.id, child.chunk_hash, rank.label("rank")).where(
+        child.chunk_hash.in_(list(chunk_hashes))
+    )
+    if document_ids:
+        refs = refs.where(child.document_id.in_(list(document_ids)))
+    refs = refs.subquery()
+    stmt = (
+        select(refs.c.id, refs.c.chunk_hash, content.text)
+        .join(content, content.chunk_hash == refs.c.chunk_hash)
+        .where(refs.c.rank <= max(per_hash, 1))
+        .order_by(refs.c.chunk_hash, refs.c.rank)
+    )
+    async with async_session() as session:
+        rows = (await session.execute(stmt)).all()
+
+    children = await hydrate_children([row.id for row in rows])
+    hydrated: Dict[str, List[HydratedChild]] = {}
+    for cid, chunk_hash, text in rows:
+        hydrated_child = children.get(str(cid))
+        if hydrated_child is None:
+            continue
+        hydrated_child.text = text
+        hydrated.setdefault(chunk_hash, []).append(hydrated_child)
+    return hydrated
+
+
+async def _hydrate_with_cache(child_ids: Sequence[UUID]) -> Dict[str, HydratedChild]:
+    child, parent, document = models.ChildChunk, models.ParentChunk, models.Document
+    window_chars = settings.max_parent_chunk_chars_for_llm
+
+    async with async_session() as session:
+        children = (
+            await session.execute(
+                select(
+                    child.id,
+                    child.text,
+                    child.chunk_hash,
+                    child.parent_id,
+                    child.document_id,
+                    child.char_start,
+                    child.char_end,
+                ).where(child.id.in_(list(child_ids)))
+            )
+        ).all()
+
+        parents = chunk_cache.get_parents({row.parent_id for row in children})
+        documents = chunk_cache.get_documents({row.document_id for row in children})
+
+        missing_parents = {row.parent_id for row in children} - parents.keys()
+        if missing_parents:
+            rows = await session.execute(
+                select(
+                    parent.id,
+                    parent.document_id,
+                    parent.char_start,
+                    parent.page_start,
+                    parent.page_end,
+                    parent.text,
+                    document.filename,
+                    document.content_type,
+                    document.tenant_id,
+                )
+                .join(document, parent.document_id == document.id)
+                .where(parent.id.in_(missing_parents))
+            )
+            for row in rows:
+                parents[row.id] = CachedParent(
+                    document_id=row.document_id,
+                    char_start=row.char_start,
+                    page_start=row.page_start,
+                    page_end=row.page_end,
+                    text=row.text,
+                )
+                chunk_cache.put_parent(row.id, parents[row.id])
+                if row.document_id not in documents:
+                    documents[row.document_id] = CachedDocument(
+                        filename=row.filename,
+                        content_type=row.content_type,
+                        tenant_id=row.tenant_id,
+                    )
+                    chunk_cache.put_document(row.document_id, documents[row.document_id])
+
+        missing_documents = {row.document_id for row in children} - documents.keys()
+        if missing_documents:
+            rows = await session.execute(
+                select(
+                    document.id,
+                    document.filename,
+                    document.content_type,
+                    document.tenant_id,
+                ).where(document.id.in_(missing_documents))
+            )
+            for row in rows:
+                documents[row.id] = CachedDocument(
+                    filename=row.filename,
+                    content_type=row.content_type,
+                    tenant_id=row.tenant_id,
+                )
+                chunk_cache.put_document(row.id, documents[row.id])
+
+    hydrated: Dict[str, HydratedChild] = {}
+    for row in children:
+        parent_entry = parents.get(row.parent_id)
+        document_entry = documents.get(row.document_id)
+        if parent_entry is None or document_entry is None:
+            continue
+        hydrated[str(row.id)] = HydratedChild(
+            id=str(row.id),
+            text=row.text,
+            chunk_hash=row.chunk_hash,
+            parent_id=row.parent_id,
+            document_id=row.document_id,
+            filename=document_entry.filename,
+            page_start=parent_entry.page_start,
+            page_end=parent_entry.page_end,
+            window=_slice_window(
+                parent_entry.text,
+                rel_start=(row.char_start or 0) - (parent_entry.char_start or 0),
+                rel_end=(row.char_end or 0) - (parent_entry.char_start or 0),
+                window_chars=window_chars,
+            ),
+        )
+    return hydrated
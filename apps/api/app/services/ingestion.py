@@ -1,148 +1,536 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
 from uuid import UUID, uuid4
 
+import asyncio
 import logging
-from datetime import datetime
+import os
+import tempfile
 
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+import asyncpg
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..db import models
 from ..db.session import async_session
-from .chunker import chunk_text_block, simple_chunk
-from .embeddings import embed_texts
-from .opensearch_index import index_chunks
-from .parser import parse_document
+from . import boundary_chunker, bulk_writer, chunk_store, embeddings
+from .bulk_writer import ChildRow, ParentRow
+from .chunk_cache import chunk_cache
+from .chunker import ChunkData, chunk_text_block, iter_chunks
+from .corpus_generation import bump_generation
+from .embedding_cache import EmbeddingCacheStats, embed_texts_cached
+from .opensearch_index import (
+    add_document_references,
+    delete_document_chunks,
+    index_chunks,
+    index_shared_chunks,
+    refresh_if_bulk_ingest,
+    update_chunks,
+)
+from .parser import iter_document_pages
+from . import vector_store_mmap
 from .storage_s3 import _get_s3_client
 from ..core.config import get_settings
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Index updates after a committed version swap are retried this many times.
+_SYNC_ATTEMPTS = 3
+_SYNC_RETRY_SECONDS = 2.0
+
+
+@dataclass
+class _PurgedChunks:
+    parents: int
+    child_ids: List[UUID]
+
+
+async def _purge_document_chunks(session: AsyncSession, document_id: UUID) -> _PurgedChunks:
+    """
+    Remove chunks left behind by an earlier (failed) attempt so retries are idempotent.
+
+    Embeddings go with their child rows via ON DELETE CASCADE; shared contents
+    (content-addressed chunk_store) once nothing references them any more. The
+    mmap store is outside the transaction: pass the result to
+    _remove_purged_vectors once the caller has committed.
+    """
+    deleted_children = (
+        await session.execute(
+            delete(models.ChildChunk)
+            .where(models.ChildChunk.document_id == document_id)
+            .returning(models.ChildChunk.id, models.ChildChunk.chunk_hash)
+        )
+    ).all()
+    result = await session.execute(
+        delete(models.ParentChunk).where(models.ParentChunk.document_id == document_id)
+    )
+    if deleted_children and chunk_store.enabled():
+        await chunk_store.remove_unreferenced(
+            session, [row.chunk_hash for row in deleted_children]
+        )
+    chunk_cache.invalidate_document(document_id)
+    return _PurgedChunks(
+        parents=result.rowcount or 0,
+        child_ids=[row.id for row in deleted_children],
+    )
+
+
+async def _remove_purged_vectors(purged: _PurgedChunks) -> None:
+    """Tombstone purged children in the mmap store (after their deletion committed)."""
+    if purged.child_ids and settings.vector_backend == "mmap" and not chunk_store.enabled():
+        await vector_store_mmap.remove(purged.child_ids)
+
+
+@dataclass
+class _VersionReuse:
+    """
+    Parent chunks of the previous version, matched by chunk_hash while the new
+    version is chunked. A matched parent is written as a new row without new
+    children; the old parent's children (rows, embeddings, index entries) are
+    moved onto it when the version is swapped in.
+    """
+
+    previous_id: UUID
+    # chunk_hash -> (old parent id, old char_start), in document order.
+    available: Dict[str, Deque[tuple[UUID, Optional[int]]]]
+    # (old parent id, new parent id, char shift, page_start, page_end)
+    moves: List[tuple[UUID, UUID, int, Optional[int], Optional[int]]] = field(
+        default_factory=list
+    )
+
+    def claim(self, parent_id: UUID, parent: ChunkData) -> bool:
+        candidates = self.available.get(parent.chunk_hash)
+        if not candidates:
+            return False
+        old_id, old_char_start = candidates.popleft()
+        self.moves.append(
+            (
+                old_id,
+                parent_id,
+                parent.char_start - (old_char_start or 0),
+                parent.page_start,
+                parent.page_end,
+            )
+        )
+        return True
+
+
+async def _load_version_reuse(
+    session: AsyncSession, document: models.Document
+) -> Optional[_VersionReuse]:
+    """Index the previous version's parents by hash, if it is READY to be replaced."""
+    if document.supersedes_id is None:
+        return None
+    previous = await session.get(models.Document, document.supersedes_id)
+    if previous is None or previous.status != models.DocumentStatus.ready.value:
+        return None
+
+    rows = await session.execute(
+        select(
+            models.ParentChunk.id,
+            models.ParentChunk.chunk_hash,
+            models.ParentChunk.char_start,
+        )
+        .where(models.ParentChunk.document_id == previous.id)
+        .order_by(models.ParentChunk.char_start)
+    )
+    available: Dict[str, Deque[tuple[UUID, Optional[int]]]] = {}
+    for parent_id, chunk_hash, char_start in rows:
+        available.setdefault(chunk_hash, deque()).append((parent_id, char_start))
+    return _VersionReuse(previous_id=previous.id, available=available)
+
+
+# Children of reused parents move to the new version in one statement; offsets
+# shift with their parent, and pages follow the parent (as in chunk_text_block).
+_MOVE_CHILDREN = text(
+    """
+    UPDATE child_chunks AS c
+    SET parent_id = m.new_parent_id,
+        document_id = :document_id,
+        char_start = c.char_start + m.shift,
+        char_end = c.char_end + m.shift,
+        page_start = m.page_start,
+        page_end = m.page_end
+    FROM unnest(
+        CAST(:old_parent_ids AS uuid[]),
+        CAST(:new_parent_ids AS uuid[]),
+        CAST(:shifts AS integer[]),
+        CAST(:page_starts AS integer[]),
+        CAST(:page_ends AS integer[])
+    ) AS m(old_parent_id, new_parent_id, shift, page_start, page_end)
+    WHERE c.parent_id = m.old_parent_id AND c.document_id = :previous_id
+    RETURNING c.id, c.parent_id, c.page_start, c.page_end, c.chunk_hash
+    """
+)
+
+
+async def _swap_in_version(
+    session: AsyncSession,
+    document: models.Document,
+    reuse: _VersionReuse,
+) -> Tuple[List[Any], _PurgedChunks]:
+    """
+    Move reused children onto the new version, drop the previous version's other
+    chunks and retire it, all in the caller's transaction. Returns the moved
+    child rows (id, parent_id, page_start, page_end, chunk_hash) and the purged
+    chunks of the previous version.
+    """
+    previous = await session.get(
+        models.Document, reuse.previous_id, with_for_update=True, populate_existing=True
+    )
+    if previous is None or previous.status != models.DocumentStatus.ready.value:
+        # Deleted or superseded meanwhile; the retry ingests without reuse.
+        raise RuntimeError(f"Previous version {reuse.previous_id} is no longer READY")
+
+    moved: List[Any] = []
+    if reuse.moves:
+        old_ids, new_ids, shifts, page_starts, page_ends = map(list, zip(*reuse.moves))
+        moved = (
+            await session.execute(
+                _MOVE_CHILDREN,
+                {
+                    "document_id": document.id,
+                    "previous_id": previous.id,
+                    "old_parent_ids": old_ids,
+                    "new_parent_ids": new_ids,
+                    "shifts": shifts,
+                    "page_starts": page_starts,
+                    "page_ends": page_ends,
+                },
+            )
+        ).all()
+    purged = await _purge_document_chunks(session, previous.id)
+    previous.status = models.DocumentStatus.retired.value
+    return moved, purged
+
+
+async def _sync_moved_chunks(
+    document: models.Document,
+    previous_id: UUID,
+    moved: List[Any],
+    purged: _PurgedChunks,
+) -> None:
+    """Point the search indexes at the new version after the swap has committed."""
+    if moved and chunk_store.enabled():
+        await add_document_references(str(document.id), (row.chunk_hash for row in moved))
+    elif moved:
+        await update_chunks(
+            {
+                "chunk_id": str(row.id),
+                "parent_id": str(row.parent_id),
+                "document_id": str(document.id),
+                "page_start": row.page_start,
+                "page_end": row.page_end,
+                "filename": document.filename,
+            }
+            for row in moved
+        )
+        if settings.vector_backend == "mmap":
+            await vector_store_mmap.reassign([row.id for row in moved], document.id)
+    await _remove_purged_vectors(purged)
+    # Moved chunks were re-pointed above (and refreshed), so this only drops the rest.
+    await delete_document_chunks(str(previous_id))
+
+
+async def _sync_version_indexes(
+    document: models.Document,
+    previous_id: UUID,
+    moved: List[Any],
+    purged: _PurgedChunks,
+) -> None:
+    """
+    Run _sync_moved_chunks with retries. The swap has already committed, so a
+    failure here leaves the indexes stale but never touches the document status.
+    """
+    for attempt in range(1, _SYNC_ATTEMPTS + 1):
+        try:
+            await _sync_moved_chunks(document, previous_id, moved, purged)
+            return
+        except Exception:
+            if attempt == _SYNC_ATTEMPTS:
+                logger.exception(
+                    "Failed to update search indexes for version document_id=%s "
+                    "supersedes=%s; moved chunks may still point at the previous version",
+                    document.id,
+                    previous_id,
+                )
+                return
+            logger.warning(
+                "Index update for version document_id=%s failed (attempt %d/%d); retrying",
+                document.id,
+                attempt,
+                _SYNC_ATTEMPTS,
+                exc_info=True,
+            )
+            await asyncio.sleep(_SYNC_RETRY_SECONDS * attempt)
+
+
+def _parent_chunks(path: str, content_type: str) -> AsyncIterator[ChunkData]:
+    chunker = (
+        boundary_chunker.iter_chunks if settings.chunking_strategy == "boundary" else iter_chunks
+    )
+    return chunker(
+        iter_document_pages(path, content_type),
+        max_chars=settings.parent_chunk_chars,
+        overlap_chars=settings.parent_overlap_chars,
+    )
+
+
+def _child_chunks(parent: ChunkData) -> List[ChunkData]:
+    if settings.chunking_strategy == "boundary":
+        # Sized in model tokens, so no child is truncated at embed time.
+        return boundary_chunker.chunk_block(
+            parent.text,
+            page_start=parent.page_start,
+            page_end=parent.page_end,
+            base_char_start=parent.char_start,
+            max_size=settings.child_chunk_tokens or embeddings.max_input_tokens(),
+            overlap=settings.child_overlap_tokens,
+            length=embeddings.token_lengths,
+        )
+    return chunk_text_block(
+        parent.text,
+        page_start=parent.page_start,
+        page_end=parent.page_end,
+        base_char_start=parent.char_start,
+        max_chars=settings.child_chunk_chars,
+        overlap_chars=settings.child_overlap_chars,
+    )
+
+
+async def _iter_chunk_batches(
+    document_id: UUID,
+    path: str,
+    content_type: str,
+    reuse: Optional[_VersionReuse] = None,
+) -> AsyncIterator[tuple[list[ParentRow], list[ChildRow]]]:
+    """
+    Stream a downloaded document as batches of parent and child rows.
+
+    Pages flow from the parser through the parent and child chunkers; a batch is
+    yielded once it holds ingestion_batch_chunks chunks, so only one batch (plus
+    the chunker's current window) is held at a time. Parents claimed by reuse get
+    no child rows.
+    """
+    parent_rows: list[ParentRow] = []
+    child_rows: list[ChildRow] = []
+
+    async for parent_data in _parent_chunks(path, content_type):
+        parent_data.text = parent_data.text.replace("\x00", "")
+        parent_id = uuid4()
+        parent_rows.append(
+            ParentRow(
+                id=parent_id,
+                document_id=document_id,
+                page_start=parent_data.page_start,
+                page_end=parent_data.page_end,
+                char_start=parent_data.char_start,
+                char_end=parent_data.char_end,
+                text=parent_data.text,
+                chunk_hash=parent_data.chunk_hash,
+            )
+        )
+        if reuse is not None and reuse.claim(parent_id, parent_data):
+            child_datas = []
+        else:
+            child_datas = _child_chunks(parent_data)
+        for child_data in child_datas:
+            child_rows.append(
+                ChildRow(
+                    id=uuid4(),
+                    document_id=document_id,
+                    parent_id=parent_id,
+                    page_start=child_data.page_start,
+                    page_end=child_data.page_end,
+                    char_start=child_data.char_start,
+                    char_end=child_data.char_end,
+                    text=child_data.text.replace("\x00", ""),
+                    chunk_hash=child_data.chunk_hash,
+                )
+            )
+
+        if max(len(parent_rows), len(child_rows)) >= settings.ingestion_batch_chunks:
+            yield parent_rows, child_rows
+            parent_rows, child_rows = [], []
+
+    if parent_rows:
+        yield parent_rows, child_rows
+
+
+async def _ingest_batch(
+    document: models.Document,
+    copy_conn: asyncpg.Connection,
+    parent_rows: list[ParentRow],
+    child_rows: list[ChildRow],
+) -> EmbeddingCacheStats:
+    """Embed, persist and index one batch of chunks."""
+    if chunk_store.enabled():
+        return await _ingest_shared_batch(document, copy_conn, parent_rows, child_rows)
+
+    if not child_rows:
+        await bulk_writer.write_chunks(copy_conn, parent_rows, child_rows)
+        return EmbeddingCacheStats()
+
+    embeddings, cache_stats = await embed_texts_cached(
+        [c.text for c in child_rows],
+        [c.chunk_hash for c in child_rows],
+    )
+    await bulk_writer.write_chunks(
+        copy_conn,
+        parent_rows,
+        child_rows,
+        embeddings=embeddings,
+        model_name=settings.embedding_model_name,
+    )
+
+    if settings.vector_backend == "mmap":
+        await vector_store_mmap.append(
+            [c.id for c in child_rows],
+            [document.id] * len(child_rows),
+            embeddings,
+        )
+
+    records = [
+        {
+            "chunk_id": str(c.id),
+            "parent_id": str(c.parent_id),
+            "document_id": str(document.id),
+            "tenant_id": document.tenant_id,
+            "text": c.text,
+            "page_start": c.page_start,
+            "page_end": c.page_end,
+            "chunk_hash": c.chunk_hash,
+            "filename": document.filename,
+        }
+        for c in child_rows
+    ]
+    await index_chunks(records)
+    return cache_stats
+
+
+async def _ingest_shared_batch(
+    document: models.Document,
+    copy_conn: asyncpg.Connection,
+    parent_rows: list[ParentRow],
+    child_rows: list[ChildRow],
+) -> EmbeddingCacheStats:
+    """
+    _ingest_batch for the content-addressed chunk_store: child rows are written
+    without text, and only texts new to chunk_contents are embedded.
+    """
+    texts: Dict[str, str] = {}
+    for c in child_rows:
+        texts.setdefault(c.chunk_hash, c.text)
+        c.text = ""
+    # Child rows first: store_contents relies on their references being committed
+    # to keep a concurrent delete from collecting the contents (see chunk_store).
+    await bulk_writer.write_chunks(copy_conn, parent_rows, child_rows)
+    if not texts:
+        return EmbeddingCacheStats()
+
+    cache_stats = await chunk_store.store_contents(texts)
+    await index_shared_chunks(str(document.id), document.tenant_id, texts)
+    cache_stats.total = len(child_rows)
+    return cache_stats
+
 
 async def ingest_document(document_id: UUID) -> None:
     """
     Phase 1 ingestion pipeline:
-    - download file from S3
+    - download file from S3 (to a temporary file)
     - parse to text pages
     - chunk
     - embed
     - index in OpenSearch
-    - store chunks in Postgres
+    - store chunks in Postgres (binary COPY, see bulk_writer)
 
-    This runs synchronously; later we can move it to a worker system.
+    Pages are streamed through the chunkers and every later stage runs per batch
+    of ingestion_batch_chunks child chunks, so peak memory depends on the batch
+    size rather than the document size.
+
+    A new version of a READY document (supersedes_id) keeps the children of every
+    parent chunk whose text is unchanged; only the other parents are embedded and
+    indexed. The moved children and the previous version's retirement commit
+    together with the READY status; the search indexes are updated afterwards
+    (see _sync_version_indexes). Retrieval doesn't filter on status, so a new
+    version's chunks are searchable batch by batch while it is ingested, next to
+    the previous version's.
+
+    With the content-addressed chunk_store, text that any document already
+    stored is neither embedded nor indexed again (see chunk_store).
+
+    Called by the ingestion worker (see app.worker); safe to retry.
     """
+    moved: List[Any] = []
+    replaced = _PurgedChunks(parents=0, child_ids=[])
+    reuse: Optional[_VersionReuse] = None
     async with async_session() as session:
         document = await session.get(models.Document, document_id)
         if not document:
             return
+        if document.status == models.DocumentStatus.retired.value:
+            # Superseded by a newer version, whose ingestion took over its chunks.
+            logger.info("Skipping ingestion of retired document_id=%s", document_id)
+            return
 
+        fd, path = tempfile.mkstemp(prefix="ingest-")
+        os.close(fd)
         try:
             document.status = models.DocumentStatus.processing.value
+            purged = await _purge_document_chunks(session, document.id)
             await session.commit()
+            await _remove_purged_vectors(purged)
+            if purged.parents:
+                await delete_document_chunks(str(document.id))
 
-            s3 = _get_s3_client()
-            obj = s3.get_object(Bucket=document.s3_bucket, Key=document.s3_key)
-            content: bytes = obj["Body"].read()
+            reuse = await _load_version_reuse(session, document)
 
-            pages = await parse_document(content=content, content_type=document.content_type)
+            s3 = _get_s3_client()
+            await asyncio.to_thread(s3.download_file, document.s3_bucket, document.s3_key, path)
 
-            parent_datas = simple_chunk(
-                pages,
-                max_chars=settings.parent_chunk_chars,
-                overlap_chars=settings.parent_overlap_chars,
-            )
-            for p in parent_datas:
-                p.text = p.text.replace("\x00", "")
-
-            parent_rows: list[models.ParentChunk] = []
-            child_rows: list[models.ChildChunk] = []
-
-            for parent_data in parent_datas:
-                parent_id = uuid4()
-                parent_rows.append(
-                    models.ParentChunk(
-                        id=parent_id,
-                        document_id=document.id,
-                        page_start=parent_data.page_start,
-                        page_end=parent_data.page_end,
-                        char_start=parent_data.char_start,
-                        char_end=parent_data.char_end,
-                        text=parent_data.text,
-                        chunk_hash=parent_data.chunk_hash,
+            cache_stats = EmbeddingCacheStats()
+            batches = 0
+            async with bulk_writer.connect() as copy_conn:
+                async for parent_rows, child_rows in _iter_chunk_batches(
+                    document.id, path, document.content_type, reuse
+                ):
+                    cache_stats.add(
+                        await _ingest_batch(document, copy_conn, parent_rows, child_rows)
                     )
-                )
+                    batches += 1
 
-                child_datas = chunk_text_block(
-                    parent_data.text,
-                    page_start=parent_data.page_start,
-                    page_end=parent_data.page_end,
-                    base_char_start=parent_data.char_start,
-                    max_chars=settings.child_chunk_chars,
-                    overlap_chars=settings.child_overlap_chars,
-                )
-                for child_data in child_datas:
-                    child_id = uuid4()
-                    child_rows.append(
-                        models.ChildChunk(
-                            id=child_id,
-                            document_id=document.id,
-                            parent_id=parent_id,
-                            page_start=child_data.page_start,
-                            page_end=child_data.page_end,
-                            char_start=child_data.char_start,
-                            char_end=child_data.char_end,
-                            text=child_data.text.replace("\x00", ""),
-                            chunk_hash=child_data.chunk_hash,
-                        )
-                    )
+            logger.info(
+                "Embedding cache document_id=%s batches=%d chunks=%d unique=%d hits=%d "
+                "hit_rate=%.1f%% encoded=%d encode_time=%.2fs saved_time~%.2fs",
+                document.id,
+                batches,
+                cache_stats.total,
+                cache_stats.unique,
+                cache_stats.hits,
+                cache_stats.hit_rate * 100,
+                cache_stats.misses,
+                cache_stats.encode_seconds,
+                cache_stats.saved_seconds,
+            )
 
-            session.add_all(parent_rows)
-            session.add_all(child_rows)
+            # With periodic refreshes off (bulk ingest mode), a READY document
+            # would otherwise stay invisible to keyword search until the mode ends.
+            await refresh_if_bulk_ingest()
+            if reuse:
+                moved, replaced = await _swap_in_version(session, document, reuse)
+            document.status = models.DocumentStatus.ready.value
             await session.commit()
 
-            child_texts = [c.text for c in child_rows]
-            embeddings = await embed_texts(child_texts)
-
-            embed_values = [
-                {
-                    "child_chunk_id": c.id,
-                    "embedding": vec,
-                    "model_name": settings.embedding_model_name,
-                    "created_at": datetime.utcnow(),
-                }
-                for c, vec in zip(child_rows, embeddings)
-            ]
-
-            if embed_values:
-                stmt = pg_insert(models.ChunkEmbedding).values(embed_values)
-                stmt = stmt.on_conflict_do_update(
-                    index_elements=[models.ChunkEmbedding.child_chunk_id],
-                    set_={
-                        "embedding": stmt.excluded.embedding,
-                        "model_name": stmt.excluded.model_name,
-                        "created_at": stmt.excluded.created_at,
-                    },
+            if reuse:
+                logger.info(
+                    "Version document_id=%s supersedes=%s reused_parents=%d moved_chunks=%d",
+                    document.id,
+                    reuse.previous_id,
+                    len(reuse.moves),
+                    len(moved),
                 )
-                await session.execute(stmt)
-                await session.commit()
-
-            records = [
-                {
-                    "chunk_id": str(c.id),
-                    "parent_id": str(c.parent_id),
-                    "document_id": str(document.id),
-                    "tenant_id": document.tenant_id,
-                    "text": c.text,
-                    "page_start": c.page_start,
-                    "page_end": c.page_end,
-                    "chunk_hash": c.chunk_hash,
-                    "filename": document.filename,
-                }
-                for c in child_rows
-            ]
-            index_chunks(records)
-
-            document.status = models.DocumentStatus.ready.value
-            await session.commit()
         except Exception:
             logger.exception("Ingestion failed for document_id=%s", document_id)
             # If the transaction is in a failed state, we must roll back before any further SQL.
@@ -162,4 +550,73 @@ async def ingest_document(document_id: UUID) -> None:
                     if doc2:
                         doc2.status = models.DocumentStatus.failed.value
                         await session2.commit()
+            await _discard_failed_attempt(document_id)
             raise
+        finally:
+            os.unlink(path)
+
+    if reuse:
+        await _sync_version_indexes(document, reuse.previous_id, moved, replaced)
+
+    # After the commit, so a reader of the new generation also sees the new chunks.
+    await _bump_corpus_generation()
+
+
+async def _discard_failed_attempt(document_id: UUID) -> None:
+    """
+    Remove the chunks a failed attempt already wrote and indexed, so a partially
+    ingested document isn't searchable while it waits for a retry, or for good
+    after the last one.
+    """
+    try:
+        async with async_session() as session:
+            purged = await _purge_document_chunks(session, document_id)
+            await session.commit()
+        await _remove_purged_vectors(purged)
+        if purged.parents:
+            await delete_document_chunks(str(document_id))
+            await _bump_corpus_generation()
+    except Exception:
+        # The next attempt (or deleting the document) purges them instead.
+        logger.warning(
+            "Failed to remove chunks of failed ingestion document_id=%s",
+            document_id,
+            exc_info=True,
+        )
+
+
+async def _bump_corpus_generation() -> None:
+    try:
+        await bump_generation()
+    except Exception:
+        # Cached answers stay stale until the next bump; the corpus change itself stands.
+        logger.warning("Failed to bump corpus generation", exc_info=True)
+
+
+async def delete_document(document_id: UUID) -> bool:
+    """
+    Delete a document with its chunks (Postgres, OpenSearch, mmap store), its
+    ingestion jobs and its stored file. Returns False if it doesn't exist.
+    """
+    async with async_session() as session:
+        document = await session.get(models.Document, document_id)
+        if not document:
+            return False
+        bucket, key = document.s3_bucket, document.s3_key
+
+        purged = await _purge_document_chunks(session, document.id)
+        # Core DELETE: ingestion_jobs rows go with it via ON DELETE CASCADE.
+        await session.execute(delete(models.Document).where(models.Document.id == document_id))
+        await session.commit()
+
+    await _remove_purged_vectors(purged)
+    if purged.parents:
+        await delete_document_chunks(str(document_id))
+        await _bump_corpus_generation()
+
+    try:
+        s3 = _get_s3_client()
+        await asyncio.to_thread(s3.delete_object, Bucket=bucket, Key=key)
+    except Exception:
+        logger.warning("Failed to delete s3://%s/%s", bucket, key, exc_info=True)
+    return True
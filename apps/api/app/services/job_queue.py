@@ -0,0 +1,300 @@
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import logging
+import random
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..core.config import get_settings
+from ..db import models
+from ..db.session import async_session
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Jobs per INSERT, well under asyncpg's 32767 bind-parameter limit.
+_ENQUEUE_ROWS = 1000
+
+
+@dataclass
+class ClaimedJob:
+    id: UUID
+    document_id: UUID
+    attempts: int
+    max_attempts: int
+    # Upload size (the job's priority), used to spot large ingests.
+    size_bytes: int = 0
+    # locked_by of the claim; the lease is only renewed or released while it matches.
+    worker_id: str = ""
+
+
+async def enqueue_ingestion(document_id: UUID, *, size_bytes: int = 0) -> None:
+    """
+    Queue a document for ingestion by the worker processes.
+
+    Idempotent: if the document already has a queued or running job, nothing is added.
+    """
+    stmt = (
+        pg_insert(models.IngestionJob)
+        .values(
+            document_id=document_id,
+            status=models.JobStatus.queued.value,
+            priority=max(int(size_bytes or 0), 0),
+            attempts=0,
+            max_attempts=settings.ingestion_max_attempts,
+        )
+        .on_conflict_do_nothing()
+    )
+    async with async_session() as session:
+        await session.execute(stmt)
+        await session.commit()
+
+
+async def enqueue_ingestion_batch(
+    documents: Sequence[Tuple[UUID, int]],
+    *,
+    batch_id: UUID,
+) -> None:
+    """
+    Queue (document_id, size_bytes) pairs in one transaction (statements of
+    _ENQUEUE_ROWS rows), tagged with batch_id so a worker claims them together
+    (see claim_next_jobs).
+
+    Documents that already have a queued or running job are skipped.
+    """
+    if not documents:
+        return
+    async with async_session() as session:
+        for i in range(0, len(documents), _ENQUEUE_ROWS):
+            await session.execute(
+                pg_insert(models.IngestionJob)
+                .values(
+                    [
+                        {
+                            "document_id": document_id,
+                            "status": models.JobStatus.queued.value,
+                            "priority": max(int(size_bytes or 0), 0),
+                            "attempts": 0,
+                            "max_attempts": settings.ingestion_max_attempts,
+                            "batch_id": batch_id,
+                        }
+                        for document_id, size_bytes in documents[i : i + _ENQUEUE_ROWS]
+                    ]
+                )
+                .on_conflict_do_nothing()
+            )
+        await session.commit()
+
+
+def _runnable_jobs():
+    return (
+        select(models.IngestionJob)
+        .where(
+            models.IngestionJob.status == models.JobStatus.queued.value,
+            models.IngestionJob.run_after <= func.now(),
+        )
+        .order_by(
+            models.IngestionJob.priority.asc(),
+            models.IngestionJob.created_at.asc(),
+        )
+        .with_for_update(skip_locked=True)
+    )
+
+
+async def claim_next_jobs(worker_id: str, *, limit: int = 1) -> List[ClaimedJob]:
+    """
+    Atomically claim the next runnable job (smallest documents first). If it
+    belongs to a bulk upload batch, up to limit - 1 more runnable jobs of that
+    batch are claimed with it.
+
+    Uses FOR UPDATE SKIP LOCKED so any number of workers can poll the same table.
+    """
+    async with async_session() as session:
+        async with session.begin():
+            job = await session.scalar(_runnable_jobs().limit(1))
+            if job is None:
+                return []
+
+            jobs = [job]
+            if job.batch_id is not None and limit > 1:
+                jobs += (
+                    await session.scalars(
+                        _runnable_jobs()
+                        .where(
+                            models.IngestionJob.batch_id == job.batch_id,
+                            models.IngestionJob.id != job.id,
+                        )
+                        .limit(limit - 1)
+                    )
+                ).all()
+
+            claimed: List[ClaimedJob] = []
+            for job in jobs:
+                job.status = models.JobStatus.running.value
+                job.attempts = job.attempts + 1
+                job.locked_by = worker_id
+                job.locked_at = func.now()
+                claimed.append(
+                    ClaimedJob(
+                        id=job.id,
+                        document_id=job.document_id,
+                        attempts=job.attempts,
+                        max_attempts=job.max_attempts,
+                        size_bytes=job.priority,
+                        worker_id=worker_id,
+                    )
+                )
+    return claimed
+
+
+def _still_claimed(job: ClaimedJob):
+    """WHERE clause matching the job only while this claim of it still holds the lease."""
+    return (
+        models.IngestionJob.id == job.id,
+        models.IngestionJob.status == models.JobStatus.running.value,
+        models.IngestionJob.locked_by == job.worker_id,
+        models.IngestionJob.attempts == job.attempts,
+    )
+
+
+async def renew_lease(job: ClaimedJob) -> bool:
+    """
+    Extend a running job's lease (locked_at = now). Returns False if the lease
+    was lost, i.e. requeue_stale_jobs handed the job to another worker.
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            update(models.IngestionJob)
+            .where(*_still_claimed(job))
+            .values(locked_at=func.now())
+        )
+        await session.commit()
+    return bool(result.rowcount)
+
+
+def _log_lost_lease(job: ClaimedJob) -> None:
+    logger.warning(
+        "Ingestion job %s for document_id=%s lost its lease; not recording attempt %d",
+        job.id,
+        job.document_id,
+        job.attempts,
+    )
+
+
+async def mark_succeeded(job: ClaimedJob) -> None:
+    async with async_session() as session:
+        result = await session.execute(
+            update(models.IngestionJob)
+            .where(*_still_claimed(job))
+            .values(
+                status=models.JobStatus.succeeded.value,
+                locked_by=None,
+                locked_at=None,
+                last_error=None,
+            )
+        )
+        await session.commit()
+    if not result.rowcount:
+        _log_lost_lease(job)
+
+
+def _backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with full jitter, capped at ingestion_retry_max_seconds."""
+    delay = settings.ingestion_retry_base_seconds * (2 ** max(attempts - 1, 0))
+    delay = min(delay, settings.ingestion_retry_max_seconds)
+    return random.uniform(delay / 2, delay)
+
+
+async def mark_failed(job: ClaimedJob, *, error: str) -> None:
+    """
+    Record a failed attempt: requeue with backoff, or give up after max_attempts.
+    Nothing is recorded if the job's lease was lost to another worker.
+    """
+    error = (error or "")[:4000]
+    async with async_session() as session:
+        if job.attempts >= job.max_attempts:
+            result = await session.execute(
+                update(models.IngestionJob)
+                .where(*_still_claimed(job))
+                .values(
+                    status=models.JobStatus.failed.value,
+                    locked_by=None,
+                    locked_at=None,
+                    last_error=error,
+                )
+            )
+            if not result.rowcount:
+                _log_lost_lease(job)
+                return
+            logger.error(
+                "Ingestion job %s for document_id=%s failed permanently after %d attempts",
+                job.id,
+                job.document_id,
+                job.attempts,
+            )
+        else:
+            delay = _backoff_seconds(job.attempts)
+            result = await session.execute(
+                update(models.IngestionJob)
+                .where(*_still_claimed(job))
+                .values(
+                    status=models.JobStatus.queued.value,
+                    run_after=func.now() + timedelta(seconds=delay),
+                    locked_by=None,
+                    locked_at=None,
+                    last_error=error,
+                )
+            )
+            if not result.rowcount:
+                _log_lost_lease(job)
+                return
+            # The document will be retried, so it is waiting again rather than FAILED
+            # (unless a newer version retired it meanwhile).
+            await session.execute(
+                update(models.Document)
+                .where(
+                    models.Document.id == job.document_id,
+                    models.Document.status != models.DocumentStatus.retired.value,
+                )
+                .values(status=models.DocumentStatus.uploaded.value)
+            )
+            logger.warning(
+                "Ingestion job %s for document_id=%s failed (attempt %d/%d); retrying in %.0fs",
+                job.id,
+                job.document_id,
+                job.attempts,
+                job.max_attempts,
+                delay,
+            )
+        await session.commit()
+
+
+async def requeue_stale_jobs() -> int:
+    """
+    Return RUNNING jobs whose lease expired (e.g. the worker was killed) to the queue.
+    Live workers renew their leases (see renew_lease), so only dead ones expire.
+    """
+    lease = timedelta(seconds=settings.ingestion_job_lease_seconds)
+    async with async_session() as session:
+        result = await session.execute(
+            update(models.IngestionJob)
+            .where(
+                models.IngestionJob.status == models.JobStatus.running.value,
+                models.IngestionJob.locked_at < func.now() - lease,
+            )
+            .values(
+                status=models.JobStatus.queued.value,
+                run_after=func.now(),
+                locked_by=None,
+                locked_at=None,
+            )
+        )
+        await session.commit()
+        count = result.rowcount or 0
+    if count:
+        logger.warning("Requeued %d stale ingestion job(s)", count)
+    return count
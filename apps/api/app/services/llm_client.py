@@ -0,0 +1,236 @@
+"""
+Shared client for the local LLM (Ollama-compatible /api/chat).
+
+One pooled httpx.AsyncClient per process, so calls reuse keep-alive
+connections. Every request carries `keep_alive` and the configured model
+options. On API startup the model is loaded once (warm_up) and then pinged
+while idle, so sparse traffic doesn't pay the cold-load time. Ollama reports
+per-request timings (load vs. prompt eval vs. generation); they are aggregated
+for GET /admin/stats.
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import json
+import logging
+import time
+
+import httpx
+
+from ..core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_client: httpx.AsyncClient | None = None
+_keep_warm_task: asyncio.Task | None = None
+_last_request_at = 0.0
+
+# Ollama reports durations in nanoseconds.
+_NS = 1e9
+
+_metrics: Dict[str, float] = {
+    "requests": 0,
+    "errors": 0,
+    "warmups": 0,
+    "total_seconds": 0.0,
+    "load_seconds": 0.0,
+    "max_load_seconds": 0.0,
+    "prompt_tokens": 0,
+    "prompt_eval_seconds": 0.0,
+    "generated_tokens": 0,
+    "generation_seconds": 0.0,
+}
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=settings.local_llm_base_url,
+            timeout=httpx.Timeout(settings.llm_timeout_seconds, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_connections,
+            ),
+        )
+    return _client
+
+
+def _keep_alive() -> Any:
+    # Ollama takes a duration ("30m") or seconds as a number (-1 = keep loaded).
+    value = settings.llm_keep_alive.strip()
+    return int(value) if value.lstrip("-").isdigit() else value
+
+
+def _options(extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    options: Dict[str, Any] = {}
+    if settings.llm_num_ctx > 0:
+        options["num_ctx"] = settings.llm_num_ctx
+    if settings.llm_num_thread > 0:
+        options["num_thread"] = settings.llm_num_thread
+    options.update(extra or {})
+    return options
+
+
+def _chat_payload(
+    messages: List[dict],
+    *,
+    stream: bool,
+    options: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    return {
+        "model": settings.local_llm_model,
+        "messages": messages,
+        "stream": stream,
+        "keep_alive": _keep_alive(),
+        "options": _options(options),
+    }
+
+
+def _record(data: Dict[str, Any]) -> None:
+    """Accumulate timings from a final (done) Ollama response object."""
+    load = data.get("load_duration", 0) / _NS
+    _metrics["requests"] += 1
+    _metrics["total_seconds"] += data.get("total_duration", 0) / _NS
+    _metrics["load_seconds"] += load
+    _metrics["max_load_seconds"] = max(_metrics["max_load_seconds"], load)
+    _metrics["prompt_tokens"] += data.get("prompt_eval_count", 0)
+    _metrics["prompt_eval_seconds"] += data.get("prompt_eval_duration", 0) / _NS
+    _metrics["generated_tokens"] += data.get("eval_count", 0)
+    _metrics["generation_seconds"] += data.get("eval_duration", 0) / _NS
+
+
+def _touch() -> None:
+    global _last_request_at
+    _last_request_at = time.monotonic()
+
+
+async def chat(
+    messages: List[dict],
+    *,
+    options: Optional[Dict[str, Any]] = None,
+    timeout: Optional[float] = None,
+) -> str:
+    """Non-streaming chat completion; returns the assistant message content."""
+    _touch()
+    try:
+        resp = await get_client().post(
+            "/api/chat",
+            json=_chat_payload(messages, stream=False, options=options),
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+        )
+        resp.raise_for_status()
+        data = resp.json()
+    except Exception:
+        _metrics["errors"] += 1
+        raise
+    _record(data)
+    # Ollama-style response: {"message": {"role": "assistant", "content": "..."}}
+    return data.get("message", {}).get("content", "") or ""
+
+
+async def chat_stream(
+    messages: List[dict],
+    *,
+    options: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[str]:
+    """Streaming chat completion; yields content tokens as they are generated."""
+    _touch()
+    try:
+        async with get_client().stream(
+            "POST",
+            "/api/chat",
+            json=_chat_payload(messages, stream=True, options=options),
+        ) as resp:
+            resp.raise_for_status()
+            # One JSON object per line; the last one has done=true and the timings.
+            async for line in resp.aiter_lines():
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                token = data.get("message", {}).get("content", "") or ""
+                if token:
+                    yield token
+                if data.get("done"):
+                    _record(data)
+                    break
+    except Exception:
+        _metrics["errors"] += 1
+        raise
+
+
+async def warm_up() -> None:
+    """Load the model (an empty prompt makes Ollama load it and return immediately)."""
+    _touch()
+    resp = await get_client().post(
+        "/api/generate",
+        json={
+            "model": settings.local_llm_model,
+            "keep_alive": _keep_alive(),
+            "options": _options(),
+        },
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    _metrics["warmups"] += 1
+    load = data.get("load_duration", 0) / _NS
+    _metrics["max_load_seconds"] = max(_metrics["max_load_seconds"], load)
+    logger.info("LLM %s warm (load %.2fs)", settings.local_llm_model, load)
+
+
+async def _keep_warm_loop(interval: float) -> None:
+    try:
+        await warm_up()
+    except Exception:
+        logger.warning("LLM warm-up failed; will retry", exc_info=True)
+    while True:
+        idle = time.monotonic() - _last_request_at
+        await asyncio.sleep(max(interval - idle, 1.0))
+        if time.monotonic() - _last_request_at < interval:
+            continue
+        try:
+            await warm_up()
+        except Exception:
+            logger.warning("LLM keep-warm ping failed", exc_info=True)
+
+
+def start_keep_warm() -> None:
+    """Warm the model in the background, then ping it after each idle interval."""
+    global _keep_warm_task
+    if not settings.llm_warmup_enabled or _keep_warm_task is not None:
+        return
+    interval = settings.llm_keep_warm_interval_seconds
+    if interval > 0:
+        _keep_warm_task = asyncio.create_task(_keep_warm_loop(interval))
+    else:
+        _keep_warm_task = asyncio.create_task(warm_up())
+
+
+async def close_client() -> None:
+    global _client, _keep_warm_task
+    if _keep_warm_task is not None:
+        _keep_warm_task.cancel()
+        try:
+            await _keep_warm_task
+        except (asyncio.CancelledError, Exception):
+            pass
+        _keep_warm_task = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def stats() -> Dict[str, Any]:
+    requests = _metrics["requests"]
+    generation = _metrics["generation_seconds"]
+    prompt_eval = _metrics["prompt_eval_seconds"]
+    return {
+        "model": settings.local_llm_model,
+        "keep_alive": settings.llm_keep_alive,
+        **_metrics,
+        "avg_load_seconds": _metrics["load_seconds"] / requests if requests else 0.0,
+        "avg_generation_seconds": generation / requests if requests else 0.0,
+        "prompt_tokens_per_second": _metrics["prompt_tokens"] / prompt_eval if prompt_eval else 0.0,
+        "generation_tokens_per_second": _metrics["generated_tokens"] / generation if generation else 0.0,
+    }
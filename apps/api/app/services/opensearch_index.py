@@ -1,50 +1,324 @@
-from typing import Any, Iterable, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+import asyncio
+import contextlib
+import logging
+import time
 
-from opensearchpy import OpenSearch, helpers
+from opensearchpy import AsyncOpenSearch
+from opensearchpy.helpers import async_streaming_bulk
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
 
 from ..core.config import get_settings
+from ..db.session import engine
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
+_client: AsyncOpenSearch | None = None
+_index_ready = False
+_index_lock = asyncio.Lock()
 
-def get_client() -> OpenSearch:
-    return OpenSearch(
-        hosts=[{"host": settings.opensearch_host, "port": settings.opensearch_port}],
-        http_compress=True,
-        use_ssl=False,
-        verify_certs=False,
-    )
+# bulk_ingest() blocks running in this process, and what they indexed so far.
+_bulk_ingests = 0
+_bulk_lock = asyncio.Lock()
+_bulk_docs = 0
+_bulk_started = 0.0
+# Connection holding this process's share of the bulk ingest advisory lock.
+_bulk_connection: AsyncConnection | None = None
 
+# Postgres advisory lock coordinating bulk ingest mode across processes: every
+# process in bulk ingest mode holds it shared; restoring refresh_interval
+# requires it exclusively, i.e. no process left in the mode. Session-level, so a
+# crashed worker's share is released with its connection.
+_BULK_INGEST_LOCK = 0x6F735F62756C6B  # "os_bulk"
+_LOCK_SHARED = text("SELECT pg_advisory_lock_shared(:key)")
+_UNLOCK_SHARED = text("SELECT pg_advisory_unlock_shared(:key)")
+_TRY_LOCK = text("SELECT pg_try_advisory_lock(:key)")
+_UNLOCK = text("SELECT pg_advisory_unlock(:key)")
+
+# Fields only read back from _source (or used as _id) are not indexed at all.
+_STORED_KEYWORD = {"type": "keyword", "index": False, "doc_values": False}
+_STORED_INTEGER = {"type": "integer", "index": False, "doc_values": False}
+
+# Content-addressed store: reference lists of the per-hash documents.
+_ADD_REFERENCE = (
+    "if (!ctx._source.document_ids.contains(params.document_id)) "
+    "{ ctx._source.document_ids.add(params.document_id) }"
+)
+_REMOVE_REFERENCE = (
+    "ctx._source.document_ids.removeIf(d -> d == params.document_id); "
+    "if (ctx._source.document_ids.isEmpty()) { ctx.op = 'delete' }"
+)
+_REFERENCE_RETRIES = 5
+
+
+def get_client() -> AsyncOpenSearch:
+    """
+    Process-wide async client. Its aiohttp connection pool keeps connections
+    alive between requests, so queries and bulk writes don't reconnect each time.
+    """
+    global _client
+    if _client is None:
+        _client = AsyncOpenSearch(
+            hosts=[{"host": settings.opensearch_host, "port": settings.opensearch_port}],
+            http_compress=True,
+            use_ssl=False,
+            verify_certs=False,
+            pool_maxsize=settings.opensearch_pool_maxsize,
+            timeout=settings.opensearch_timeout_seconds,
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client, _index_ready
+    if _client is not None:
+        await _client.close()
+        _client = None
+        _index_ready = False
 
-def ensure_index() -> None:
-    client = get_client()
-    if client.indices.exists(index=settings.opensearch_index):
-        return
 
-    body: dict[str, Any] = {
+def _index_body() -> dict[str, Any]:
+    return {
+        "settings": {
+            "index": {
+                "number_of_shards": settings.opensearch_number_of_shards,
+                "number_of_replicas": settings.opensearch_number_of_replicas,
+                "refresh_interval": settings.opensearch_refresh_interval,
+            }
+        },
         "mappings": {
             "properties": {
-                "chunk_id": {"type": "keyword"},
-                "parent_id": {"type": "keyword"},
+                "chunk_id": _STORED_KEYWORD,
+                "parent_id": _STORED_KEYWORD,
                 "document_id": {"type": "keyword"},
+                "document_ids": {"type": "keyword"},
                 "tenant_id": {"type": "keyword"},
-                "text": {"type": "text"},
-                "page_start": {"type": "integer"},
-                "page_end": {"type": "integer"},
-                "filename": {"type": "keyword"},
+                # BM25 only needs term frequencies; positions are skipped.
+                "text": {
+                    "type": "text",
+                    "analyzer": settings.opensearch_text_analyzer,
+                    "index_options": "freqs",
+                },
+                "page_start": _STORED_INTEGER,
+                "page_end": _STORED_INTEGER,
+                "filename": _STORED_KEYWORD,
                 "chunk_hash": {"type": "keyword"},
             }
-        }
+        },
     }
-    client.indices.create(index=settings.opensearch_index, body=body)
 
 
-def index_chunks(
+async def ensure_index() -> None:
+    """
+    Create the chunk index if missing, with explicit settings and mappings;
+    checked once per process. On an existing index only refresh_interval is
+    re-applied, and only while no process is in bulk ingest mode, which undoes
+    a bulk ingest that died before restoring it. Replicas are left to operators
+    once the index exists.
+    """
+    global _index_ready
+    if _index_ready:
+        return
+    async with _index_lock:
+        if _index_ready:
+            return
+        client = get_client()
+        if not await client.indices.exists(index=settings.opensearch_index):
+            # Another process may have created it since the exists() check.
+            await client.indices.create(
+                index=settings.opensearch_index, body=_index_body(), ignore=400
+            )
+        else:
+            async with _no_bulk_ingest() as idle:
+                if idle:
+                    await client.indices.put_settings(
+                        index=settings.opensearch_index,
+                        body={"index": {"refresh_interval": settings.opensearch_refresh_interval}},
+                    )
+            if settings.chunk_store == "content_addressed":
+                # Indexes created before the content-addressed store lack this field.
+                await client.indices.put_mapping(
+                    index=settings.opensearch_index,
+                    body={"properties": {"document_ids": {"type": "keyword"}}},
+                )
+        _index_ready = True
+
+
+async def _set_refresh_interval(interval: str) -> None:
+    try:
+        await get_client().indices.put_settings(
+            index=settings.opensearch_index,
+            body={"index": {"refresh_interval": interval}},
+        )
+    except Exception:
+        # Only a throughput setting; indexing itself is unaffected.
+        logger.warning("Failed to set refresh_interval=%s", interval, exc_info=True)
+
+
+@contextlib.asynccontextmanager
+async def _no_bulk_ingest() -> AsyncIterator[bool]:
+    """
+    Try to take the bulk ingest lock exclusively. Yields whether it was taken:
+    no process is in bulk ingest mode, and none can enter it until the block exits.
+    """
+    async with engine.connect() as conn:
+        taken = bool(await conn.scalar(_TRY_LOCK, {"key": _BULK_INGEST_LOCK}))
+        try:
+            yield taken
+        finally:
+            if taken:
+                await conn.scalar(_UNLOCK, {"key": _BULK_INGEST_LOCK})
+
+
+async def _enter_bulk_mode() -> None:
+    global _bulk_connection
+    try:
+        conn = await engine.connect()
+    except Exception:
+        logger.warning("Postgres unavailable; ingesting without bulk ingest mode", exc_info=True)
+        return
+    try:
+        await conn.scalar(_LOCK_SHARED, {"key": _BULK_INGEST_LOCK})
+        # Session-level lock: it outlives the transaction, which mustn't stay open.
+        await conn.commit()
+    except BaseException:
+        await conn.close()
+        raise
+    _bulk_connection = conn
+    await _set_refresh_interval(settings.opensearch_bulk_refresh_interval)
+
+
+async def _leave_bulk_mode() -> None:
+    """Release this process's share; the last process out restores and refreshes."""
+    global _bulk_connection
+    conn, _bulk_connection = _bulk_connection, None
+    if conn is None:
+        return
+    try:
+        await conn.scalar(_UNLOCK_SHARED, {"key": _BULK_INGEST_LOCK})
+        if not await conn.scalar(_TRY_LOCK, {"key": _BULK_INGEST_LOCK}):
+            return  # another process is still in bulk ingest mode
+        try:
+            await _set_refresh_interval(settings.opensearch_refresh_interval)
+            await get_client().indices.refresh(index=settings.opensearch_index)
+        finally:
+            await conn.scalar(_UNLOCK, {"key": _BULK_INGEST_LOCK})
+    except Exception:
+        # Closing the connection still releases the lock; the next process to
+        # leave bulk ingest mode (or to start) restores the interval.
+        logger.warning("Leaving bulk ingest mode failed", exc_info=True)
+    finally:
+        await conn.close()
+
+
+async def refresh_if_bulk_ingest() -> None:
+    """
+    Make what was indexed so far searchable when periodic refreshes are off
+    because some process is in bulk ingest mode. Ingestion calls it before
+    marking a document READY (and bumping the corpus generation).
+    """
+    async with _no_bulk_ingest() as idle:
+        if idle:
+            return
+    await get_client().indices.refresh(index=settings.opensearch_index)
+
+
+@contextlib.asynccontextmanager
+async def bulk_ingest() -> AsyncIterator[None]:
+    """
+    Ingest-optimized mode for large ingests. While any bulk_ingest() block of any
+    process runs, the index uses opensearch_bulk_refresh_interval instead of
+    refreshing every second; documents are refreshed individually before they
+    become READY (see refresh_if_bulk_ingest). Processes in the mode share a
+    Postgres advisory lock, and the last one to leave restores the configured
+    interval and refreshes once. Logs the docs/s over this process's window.
+    """
+    global _bulk_ingests, _bulk_docs, _bulk_started
+    try:
+        await ensure_index()
+    except Exception:
+        # Indexing will fail (and be retried) on its own; don't fail the jobs here.
+        logger.warning("OpenSearch unavailable; ingesting without bulk ingest mode", exc_info=True)
+        yield
+        return
+    async with _bulk_lock:
+        _bulk_ingests += 1
+        if _bulk_ingests == 1:
+            _bulk_docs, _bulk_started = 0, time.perf_counter()
+            await _enter_bulk_mode()
+    try:
+        yield
+    finally:
+        async with _bulk_lock:
+            _bulk_ingests -= 1
+            if _bulk_ingests == 0:
+                await _leave_bulk_mode()
+                elapsed = time.perf_counter() - _bulk_started
+                logger.info(
+                    "OpenSearch bulk ingest finished docs=%d seconds=%.1f docs_per_second=%.0f",
+                    _bulk_docs,
+                    elapsed,
+                    _bulk_docs / elapsed if elapsed > 0 else 0.0,
+                )
+
+
+async def _bulk(actions: Iterable[dict[str, Any]], *, refresh: bool = False) -> int:
+    """
+    Send bulk actions, pulled lazily from actions, in requests of
+    opensearch_bulk_chunk_size actions with up to opensearch_bulk_workers requests
+    in flight. Requests rejected with 429 are retried with backoff; any other
+    failed action raises BulkIndexError. Returns the number of actions applied and
+    logs docs/s.
+    """
+    global _bulk_docs
+    client = get_client()
+    # Shared by all senders: next() never awaits, so each action is sent once.
+    pending = iter(actions)
+
+    async def send() -> int:
+        applied = 0
+        async for ok, _ in async_streaming_bulk(
+            client,
+            pending,
+            chunk_size=max(settings.opensearch_bulk_chunk_size, 1),
+            max_chunk_bytes=settings.opensearch_bulk_max_bytes,
+            max_retries=settings.opensearch_bulk_max_retries,
+        ):
+            applied += ok
+        return applied
+
+    started = time.perf_counter()
+    senders = [
+        asyncio.create_task(send()) for _ in range(max(settings.opensearch_bulk_workers, 1))
+    ]
+    try:
+        applied = sum(await asyncio.gather(*senders))
+    except BaseException:
+        for sender in senders:
+            sender.cancel()
+        raise
+    if refresh and applied:
+        await client.indices.refresh(index=settings.opensearch_index)
+
+    elapsed = time.perf_counter() - started
+    if applied:
+        _bulk_docs += applied
+        logger.info(
+            "OpenSearch bulk docs=%d seconds=%.3f docs_per_second=%.0f",
+            applied,
+            elapsed,
+            applied / elapsed if elapsed > 0 else 0.0,
+        )
+    return applied
+
+
+async def index_chunks(
     records: Iterable[dict[str, Any]],
 ) -> None:
-    client = get_client()
-    ensure_index()
-    actions = [
+    await ensure_index()
+    await _bulk(
         {
             "_op_type": "index",
             "_index": settings.opensearch_index,
@@ -52,23 +326,142 @@ def index_chunks(
             "_source": record,
         }
         for record in records
-    ]
-    if actions:
-        helpers.bulk(client, actions)
+    )
+
+
+async def index_shared_chunks(
+    document_id: str,
+    tenant_id: str,
+    texts: Dict[str, str],
+) -> None:
+    """
+    Content-addressed store: add document_id to the per-hash document of every
+    chunk_hash -> text, creating the document (_id = chunk_hash) if it is new.
+    """
+    await ensure_index()
+    await _bulk(
+        {
+            "_op_type": "update",
+            "_index": settings.opensearch_index,
+            "_id": chunk_hash,
+            "retry_on_conflict": _REFERENCE_RETRIES,
+            "script": {"source": _ADD_REFERENCE, "params": {"document_id": document_id}},
+            "upsert": {
+                "chunk_hash": chunk_hash,
+                "text": chunk_text,
+                "tenant_id": tenant_id,
+                "document_ids": [document_id],
+            },
+        }
+        for chunk_hash, chunk_text in texts.items()
+    )
 
 
-def search_keyword(
+async def add_document_references(document_id: str, chunk_hashes: Iterable[str]) -> None:
+    """Content-addressed store: reference already indexed hashes from another document."""
+    await _bulk(
+        (
+            {
+                "_op_type": "update",
+                "_index": settings.opensearch_index,
+                "_id": chunk_hash,
+                "retry_on_conflict": _REFERENCE_RETRIES,
+                "script": {"source": _ADD_REFERENCE, "params": {"document_id": document_id}},
+            }
+            for chunk_hash in set(chunk_hashes)
+        ),
+        refresh=True,
+    )
+
+
+async def update_chunks(
+    updates: Iterable[dict[str, Any]],
+) -> None:
+    """
+    Partially update indexed chunks; each update holds "chunk_id" plus the fields
+    to change. Refreshes before returning so later queries (and delete_by_query)
+    see the new values.
+    """
+    await _bulk(
+        (
+            {
+                "_op_type": "update",
+                "_index": settings.opensearch_index,
+                "_id": update["chunk_id"],
+                "doc": update,
+            }
+            for update in updates
+        ),
+        refresh=True,
+    )
+
+
+async def delete_document_chunks(document_id: str) -> None:
+    """
+    Delete every indexed chunk belonging to a document. With the content-addressed
+    store the document's reference is removed instead, and per-hash documents
+    left without references are deleted.
+
+    By-query operations only see refreshed documents, so the index is refreshed
+    first (it may be in bulk ingest mode, with periodic refreshes off).
+    """
+    client = get_client()
+    if not await client.indices.exists(index=settings.opensearch_index):
+        return
+    await client.indices.refresh(index=settings.opensearch_index)
+    if settings.chunk_store == "content_addressed":
+        await _by_query_until_settled(
+            client.update_by_query,
+            body={
+                "query": {"term": {"document_ids": document_id}},
+                "script": {"source": _REMOVE_REFERENCE, "params": {"document_id": document_id}},
+            },
+        )
+        return
+    await _by_query_until_settled(
+        client.delete_by_query,
+        body={"query": {"term": {"document_id": document_id}}},
+    )
+
+
+async def _by_query_until_settled(operation: Any, *, body: Dict[str, Any]) -> None:
+    """
+    Run a by-query operation until no document was skipped on a version conflict
+    (another writer, e.g. add_document_references, changed it mid-run). Skipped
+    documents still match the query, so each re-run only picks up those.
+    """
+    for _ in range(_REFERENCE_RETRIES):
+        response = await operation(
+            index=settings.opensearch_index,
+            body=body,
+            conflicts="proceed",
+            refresh=True,
+        )
+        if not response.get("version_conflicts"):
+            return
+    raise RuntimeError(
+        f"{response['version_conflicts']} chunk(s) kept conflicting after "
+        f"{_REFERENCE_RETRIES} by-query runs on {settings.opensearch_index}"
+    )
+
+
+async def search_keyword(
     query_text: str,
     size: int = 20,
     document_ids: Optional[list[str]] = None,
-) -> List[dict[str, Any]]:
+) -> List[str]:
     """
-    Keyword BM25 search over chunk text.
+    Keyword BM25 search over chunk text; returns child chunk ids (chunk hashes
+    with the content-addressed store), best first.
+
+    Documents are indexed with _id = chunk_id (chunk_hash), so hits carry no
+    _source at all (filter_path trims the response to the ids). The shard
+    request cache serves repeated queries until the next index refresh.
     """
-    client = get_client()
     filter_clause: list[dict[str, Any]] = []
     if document_ids:
-        filter_clause.append({"terms": {"document_id": document_ids}})
+        field = "document_ids" if settings.chunk_store == "content_addressed" else "document_id"
+        filter_clause.append({"terms": {field: document_ids}})
 
     keyword_query: dict[str, Any] = {
         "bool": {
@@ -77,8 +470,10 @@ def search_keyword(
         }
     }
 
-    res = client.search(
+    res = await get_client().search(
         index=settings.opensearch_index,
-        body={"size": size, "query": keyword_query},
+        body={"size": size, "query": keyword_query, "_source": False},
+        request_cache=True,
+        filter_path="hits.hits._id",
     )
-    return res.get("hits", {}).get("hits", [])
+    return [hit["_id"] for hit in res.get("hits", {}).get("hits", [])]
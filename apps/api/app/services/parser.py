@@ -1,33 +1,174 @@
-from typing import List, Tuple
-import io
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Deque, List, Optional, Tuple
+import asyncio
+import codecs
+import logging
+import os
+import signal
 
 from PyPDF2 import PdfReader
 
+from ..core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+# Plain-text documents are decoded in blocks of this size.
+_TEXT_READ_BYTES = 1024 * 1024
+
+
+class _PageTimeout(Exception):
+    pass
+
 
 def _sanitize_text(text: str) -> str:
     # Remove NULs and other problematic control characters for Postgres.
     return text.replace("\x00", "")
 
 
-async def parse_document(content: bytes, content_type: str) -> List[Tuple[int, str]]:
+def _worker_count() -> int:
+    return max(settings.pdf_parse_workers or os.cpu_count() or 1, 1)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=_worker_count())
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _raise_page_timeout(signum, frame) -> None:
+    raise _PageTimeout()
+
+
+def _count_pdf_pages(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+def _extract_pdf_range(
+    path: str,
+    first_page: int,
+    last_page: int,
+    page_timeout: float,
+) -> List[Tuple[int, str]]:
     """
-    Parse a document into (page_number, text) tuples.
+    Extract pages [first_page, last_page] (1-based, inclusive) in a pool process.
 
-    - For PDFs: use PyPDF2 to extract page text.
-    - For everything else: UTF-8 decode with best-effort fallback.
+    Each page gets its own SIGALRM-based timeout; a page that exceeds it (or fails
+    to parse) yields empty text instead of stalling the whole document.
+    """
+    reader = PdfReader(path)
+    # Pool workers run tasks on their main thread, so SIGALRM can interrupt extraction.
+    use_alarm = page_timeout > 0 and hasattr(signal, "setitimer")
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_page_timeout)
+
+    pages: List[Tuple[int, str]] = []
+    try:
+        for page_no in range(first_page, last_page + 1):
+            try:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, page_timeout)
+                page_text = reader.pages[page_no - 1].extract_text() or ""
+            except _PageTimeout:
+                logger.warning("PDF page %d timed out after %.1fs; skipping", page_no, page_timeout)
+                page_text = ""
+            except Exception:
+                logger.warning("PDF page %d failed to extract; skipping", page_no, exc_info=True)
+                page_text = ""
+            finally:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+            pages.append((page_no, _sanitize_text(page_text)))
+    finally:
+        if use_alarm:
+            signal.signal(signal.SIGALRM, previous)
+    return pages
+
+
+async def iter_pdf_pages(path: str) -> AsyncIterator[Tuple[int, str]]:
+    """
+    Extract a PDF on disk into (page_number, text) tuples using the process pool.
+
+    Pages are split into contiguous ranges that are extracted in parallel and
+    yielded in page order. Only about one range per pool worker is in flight, so
+    memory stays bounded however many pages the document has.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+
+    page_count = await loop.run_in_executor(pool, _count_pdf_pages, path)
+    if page_count == 0:
+        return
+
+    range_size = max(settings.pdf_pages_per_task, 1)
+    page_timeout = settings.pdf_page_timeout_seconds
+    ranges = iter(
+        (first, min(first + range_size - 1, page_count))
+        for first in range(1, page_count + 1, range_size)
+    )
+    in_flight: Deque[asyncio.Future] = deque()
+
+    def submit_next() -> None:
+        next_range = next(ranges, None)
+        if next_range is not None:
+            in_flight.append(
+                loop.run_in_executor(pool, _extract_pdf_range, path, *next_range, page_timeout)
+            )
+
+    for _ in range(_worker_count()):
+        submit_next()
+    try:
+        while in_flight:
+            pages = await in_flight.popleft()
+            submit_next()
+            for page in pages:
+                yield page
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM on a hostile PDF); start a fresh pool next time.
+        shutdown_pool()
+        raise
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+async def iter_document_pages(path: str, content_type: str) -> AsyncIterator[Tuple[int, str]]:
+    """
+    Stream a document on disk as (page_number, text) tuples.
+
+    - For PDFs: extract page text with PyPDF2 in a process pool (off the event loop).
+    - For everything else: UTF-8 decode with best-effort fallback, yielded as
+      consecutive pieces of page 1 (see chunker.iter_chunks).
     """
     content_type_lower = (content_type or "").lower()
+    with open(path, "rb") as f:
+        header = f.read(len(b"%PDF"))
 
     # Basic PDF detection by content type or header.
-    if "pdf" in content_type_lower or content.startswith(b"%PDF"):
-        reader = PdfReader(io.BytesIO(content))
-        pages: List[Tuple[int, str]] = []
-        for i, page in enumerate(reader.pages, start=1):
-            page_text = page.extract_text() or ""
-            pages.append((i, _sanitize_text(page_text)))
-        return pages
+    if "pdf" in content_type_lower or header.startswith(b"%PDF"):
+        async for page in iter_pdf_pages(path):
+            yield page
+        return
 
     # Fallback: treat as UTF-8 text.
-    text = content.decode("utf-8", errors="ignore")
-    return [(1, _sanitize_text(text))]
-
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    with open(path, "rb") as f:
+        while True:
+            block = await asyncio.to_thread(f.read, _TEXT_READ_BYTES)
+            text = decoder.decode(block, final=not block)
+            if text:
+                yield (1, _sanitize_text(text))
+            if not block:
+                break
@@ -0,0 +1,125 @@
+from datetime import timedelta
+from hashlib import sha256
+from typing import Any, Optional
+import logging
+import random
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..core.config import get_settings
+from ..db import models
+from ..db.session import async_session
+from .cache import TTLCache
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Fraction of shared-tier writes that also sweep expired rows.
+_PURGE_PROBABILITY = 0.01
+
+
+def normalize_question(text: str) -> str:
+    """Collapse whitespace and case so trivially different phrasings share an entry."""
+    return " ".join((text or "").split()).casefold()
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace only (embedding models may be case-sensitive)."""
+    return " ".join((text or "").split())
+
+
+class QueryCache:
+    """
+    Query-side cache: an in-process TTL LRU, optionally backed by a Postgres table
+    (`query_cache`) so all API worker processes share entries.
+
+    Values must be JSON-serializable.
+    """
+
+    def __init__(self, namespace: str) -> None:
+        self.namespace = namespace
+        self.local = TTLCache(
+            max_entries=settings.query_cache_max_entries,
+            ttl_seconds=settings.query_cache_ttl_seconds,
+        )
+        self.shared_hits = 0
+        self.shared_misses = 0
+
+    def _shared_key(self, key: str) -> str:
+        return sha256(key.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None or not settings.query_cache_shared:
+            return value
+
+        try:
+            async with async_session() as session:
+                value = await session.scalar(
+                    select(models.QueryCacheEntry.value).where(
+                        models.QueryCacheEntry.namespace == self.namespace,
+                        models.QueryCacheEntry.key == self._shared_key(key),
+                        models.QueryCacheEntry.expires_at > func.now(),
+                    )
+                )
+        except Exception:
+            logger.warning("Shared query cache lookup failed", exc_info=True)
+            return None
+
+        if value is None:
+            self.shared_misses += 1
+            return None
+        self.shared_hits += 1
+        value = value.get("v")
+        self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self.local.set(key, value)
+        if not settings.query_cache_shared:
+            return
+
+        ttl = timedelta(seconds=settings.query_cache_ttl_seconds)
+        stmt = pg_insert(models.QueryCacheEntry).values(
+            namespace=self.namespace,
+            key=self._shared_key(key),
+            value={"v": value},
+            expires_at=func.now() + ttl,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.QueryCacheEntry.namespace, models.QueryCacheEntry.key],
+            set_={"value": stmt.excluded.value, "expires_at": stmt.excluded.expires_at},
+        )
+        try:
+            async with async_session() as session:
+                await session.execute(stmt)
+                if random.random() < _PURGE_PROBABILITY:
+                    await session.execute(
+                        delete(models.QueryCacheEntry).where(
+                            models.QueryCacheEntry.expires_at <= func.now()
+                        )
+                    )
+                await session.commit()
+        except Exception:
+            logger.warning("Shared query cache write failed", exc_info=True)
+
+    def stats(self) -> dict[str, Any]:
+        stats = self.local.stats()
+        if settings.query_cache_shared:
+            stats["shared_hits"] = self.shared_hits
+            stats["shared_misses"] = self.shared_misses
+        return stats
+
+
+# normalized question -> HyDE hypothetical answer
+hyde_cache = QueryCache("hyde")
+# normalized query text -> query embedding
+query_embedding_cache = QueryCache("query_embedding")
+
+
+def cache_stats() -> dict[str, Any]:
+    return {
+        "hyde": hyde_cache.stats(),
+        "query_embedding": query_embedding_cache.stats(),
+    }
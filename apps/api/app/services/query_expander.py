@@ -1,19 +1,12 @@
-import httpx
-
 from ..core.config import get_settings
+from . import llm_client
+from .query_cache import hyde_cache, normalize_question
 
 settings = get_settings()
 
 
-async def hyde_expand(question: str) -> str:
-    """
-    HyDE-style query expansion using the local LLM.
-
-    Returns an expanded query text; on failure returns the original question.
-    """
-    if not settings.hyde_enabled:
-        return question
-
+async def _generate_hypothetical(question: str) -> str | None:
+    """Ask the LLM for a hypothetical answer; None on failure or empty output."""
     prompt = (
         "Write a short hypothetical answer that would likely appear in a document. "
         "Do not mention that this is hypothetical. Keep it concise.\n\n"
@@ -21,26 +14,32 @@ async def hyde_expand(question: str) -> str:
     )
 
     try:
-        async with httpx.AsyncClient(
-            base_url=settings.local_llm_base_url,
-            timeout=httpx.Timeout(60.0),
-        ) as client:
-            resp = await client.post(
-                "/api/chat",
-                json={
-                    "model": settings.local_llm_model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "stream": False,
-                    "options": {"num_predict": 160},
-                },
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            expanded = data.get("message", {}).get("content", "") or ""
-            expanded = expanded.strip()
-            if not expanded:
-                return question
-            return f"{question}\n\n{expanded}"
+        expanded = await llm_client.chat(
+            [{"role": "user", "content": prompt}],
+            options={"num_predict": 160},
+            timeout=60.0,
+        )
+        return expanded.strip() or None
     except Exception:
+        return None
+
+
+async def hyde_expand(question: str) -> str:
+    """
+    HyDE-style query expansion using the local LLM.
+
+    Expansions are cached per normalized question (see query_cache), so repeated
+    questions skip the LLM round trip. Returns an expanded query text; on failure
+    returns the original question (failures are not cached).
+    """
+    if not settings.hyde_enabled:
         return question
 
+    key = f"{settings.local_llm_model}|{normalize_question(question)}"
+    expanded = await hyde_cache.get(key)
+    if expanded is None:
+        expanded = await _generate_hypothetical(question)
+        if expanded is None:
+            return question
+        await hyde_cache.set(key, expanded)
+    return f"{question}\n\n{expanded}"
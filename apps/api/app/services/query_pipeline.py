@@ -5,17 +5,12 @@ import logging
 from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 
-from sqlalchemy import select
-
 from ..core.config import get_settings
-from ..db import models
-from ..db.session import async_session
-from .embeddings import embed_query
-from .generator import generate_answer_with_citations
-from .opensearch_index import search_keyword
-from .query_expander import hyde_expand
+from . import answer_cache
+from .generator import generate_answer
+from .hydration import hydrate_children, hydrate_chunk_hashes
 from .reranker import rerank
-from .vector_search import vector_search_child_chunks
+from .retrieval import retrieve_candidates
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -31,32 +26,6 @@ class RetrievedContextChunk:
     text: str
 
 
-def _slice_window(
-    text: str,
-    *,
-    rel_start: int,
-    rel_end: int,
-    window_chars: int,
-) -> str:
-    """
-    Extract a window of text around a relevant span so the LLM sees the part
-    that triggered retrieval (avoids truncation hiding the answer).
-    """
-    if not text:
-        return ""
-
-    rel_start = max(rel_start, 0)
-    rel_end = max(rel_end, rel_start)
-    span_center = (rel_start + rel_end) // 2
-
-    half = max(window_chars // 2, 1)
-    start = max(span_center - half, 0)
-    end = min(start + window_chars, len(text))
-    start = max(end - window_chars, 0)
-    snippet = text[start:end]
-    return snippet.strip()
-
-
 def _rrf_merge(
     *,
     keyword_ids: List[str],
@@ -74,89 +43,79 @@ def _rrf_merge(
     return sorted(scores.keys(), key=lambda x: scores[x], reverse=True)
 
 
-async def answer_question(
+async def retrieve_context(
     *,
     question: str,
     top_k: int,
     document_ids: Optional[list[UUID]] = None,
-) -> Tuple[str, List]:
+) -> List[RetrievedContextChunk]:
     """
-    Full Phase-2 query pipeline:
-    - optional HyDE expansion
-    - BM25 retrieval (OpenSearch) + vector retrieval (pgvector)
+    Retrieval half of the query pipeline; returns the context for the LLM, best first:
+    - BM25 retrieval (OpenSearch) on the raw question, concurrently with
+      optional HyDE expansion + vector retrieval (see retrieval.py)
     - RRF merge
     - cross-encoder rerank
-    - expand to parent chunks
-    - generate answer with citations
+    - expand to parent chunks (with the content-addressed chunk_store, a shared
+      text expands to the parents of every referencing document)
     """
-    expanded_query = await hyde_expand(question)
-    query_vec = await embed_query(expanded_query)
-
-    doc_ids_str = [str(d) for d in (document_ids or [])]
-
-    keyword_hits = search_keyword(
-        query_text=expanded_query,
-        size=settings.retrieve_k_keyword,
-        document_ids=doc_ids_str or None,
-    )
-    keyword_ids = [h.get("_source", {}).get("chunk_id") for h in keyword_hits]
-    keyword_ids = [cid for cid in keyword_ids if cid]
-
-    vector_ids = await vector_search_child_chunks(
-        query_embedding=query_vec,
-        limit=settings.retrieve_k_vector,
-        document_ids=document_ids or None,
-    )
+    retrieved = await retrieve_candidates(question=question, document_ids=document_ids)
+    keyword_ids = retrieved.keyword_ids
+    vector_ids = retrieved.vector_ids
 
     merged_ids = _rrf_merge(keyword_ids=keyword_ids, vector_ids=vector_ids)
     merged_ids = merged_ids[: max(settings.retrieve_k_merge, top_k)]
 
     if not merged_ids:
-        return "No relevant chunks found.", []
+        return []
 
     if settings.debug_prompts:
         logger.info(
-            "Retrieval debug: question=%r hyde=%s keyword_hits=%d vector_hits=%d merged=%d",
+            "Retrieval debug: question=%r hyde=%s keyword_hits=%d vector_hits=%d merged=%d "
+            "seconds=%s degraded=%s",
             question,
             "on" if settings.hyde_enabled else "off",
             len(keyword_ids),
             len(vector_ids),
             len(merged_ids),
+            {k: round(v, 3) for k, v in retrieved.seconds.items()},
+            retrieved.degraded,
         )
 
-    merged_uuid_ids: List[UUID] = []
-    merged_id_order: List[str] = []
-    for cid in merged_ids:
-        try:
-            merged_uuid_ids.append(UUID(str(cid)))
-            merged_id_order.append(str(cid))
-        except Exception:
-            continue
-
-    async with async_session() as session:
-        stmt = (
-            select(models.ChildChunk, models.Document)
-            .join(models.Document, models.ChildChunk.document_id == models.Document.id)
-            .where(models.ChildChunk.id.in_(merged_uuid_ids))
+    context_limit = max(settings.max_parent_chunks_for_llm, top_k)
+    if settings.chunk_store == "content_addressed":
+        # Candidates are chunk hashes. Each distinct text is reranked once, through
+        # one representative child, and expanded to all its references below.
+        references = await hydrate_chunk_hashes(
+            merged_ids, document_ids=document_ids, per_hash=context_limit
         )
-        rows = (await session.execute(stmt)).all()
-
-        child_by_id: Dict[str, Tuple[models.ChildChunk, models.Document]] = {
-            str(child.id): (child, doc) for child, doc in rows
-        }
-        ordered_children: List[Tuple[str, models.ChildChunk, models.Document]] = []
-        for cid in merged_id_order:
-            item = child_by_id.get(str(cid))
-            if item:
-                ordered_children.append((str(cid), item[0], item[1]))
+        ordered_children = [references[h][0] for h in merged_ids if references.get(h)]
+        expansions = {child.id: references[child.chunk_hash] for child in ordered_children}
+    else:
+        merged_uuid_ids: List[UUID] = []
+        merged_id_order: List[str] = []
+        for cid in merged_ids:
+            try:
+                merged_uuid_ids.append(UUID(str(cid)))
+                merged_id_order.append(str(cid))
+            except Exception:
+                continue
+
+        # One round trip: candidate children with their parent window and filename.
+        child_by_id = await hydrate_children(merged_uuid_ids)
+        ordered_children = [child_by_id[cid] for cid in merged_id_order if cid in child_by_id]
+        expansions = {child.id: [child] for child in ordered_children}
 
     # Rerank the merged candidates
-    rerank_candidates = [(cid, child.text) for cid, child, _ in ordered_children]
-    reranked = await rerank(query=question, candidates=rerank_candidates)
+    rerank_candidates = [(child.id, child.text) for child in ordered_children]
+    reranked = await rerank(
+        query=question,
+        candidates=rerank_candidates,
+        candidate_hashes=[child.chunk_hash for child in ordered_children],
+    )
     reranked_ids = [cid for cid, _ in reranked[: settings.rerank_top_n]]
 
     if not reranked_ids:
-        return "No relevant chunks found.", []
+        return []
 
     if settings.debug_prompts:
         top_debug = reranked[: min(len(reranked), settings.rerank_top_n)]
@@ -164,68 +123,24 @@ async def answer_question(
 
     # Expand to parent chunks but keep the "relevant window" around the top child chunk
     # for that parent (small-to-big retrieval).
-    parent_pick: List[tuple[str, models.ChildChunk]] = []
-    parent_seen: set[str] = set()
-    for cid in reranked_ids:
-        child, _doc = child_by_id[cid]
-        pid = str(child.parent_id)
-        if pid in parent_seen:
-            continue
-        parent_seen.add(pid)
-        parent_pick.append((pid, child))
-        if len(parent_pick) >= max(settings.max_parent_chunks_for_llm, top_k):
-            break
-
-    parent_ids = [pid for pid, _ in parent_pick]
-
-    parent_uuid_ids: List[UUID] = []
-    for pid in parent_ids:
-        try:
-            parent_uuid_ids.append(UUID(pid))
-        except Exception:
-            continue
-
-    async with async_session() as session:
-        stmt = (
-            select(models.ParentChunk, models.Document)
-            .join(models.Document, models.ParentChunk.document_id == models.Document.id)
-            .where(models.ParentChunk.id.in_(parent_uuid_ids))
-        )
-        rows = (await session.execute(stmt)).all()
-        parent_by_id: Dict[str, Tuple[models.ParentChunk, models.Document]] = {
-            str(p.id): (p, d) for p, d in rows
-        }
-
     context_chunks: List[RetrievedContextChunk] = []
-    child_by_parent: Dict[str, models.ChildChunk] = {pid: child for pid, child in parent_pick}
-
-    for pid in parent_ids:
-        if pid not in parent_by_id:
+    parent_seen: set[UUID] = set()
+    for child in (c for cid in reranked_ids for c in expansions[cid]):
+        if child.parent_id in parent_seen:
             continue
-        parent, doc = parent_by_id[pid]
-        child = child_by_parent.get(pid)
-        if child:
-            rel_start = (child.char_start or 0) - (parent.char_start or 0)
-            rel_end = (child.char_end or 0) - (parent.char_start or 0)
-            snippet = _slice_window(
-                parent.text,
-                rel_start=rel_start,
-                rel_end=rel_end,
-                window_chars=settings.max_parent_chunk_chars_for_llm,
-            )
-        else:
-            snippet = (parent.text or "")[: settings.max_parent_chunk_chars_for_llm]
-
+        parent_seen.add(child.parent_id)
         context_chunks.append(
             RetrievedContextChunk(
-                chunk_id=parent.id,
-                document_id=doc.id,
-                filename=doc.filename,
-                page_start=parent.page_start,
-                page_end=parent.page_end,
-                text=snippet,
+                chunk_id=child.parent_id,
+                document_id=child.document_id,
+                filename=child.filename,
+                page_start=child.page_start,
+                page_end=child.page_end,
+                text=child.window,
             )
         )
+        if len(context_chunks) >= context_limit:
+            break
 
     if settings.debug_prompts:
         for i, cc in enumerate(context_chunks, start=1):
@@ -240,10 +155,32 @@ async def answer_question(
                 (cc.text or "")[:500],
             )
 
+    return context_chunks
+
+
+async def answer_question(
+    *,
+    question: str,
+    top_k: int,
+    document_ids: Optional[list[UUID]] = None,
+) -> Tuple[str, List]:
+    """
+    Full query pipeline: answer cache lookup, then retrieve_context and answer
+    generation with citations on a miss.
+    """
+    cached = await answer_cache.probe(question=question, top_k=top_k, document_ids=document_ids)
+    if cached.hit:
+        if settings.debug_prompts:
+            logger.info("Answer cache hit: question=%r similarity=%.4f", question, cached.similarity)
+        return cached.answer, cached.citations
+
+    context_chunks = await retrieve_context(
+        question=question, top_k=top_k, document_ids=document_ids
+    )
     if not context_chunks:
         return "No relevant chunks found.", []
 
-    answer, citations = await generate_answer_with_citations(
-        question=question, chunks=context_chunks
-    )
-    return answer, citations
+    result = await generate_answer(question=question, chunks=context_chunks)
+    if result.from_llm:
+        answer_cache.store(cached, result.answer, result.citations)
+    return result.answer, result.citations
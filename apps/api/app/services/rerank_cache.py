@@ -0,0 +1,142 @@
+from hashlib import sha256
+from typing import Any, Dict, Iterable, Optional, Sequence
+import asyncio
+import logging
+import os
+import sqlite3
+import sys
+import threading
+
+from ..core.config import get_settings
+from .cache import SizedLRUCache
+from .query_cache import normalize_text
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Rough per-entry overhead of the OrderedDict slot + tuple on top of key/value.
+_ENTRY_OVERHEAD_BYTES = 100
+# SQLite caps bound parameters per statement (999 on older builds).
+_DISK_LOOKUP_BATCH = 500
+
+
+def score_key(model_name: str, query: str, chunk_hash: str) -> bytes:
+    """Cache key for a cross-encoder score: (model, normalized query, chunk hash)."""
+    raw = f"{model_name}\x1f{normalize_text(query)}\x1f{chunk_hash}"
+    return sha256(raw.encode("utf-8")).digest()
+
+
+def _entry_size(key: Any, value: Any) -> int:
+    return sys.getsizeof(key) + sys.getsizeof(value) + _ENTRY_OVERHEAD_BYTES
+
+
+class _DiskTier:
+    """SQLite-backed score store that survives restarts (WAL, safe across processes)."""
+
+    def __init__(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rerank_scores (key BLOB PRIMARY KEY, score REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get_many(self, keys: Sequence[bytes]) -> Dict[bytes, float]:
+        found: Dict[bytes, float] = {}
+        with self._lock:
+            for i in range(0, len(keys), _DISK_LOOKUP_BATCH):
+                batch = list(keys[i : i + _DISK_LOOKUP_BATCH])
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, score FROM rerank_scores WHERE key IN ({placeholders})",
+                    batch,
+                )
+                for key, score in rows:
+                    found[bytes(key)] = float(score)
+        return found
+
+    def set_many(self, items: Iterable[tuple[bytes, float]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rerank_scores (key, score) VALUES (?, ?)",
+                list(items),
+            )
+            self._conn.commit()
+
+
+class RerankScoreCache:
+    """
+    Two-tier cache of cross-encoder scores: a byte-budgeted in-memory LRU, plus an
+    optional on-disk SQLite tier (rerank_cache_path) that survives restarts.
+    """
+
+    def __init__(self) -> None:
+        self.memory = SizedLRUCache(
+            max_bytes=settings.rerank_cache_max_bytes,
+            size_of=_entry_size,
+        )
+        self._disk: Optional[_DiskTier] = None
+        self._disk_failed = False
+        self.disk_hits = 0
+        self.disk_misses = 0
+
+    def _get_disk(self) -> Optional[_DiskTier]:
+        if self._disk is None and settings.rerank_cache_path and not self._disk_failed:
+            try:
+                self._disk = _DiskTier(settings.rerank_cache_path)
+            except Exception:
+                logger.warning("Rerank disk cache unavailable; using memory only", exc_info=True)
+                self._disk_failed = True
+        return self._disk
+
+    async def get_many(self, keys: Sequence[bytes]) -> Dict[bytes, float]:
+        found: Dict[bytes, float] = {}
+        missing: list[bytes] = []
+        for key in keys:
+            score = self.memory.get(key)
+            if score is None:
+                missing.append(key)
+            else:
+                found[key] = score
+
+        disk = self._get_disk()
+        if missing and disk is not None:
+            try:
+                from_disk = await asyncio.to_thread(disk.get_many, missing)
+            except Exception:
+                logger.warning("Rerank disk cache lookup failed", exc_info=True)
+                from_disk = {}
+            self.disk_hits += len(from_disk)
+            self.disk_misses += len(missing) - len(from_disk)
+            for key, score in from_disk.items():
+                self.memory.set(key, score)
+            found.update(from_disk)
+        return found
+
+    async def set_many(self, items: Dict[bytes, float]) -> None:
+        if not items:
+            return
+        for key, score in items.items():
+            self.memory.set(key, score)
+        disk = self._get_disk()
+        if disk is not None:
+            try:
+                await asyncio.to_thread(disk.set_many, items.items())
+            except Exception:
+                logger.warning("Rerank disk cache write failed", exc_info=True)
+
+    def stats(self) -> dict[str, Any]:
+        stats = self.memory.stats()
+        if self._disk is not None:
+            stats["disk_hits"] = self.disk_hits
+            stats["disk_misses"] = self.disk_misses
+        return stats
+
+
+score_cache = RerankScoreCache()
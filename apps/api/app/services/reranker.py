@@ -1,41 +1,230 @@
+from typing import Any, List, Optional, Tuple
+from uuid import UUID
 import asyncio
-from typing import List, Tuple
+import logging
+import time
 
+import numpy as np
 from sentence_transformers import CrossEncoder
+from sqlalchemy import select
 
 from ..core.config import get_settings
+from ..db import models
+from ..db.session import async_session
+from .batcher import MicroBatcher
+from .chunker import hash_text
+from .embeddings import embed_query, embed_texts
+from .rerank_cache import score_cache, score_key
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
-_model: CrossEncoder | None = None
 
+def _pair_length(pair: Tuple[str, str]) -> int:
+    return len(pair[0]) + len(pair[1])
 
-def _get_model() -> CrossEncoder:
-    global _model
-    if _model is None:
-        _model = CrossEncoder(settings.reranker_model_name)
-    return _model
+
+class _CrossEncoderStage:
+    """A lazily loaded cross-encoder with its own micro-batcher and score-cache keys."""
+
+    def __init__(self, model_name: str, *, name: str) -> None:
+        self.model_name = model_name
+        self._model: CrossEncoder | None = None
+        # Concurrent queries' candidate pairs are scored in one cross-encoder pass.
+        self.batcher = MicroBatcher(
+            self._predict,
+            max_batch_items=settings.rerank_batch_max_items,
+            max_wait_ms=settings.inference_batch_max_wait_ms,
+            length=_pair_length,
+            name=name,
+        )
+        # Running estimate of model time per (uncached) pair.
+        self.seconds_per_pair: float | None = None
+
+    def _get_model(self) -> CrossEncoder:
+        if self._model is None:
+            self._model = CrossEncoder(self.model_name)
+        return self._model
+
+    def _predict(self, pairs: List[Tuple[str, str]]):
+        return self._get_model().predict(pairs, show_progress_bar=False)
+
+    async def score(self, query: str, texts: List[str], hashes: List[str]) -> List[float]:
+        """
+        Score (query, text) pairs, consulting the score cache first so only uncached
+        pairs reach the model.
+        """
+        keys = [score_key(self.model_name, query, chunk_hash) for chunk_hash in hashes]
+        cached = await score_cache.get_many(keys)
+
+        miss_positions = [i for i, key in enumerate(keys) if key not in cached]
+        if miss_positions:
+            pairs = [(query, texts[i]) for i in miss_positions]
+            started = time.perf_counter()
+            miss_scores = await self.batcher.submit(pairs)
+            per_pair = (time.perf_counter() - started) / len(pairs)
+            self.seconds_per_pair = (
+                per_pair
+                if self.seconds_per_pair is None
+                else 0.8 * self.seconds_per_pair + 0.2 * per_pair
+            )
+            fresh = {keys[i]: float(score) for i, score in zip(miss_positions, miss_scores)}
+            await score_cache.set_many(fresh)
+            cached.update(fresh)
+
+        return [cached[key] for key in keys]
+
+
+_heavy = _CrossEncoderStage(settings.reranker_model_name, name="reranker")
+_first_stage = _CrossEncoderStage(
+    settings.rerank_cascade_model_name, name="reranker-first-stage"
+)
+
+_cascade_stats = {
+    "queries": 0,
+    "candidates": 0,
+    "heavy_candidates": 0,
+    "first_stage_seconds": 0.0,
+    "estimated_saved_seconds": 0.0,
+}
+
+
+def batcher_stats() -> dict:
+    return _heavy.batcher.stats()
+
+
+def cascade_stats() -> dict[str, Any]:
+    return {
+        "enabled": settings.rerank_cascade_enabled,
+        "first_stage": settings.rerank_cascade_first_stage,
+        **_cascade_stats,
+    }
+
+
+async def _stored_embeddings(
+    candidate_ids: List[str], hashes: List[str]
+) -> List[Optional[np.ndarray]]:
+    """The embeddings ingestion stored for each candidate (None when there is none)."""
+    async with async_session() as session:
+        if settings.chunk_store == "content_addressed":
+            content = models.ChunkContent
+            rows = await session.execute(
+                select(content.chunk_hash, content.embedding).where(
+                    content.model_name == settings.embedding_model_name,
+                    content.chunk_hash.in_(set(hashes)),
+                )
+            )
+            by_hash = dict(rows.all())
+            return [by_hash.get(chunk_hash) for chunk_hash in hashes]
+
+        ids: List[Optional[UUID]] = []
+        for candidate_id in candidate_ids:
+            try:
+                ids.append(UUID(candidate_id))
+            except ValueError:
+                ids.append(None)
+        stored = models.ChunkEmbedding
+        rows = await session.execute(
+            select(stored.child_chunk_id, stored.embedding).where(
+                stored.model_name == settings.embedding_model_name,
+                stored.child_chunk_id.in_({i for i in ids if i is not None}),
+            )
+        )
+        by_id = dict(rows.all())
+        return [by_id.get(i) if i is not None else None for i in ids]
+
+
+async def _bi_encoder_scores(
+    query: str, candidate_ids: List[str], texts: List[str], hashes: List[str]
+) -> List[float]:
+    """Cosine similarity between the query and the candidates' stored embeddings."""
+    query_vec, stored = await asyncio.gather(
+        embed_query(query), _stored_embeddings(candidate_ids, hashes)
+    )
+    query_vec = np.asarray(query_vec, dtype=np.float32)
+    # Only candidates without a stored vector (none, normally) are encoded here;
+    # nothing is written on the query path.
+    missing = [i for i, vector in enumerate(stored) if vector is None]
+    if missing:
+        for i, vector in zip(missing, await embed_texts([texts[i] for i in missing])):
+            stored[i] = vector
+    matrix = np.asarray(stored, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query_vec) or 1.0)
+    norms[norms == 0] = 1.0
+    return (matrix @ query_vec / norms).tolist()
+
+
+async def _first_stage_survivors(
+    query: str,
+    candidates: List[Tuple[str, str]],
+    hashes: List[str],
+) -> List[int]:
+    """Indices of the candidates the cheap first stage keeps, best first."""
+    keep = max(settings.rerank_cascade_keep, settings.rerank_top_n)
+    if len(candidates) <= keep:
+        return list(range(len(candidates)))
+
+    texts = [text for _, text in candidates]
+    started = time.perf_counter()
+    if settings.rerank_cascade_first_stage == "bi_encoder":
+        ids = [candidate_id for candidate_id, _ in candidates]
+        scores = await _bi_encoder_scores(query, ids, texts, hashes)
+    else:
+        scores = await _first_stage.score(query, texts, hashes)
+    elapsed = time.perf_counter() - started
+
+    order = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+    survivors = order[:keep]
+
+    _cascade_stats["first_stage_seconds"] += elapsed
+    if _heavy.seconds_per_pair is not None:
+        saved = (len(candidates) - len(survivors)) * _heavy.seconds_per_pair - elapsed
+        _cascade_stats["estimated_saved_seconds"] += saved
+        if settings.debug_prompts:
+            logger.info(
+                "Rerank cascade: %d -> %d candidates, first_stage=%.3fs, est_saved=%.3fs",
+                len(candidates),
+                len(survivors),
+                elapsed,
+                saved,
+            )
+    return survivors
 
 
 async def rerank(
     *,
     query: str,
     candidates: List[Tuple[str, str]],
+    candidate_hashes: Optional[List[str]] = None,
 ) -> List[Tuple[str, float]]:
     """
     Rerank candidate texts with a cross-encoder.
 
     candidates: list of (candidate_id, candidate_text)
+    candidate_hashes: optional content hash per candidate (child chunk_hash); used
+        as the score-cache key, computed from the text when omitted
     returns: list of (candidate_id, score) sorted desc
+
+    Scores are cached per (normalized query, chunk hash, model), so only uncached
+    pairs reach the model. With rerank_cascade_enabled, a cheap first stage scores
+    every candidate and only its top rerank_cascade_keep (at least rerank_top_n)
+    are scored and returned by the heavy model.
     """
     if not candidates:
         return []
 
-    model = _get_model()
-    pairs = [(query, text) for _, text in candidates]
+    if candidate_hashes is None:
+        candidate_hashes = [hash_text(text) for _, text in candidates]
+
+    if settings.rerank_cascade_enabled:
+        survivors = await _first_stage_survivors(query, candidates, candidate_hashes)
+        _cascade_stats["queries"] += 1
+        _cascade_stats["candidates"] += len(candidates)
+        _cascade_stats["heavy_candidates"] += len(survivors)
+        candidates = [candidates[i] for i in survivors]
+        candidate_hashes = [candidate_hashes[i] for i in survivors]
 
-    scores = await asyncio.to_thread(model.predict, pairs)
-    scored = [(candidate_id, float(score)) for (candidate_id, _), score in zip(candidates, scores)]
+    scores = await _heavy.score(query, [text for _, text in candidates], candidate_hashes)
+    scored = [(candidate_id, score) for (candidate_id, _), score in zip(candidates, scores)]
     scored.sort(key=lambda x: x[1], reverse=True)
     return scored
-
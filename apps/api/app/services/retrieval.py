@@ -0,0 +1,108 @@
+"""
+Concurrent candidate retrieval for the query pipeline.
+
+The keyword (BM25) and vector branches are independent, so they run side by
+side: BM25 starts on the raw question right away, while the vector branch does
+HyDE expansion -> query embedding -> ANN search. Each branch has its own
+timeout; a branch that times out or fails contributes no candidates instead of
+failing the query, so latency is bounded by the slowest branch (or its
+timeout), not by the sum of all steps.
+"""
+
+from dataclasses import dataclass, field
+from typing import Awaitable, Dict, List, Optional
+from uuid import UUID
+import asyncio
+import logging
+import time
+
+from ..core.config import get_settings
+from .embeddings import embed_query
+from .opensearch_index import search_keyword
+from .query_expander import hyde_expand
+from .vector_search import vector_search_child_chunks, vector_search_chunk_hashes
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetrievalResult:
+    # Child chunk ids, or chunk hashes with the content-addressed chunk_store.
+    keyword_ids: List[str] = field(default_factory=list)
+    vector_ids: List[str] = field(default_factory=list)
+    # Wall time per branch, and the branches that timed out or failed.
+    seconds: Dict[str, float] = field(default_factory=dict)
+    degraded: List[str] = field(default_factory=list)
+
+
+async def _keyword_branch(question: str, document_ids: Optional[list[UUID]]) -> List[str]:
+    doc_ids_str = [str(d) for d in (document_ids or [])]
+    return await search_keyword(
+        query_text=question,
+        size=settings.retrieve_k_keyword,
+        document_ids=doc_ids_str or None,
+    )
+
+
+async def _vector_branch(question: str, document_ids: Optional[list[UUID]]) -> List[str]:
+    expanded_query = await hyde_expand(question)
+    query_vec = await embed_query(expanded_query)
+    search = (
+        vector_search_chunk_hashes
+        if settings.chunk_store == "content_addressed"
+        else vector_search_child_chunks
+    )
+    return await search(
+        query_embedding=query_vec,
+        limit=settings.retrieve_k_vector,
+        document_ids=document_ids or None,
+    )
+
+
+async def _run_branch(
+    name: str,
+    branch: Awaitable[List[str]],
+    timeout_seconds: float,
+    result: RetrievalResult,
+) -> List[str]:
+    started = time.perf_counter()
+    try:
+        return await asyncio.wait_for(branch, timeout_seconds if timeout_seconds > 0 else None)
+    except asyncio.TimeoutError:
+        logger.warning("%s retrieval timed out after %.2fs; continuing without it", name, timeout_seconds)
+        result.degraded.append(name)
+        return []
+    except Exception:
+        logger.exception("%s retrieval failed; continuing without it", name)
+        result.degraded.append(name)
+        return []
+    finally:
+        result.seconds[name] = time.perf_counter() - started
+
+
+async def retrieve_candidates(
+    *,
+    question: str,
+    document_ids: Optional[list[UUID]] = None,
+) -> RetrievalResult:
+    """
+    Run the keyword and vector retrievers concurrently; child chunk ids per branch
+    (chunk hashes with the content-addressed chunk_store).
+    """
+    result = RetrievalResult()
+    result.keyword_ids, result.vector_ids = await asyncio.gather(
+        _run_branch(
+            "keyword",
+            _keyword_branch(question, document_ids),
+            settings.retrieve_keyword_timeout_seconds,
+            result,
+        ),
+        _run_branch(
+            "vector",
+            _vector_branch(question, document_ids),
+            settings.retrieve_vector_timeout_seconds,
+            result,
+        ),
+    )
+    return result
@@ -1,17 +1,35 @@
+from dataclasses import dataclass, field
+import asyncio
 import hashlib
-from typing import Any
-from uuid import uuid4
+import logging
+from typing import Any, Optional
+from uuid import UUID, uuid4
 
 import boto3
 from fastapi import UploadFile
 from botocore.exceptions import ClientError
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 
 from ..core.config import get_settings
 from ..db import models
 from ..db.session import async_session
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# S3 rejects multipart parts smaller than 5 MiB (except the last one).
+_MIN_PART_BYTES = 5 * 1024 * 1024
+
+
+@dataclass
+class _StreamedUpload:
+    key: str
+    sha256: str
+    size_bytes: int
+    # None when the file fit in one part and was sent with put_object.
+    upload_id: Optional[str] = None
+    parts: list[dict[str, Any]] = field(default_factory=list)
 
 
 def _get_s3_client() -> Any:
@@ -43,42 +61,178 @@ def _ensure_bucket_exists(s3: Any, bucket: str) -> None:
         raise
 
 
-async def create_document_and_upload(file: UploadFile) -> models.Document:
-    content = await file.read()
-    sha256 = hashlib.sha256(content).hexdigest()
-
+async def _find_existing_document(sha256: str) -> Optional[models.Document]:
     async with async_session() as session:
         # Check for duplicate by hash within tenant (simplified tenant handling).
-        existing = await session.scalar(
+        return await session.scalar(
             select(models.Document).where(
                 models.Document.tenant_id == "default",
                 models.Document.file_sha256 == sha256,
             )
         )
-        if existing:
-            return existing
 
-        s3_key = f"documents/{uuid4()}-{file.filename}"
-        s3 = _get_s3_client()
-        _ensure_bucket_exists(s3, settings.s3_bucket)
-        s3.put_object(
+
+async def _stream_to_s3(
+    s3: Any,
+    file: UploadFile,
+    *,
+    key: str,
+    content_type: str,
+) -> _StreamedUpload:
+    """
+    Stream an upload to S3 in fixed-size parts while hashing it.
+
+    The multipart upload is left open so the caller can complete or abort it after
+    the dedupe check; uploads that fit in a single part are sent with put_object.
+    Memory use is bounded by one part regardless of file size.
+    """
+    part_size = max(settings.s3_multipart_part_bytes, _MIN_PART_BYTES)
+    hasher = hashlib.sha256()
+
+    chunk = await file.read(part_size)
+    hasher.update(chunk)
+    size = len(chunk)
+
+    if len(chunk) < part_size:
+        # Small file: one request is cheaper than a multipart round trip.
+        await asyncio.to_thread(
+            s3.put_object,
+            Bucket=settings.s3_bucket,
+            Key=key,
+            Body=chunk,
+            ContentType=content_type,
+        )
+        return _StreamedUpload(key=key, sha256=hasher.hexdigest(), size_bytes=size)
+
+    created = await asyncio.to_thread(
+        s3.create_multipart_upload,
+        Bucket=settings.s3_bucket,
+        Key=key,
+        ContentType=content_type,
+    )
+    upload_id = created["UploadId"]
+    parts: list[dict[str, Any]] = []
+    try:
+        part_number = 1
+        while chunk:
+            resp = await asyncio.to_thread(
+                s3.upload_part,
+                Bucket=settings.s3_bucket,
+                Key=key,
+                PartNumber=part_number,
+                UploadId=upload_id,
+                Body=chunk,
+            )
+            parts.append({"ETag": resp["ETag"], "PartNumber": part_number})
+            part_number += 1
+
+            chunk = await file.read(part_size)
+            hasher.update(chunk)
+            size += len(chunk)
+    except BaseException:
+        await _abort_multipart(s3, key=key, upload_id=upload_id)
+        raise
+
+    return _StreamedUpload(
+        key=key,
+        sha256=hasher.hexdigest(),
+        size_bytes=size,
+        upload_id=upload_id,
+        parts=parts,
+    )
+
+
+async def _abort_multipart(s3: Any, *, key: str, upload_id: str) -> None:
+    try:
+        await asyncio.to_thread(
+            s3.abort_multipart_upload,
             Bucket=settings.s3_bucket,
-            Key=s3_key,
-            Body=content,
-            ContentType=file.content_type or "application/octet-stream",
+            Key=key,
+            UploadId=upload_id,
+        )
+    except ClientError:
+        logger.warning("Failed to abort multipart upload key=%s upload_id=%s", key, upload_id)
+
+
+async def _complete_multipart(s3: Any, upload: _StreamedUpload) -> None:
+    await asyncio.to_thread(
+        s3.complete_multipart_upload,
+        Bucket=settings.s3_bucket,
+        Key=upload.key,
+        UploadId=upload.upload_id,
+        MultipartUpload={"Parts": upload.parts},
+    )
+    upload.upload_id = None
+
+
+async def _discard_upload(s3: Any, upload: _StreamedUpload) -> None:
+    """Drop an upload that turned out to be a duplicate."""
+    if upload.upload_id is not None:
+        await _abort_multipart(s3, key=upload.key, upload_id=upload.upload_id)
+        return
+    try:
+        await asyncio.to_thread(
+            s3.delete_object, Bucket=settings.s3_bucket, Key=upload.key
         )
+    except ClientError:
+        logger.warning("Failed to delete duplicate upload key=%s", upload.key)
 
+
+async def create_document_and_upload(
+    file: UploadFile,
+    *,
+    supersedes_id: Optional[UUID] = None,
+) -> models.Document:
+    """
+    Stream an upload into object storage and create its document record.
+
+    The file is hashed incrementally while it is sent to S3 with multipart upload;
+    once the hash is known, duplicates (same file_sha256) abort the upload and the
+    existing document is returned instead. supersedes_id marks the new document
+    as the next version of an existing one (see ingestion); a returned duplicate
+    keeps its own supersedes_id, so callers compare it to tell the two apart.
+    """
+    content_type = file.content_type or "application/octet-stream"
+    s3_key = f"documents/{uuid4()}-{file.filename}"
+    s3 = _get_s3_client()
+    await asyncio.to_thread(_ensure_bucket_exists, s3, settings.s3_bucket)
+
+    upload = await _stream_to_s3(s3, file, key=s3_key, content_type=content_type)
+
+    try:
+        existing = await _find_existing_document(upload.sha256)
+    except BaseException:
+        await _discard_upload(s3, upload)
+        raise
+    if existing:
+        await _discard_upload(s3, upload)
+        return existing
+
+    if upload.upload_id is not None:
+        await _complete_multipart(s3, upload)
+
+    async with async_session() as session:
         document = models.Document(
             tenant_id="default",
             filename=file.filename,
-            content_type=file.content_type or "application/octet-stream",
+            content_type=content_type,
             s3_bucket=settings.s3_bucket,
             s3_key=s3_key,
-            file_sha256=sha256,
+            file_sha256=upload.sha256,
             status=models.DocumentStatus.uploaded.value,
+            supersedes_id=supersedes_id,
         )
         session.add(document)
-        await session.commit()
+        try:
+            await session.commit()
+        except IntegrityError:
+            # A concurrent upload of the same file won the race on uq_doc_hash.
+            await session.rollback()
+            await _discard_upload(s3, upload)
+            existing = await _find_existing_document(upload.sha256)
+            if existing is None:
+                raise
+            return existing
         await session.refresh(document)
 
         return document
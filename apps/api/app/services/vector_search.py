@@ -1,10 +1,16 @@
-from typing import List, Optional
+from typing import Any, List, Optional, Sequence
 from uuid import UUID
 
-from sqlalchemy import select
+from pgvector.sqlalchemy import BIT, HALFVEC, Vector
+from sqlalchemy import Select, cast, exists, func, select
 
+from ..core.config import get_settings
 from ..db import models
 from ..db.session import async_session
+from ..db.vector_index import apply_search_settings
+from . import vector_store_mmap
+
+settings = get_settings()
 
 
 async def vector_search_child_chunks(
@@ -16,21 +22,126 @@ async def vector_search_child_chunks(
     """
     Returns a list of child_chunk_id strings ordered by cosine distance (best first).
 
-    Uses SQLAlchemy + pgvector operators (avoids raw SQL bind/cast issues).
+    Backend is chosen by settings.vector_backend:
+    - "pgvector": SQLAlchemy + pgvector operators (avoids raw SQL bind/cast issues),
+      see _nearest.
+    - "mmap": in-process brute-force search over memory-mapped files
+      (see vector_store_mmap), no database round trip.
     """
-    async with async_session() as session:
-        stmt = (
-            select(models.ChunkEmbedding.child_chunk_id)
-            .join(
-                models.ChildChunk,
-                models.ChildChunk.id == models.ChunkEmbedding.child_chunk_id,
+    if settings.vector_backend == "mmap":
+        return await vector_store_mmap.search(
+            query_embedding=query_embedding,
+            limit=int(limit),
+            document_ids=document_ids,
+        )
+
+    stmt = select(
+        models.ChunkEmbedding.child_chunk_id.label("key"),
+        models.ChunkEmbedding.embedding.label("embedding"),
+    ).join(
+        models.ChildChunk,
+        models.ChildChunk.id == models.ChunkEmbedding.child_chunk_id,
+    )
+    if document_ids:
+        stmt = stmt.where(models.ChildChunk.document_id.in_(document_ids))
+
+    rows = await _nearest(
+        stmt,
+        models.ChunkEmbedding.embedding,
+        query_embedding=query_embedding,
+        limit=limit,
+        filtered=bool(document_ids),
+    )
+    return [str(r) for r in rows]
+
+
+async def vector_search_chunk_hashes(
+    *,
+    query_embedding: list[float],
+    limit: int,
+    document_ids: Optional[list[UUID]] = None,
+) -> List[str]:
+    """
+    Content-addressed store: chunk_hash strings ordered by cosine distance (best
+    first), each distinct text once. With document_ids, only texts referenced by
+    at least one of those documents qualify.
+    """
+    content, child = models.ChunkContent, models.ChildChunk
+    stmt = select(
+        content.chunk_hash.label("key"),
+        content.embedding.label("embedding"),
+    ).where(content.model_name == settings.embedding_model_name)
+    if document_ids:
+        stmt = stmt.where(
+            exists().where(
+                child.chunk_hash == content.chunk_hash,
+                child.document_id.in_(document_ids),
             )
-            .order_by(models.ChunkEmbedding.embedding.cosine_distance(query_embedding))
-            .limit(int(limit))
         )
 
-        if document_ids:
-            stmt = stmt.where(models.ChildChunk.document_id.in_(document_ids))
+    return list(
+        await _nearest(
+            stmt,
+            content.embedding,
+            query_embedding=query_embedding,
+            limit=limit,
+            filtered=bool(document_ids),
+        )
+    )
+
 
-        rows = (await session.execute(stmt)).scalars().all()
-        return [str(r) for r in rows]
+async def _nearest(
+    stmt: Select,
+    embedding: Any,
+    *,
+    query_embedding: list[float],
+    limit: int,
+    filtered: bool,
+) -> Sequence[Any]:
+    """
+    Keys of the rows of stmt (columns "key", "embedding") nearest to the query.
+    The ORDER BY ... LIMIT is served by the HNSW/IVFFlat index when one exists;
+    its per-query knobs are applied to this transaction first.
+    """
+    quantization = settings.vector_index_quantization.lower()
+    coarse_limit = int(limit)
+    if quantization != "none":
+        coarse_limit = int(limit) * max(settings.vector_rescore_factor, 1)
+
+    async with async_session() as session:
+        await apply_search_settings(session, limit=coarse_limit, filtered=filtered)
+        stmt = stmt.order_by(_coarse_distance(embedding, quantization, query_embedding)).limit(
+            coarse_limit
+        )
+
+        # relaxed_order iterative scans may return rows slightly out of order.
+        relaxed = filtered and settings.vector_iterative_scan == "relaxed_order"
+        if quantization != "none" or relaxed:
+            # Coarse top-N from the (compact) index, rescored with full precision.
+            coarse = stmt.subquery()
+            stmt = (
+                select(coarse.c.key)
+                .order_by(coarse.c.embedding.cosine_distance(query_embedding))
+                .limit(int(limit))
+            )
+        else:
+            stmt = stmt.with_only_columns(stmt.selected_columns.key)
+
+        return (await session.execute(stmt)).scalars().all()
+
+
+def _coarse_distance(embedding: Any, quantization: str, query_embedding: list[float]):
+    """
+    ORDER BY expression matching the ANN index built by db.vector_index, so the
+    planner can serve it from the (possibly quantized) index.
+    """
+    dim = settings.embedding_dim
+    if quantization == "halfvec":
+        return cast(embedding, HALFVEC(dim)).cosine_distance(
+            cast(query_embedding, HALFVEC(dim))
+        )
+    if quantization == "binary":
+        return cast(func.binary_quantize(embedding), BIT(dim)).hamming_distance(
+            cast(func.binary_quantize(cast(query_embedding, Vector(dim))), BIT(dim))
+        )
+    return embedding.cosine_distance(query_embedding)
@@ -0,0 +1,559 @@
+"""
+In-process vector search over memory-mapped, append-only files.
+
+Layout of `vector_store_path`:
+- current:     symlink to the generation directory (gen-<n>/) holding the files
+               below; a rebuild writes a new generation and swaps this one link
+               (stores written before generations existed keep the files at the top)
+- .lock:       writer lock (fcntl), so appends from several processes don't interleave
+
+Files of a generation:
+- meta.json:   dimension and storage format the files were written with
+- vectors.bin: row-major matrix of L2-normalized embeddings in the storage format
+               (float32, float16, int8 scalar-quantized, or sign bits packed 8/byte)
+- full.bin:    float32 copy for exact rescoring (int8 / binary storage only; only
+               the rows of top candidates are ever paged in)
+- ids.bin:     16-byte child_chunk_id per row
+- docs.bin:    16-byte document_id per row
+- deleted.bin: 16-byte child_chunk_ids removed since the last rebuild
+
+Rows are appended vectors-first and docs-last, so readers take the row count
+from the shortest file and never see a half-written row. Every uvicorn worker
+maps the same files, so the OS page cache holds a single shared copy.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+import asyncio
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+from ..core.config import get_settings
+from ..db import models
+from ..db.session import async_session
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+STORAGE_FORMATS = ("float32", "float16", "int8", "binary")
+
+_ID_BYTES = 16
+_CURRENT = "current"
+_GENERATION_PREFIX = "gen-"
+# Rows converted to float32 per matmul block; bounds temporary memory per search.
+_BLOCK_ROWS = 16384
+
+
+# -- storage codecs ------------------------------------------------------------
+
+
+def normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def storage_row_shape(storage: str, dim: int) -> Tuple[np.dtype, int]:
+    """(numpy dtype, values per row) of one stored row."""
+    if storage == "float32":
+        return np.dtype(np.float32), dim
+    if storage == "float16":
+        return np.dtype(np.float16), dim
+    if storage == "int8":
+        return np.dtype(np.int8), dim
+    if storage == "binary":
+        return np.dtype(np.uint8), (dim + 7) // 8
+    raise ValueError(f"Unsupported vector_store_dtype: {storage!r}")
+
+
+def is_quantized(storage: str) -> bool:
+    """Whether coarse scores need exact rescoring from full.bin."""
+    return storage in {"int8", "binary"}
+
+
+def encode_rows(normalized: np.ndarray, storage: str) -> np.ndarray:
+    """Convert L2-normalized float32 rows into the storage format."""
+    if storage in {"float32", "float16"}:
+        return normalized.astype(storage)
+    if storage == "int8":
+        # Components of a unit vector lie in [-1, 1]; one fixed scale suffices.
+        return np.clip(np.rint(normalized * 127.0), -127, 127).astype(np.int8)
+    if storage == "binary":
+        return np.packbits(normalized > 0, axis=-1)
+    raise ValueError(f"Unsupported vector_store_dtype: {storage!r}")
+
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:  # numpy < 2.0
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(values: np.ndarray) -> np.ndarray:
+        return _POPCOUNT_TABLE[values]
+
+
+def coarse_scores(rows: np.ndarray, query: np.ndarray, storage: str) -> np.ndarray:
+    """
+    Similarity of stored rows to an encoded query (higher is better).
+
+    Float and int8 formats use a dot product; binary uses negated Hamming distance.
+    """
+    if storage == "binary":
+        return -_popcount(np.bitwise_xor(rows, query)).sum(axis=1, dtype=np.int32).astype(np.float32)
+    return np.asarray(rows, dtype=np.float32) @ np.asarray(query, dtype=np.float32)
+
+
+# -- store ---------------------------------------------------------------------
+
+
+def _ids_to_array(ids: Sequence[UUID]) -> np.ndarray:
+    """UUIDs -> (n, 2) uint64 array, for vectorized equality checks."""
+    raw = b"".join(u.bytes for u in ids)
+    return np.frombuffer(raw, dtype=np.uint64).reshape(-1, 2)
+
+
+class MmapVectorStore:
+    def __init__(self, path: str, dim: int, storage: str) -> None:
+        self.path = path
+        self.dim = dim
+        self.storage = storage
+        self.quantized = is_quantized(storage)
+        self.row_dtype, self.row_width = storage_row_shape(storage, dim)
+        self._lock = threading.Lock()
+        self._rows = 0
+        self._base: Optional[str] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._full: Optional[np.ndarray] = None
+        self._ids: Optional[np.ndarray] = None
+        self._docs: Optional[np.ndarray] = None
+        self._deleted: set[bytes] = set()
+        self._deleted_size = 0
+        # Per-row flag: the row's child_chunk_id is in deleted.bin.
+        self._tombstoned = np.zeros(0, dtype=bool)
+
+    def _dir(self) -> str:
+        """Directory of the current generation (the store root before the first rebuild)."""
+        link = os.path.join(self.path, _CURRENT)
+        try:
+            return os.path.join(self.path, os.readlink(link))
+        except OSError:
+            return self.path
+
+    def _file(self, name: str, base: str) -> str:
+        return os.path.join(base, name)
+
+    def _row_files(self) -> Dict[str, int]:
+        """File name -> bytes per row, in append order (docs.bin last)."""
+        files = {"vectors.bin": self.row_width * self.row_dtype.itemsize}
+        if self.quantized:
+            files["full.bin"] = self.dim * 4
+        files["ids.bin"] = _ID_BYTES
+        files["docs.bin"] = _ID_BYTES
+        return files
+
+    @contextlib.contextmanager
+    def _writer_lock(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, ".lock"), "a+b") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    @contextlib.asynccontextmanager
+    async def _async_writer_lock(self):
+        """_writer_lock, waited for in a thread so the event loop isn't blocked."""
+        lock = self._writer_lock()
+        await asyncio.to_thread(lock.__enter__)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(lock.__exit__, None, None, None)
+
+    def _check_meta(self, base: str, *, create: bool) -> None:
+        """
+        Refuse to mix formats: files written with another dimension or storage
+        format must be rebuilt (POST /admin/vector-store/rebuild) first.
+        """
+        meta_path = self._file("meta.json", base)
+        expected = {"dim": self.dim, "storage": self.storage}
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            if create:
+                with open(meta_path, "w") as f:
+                    json.dump(expected, f)
+            return
+        if meta != expected:
+            raise RuntimeError(
+                f"Vector store at {self.path} was written as {meta}, settings expect "
+                f"{expected}; rebuild it via POST /admin/vector-store/rebuild"
+            )
+
+    # -- writing ---------------------------------------------------------------
+
+    def _encode_payloads(
+        self,
+        child_ids: Sequence[UUID],
+        document_ids: Sequence[UUID],
+        vectors,
+    ) -> Dict[str, bytes]:
+        normalized = normalize(vectors)
+        if normalized.shape != (len(child_ids), self.dim):
+            raise ValueError(
+                f"Expected vectors of shape ({len(child_ids)}, {self.dim}), got {normalized.shape}"
+            )
+        payloads = {"vectors.bin": encode_rows(normalized, self.storage).tobytes()}
+        if self.quantized:
+            payloads["full.bin"] = normalized.tobytes()
+        payloads["ids.bin"] = b"".join(u.bytes for u in child_ids)
+        payloads["docs.bin"] = b"".join(u.bytes for u in document_ids)
+        return payloads
+
+    def append(
+        self,
+        child_ids: Sequence[UUID],
+        document_ids: Sequence[UUID],
+        vectors,
+    ) -> None:
+        if not child_ids:
+            return
+        payloads = self._encode_payloads(child_ids, document_ids, vectors)
+
+        with self._writer_lock():
+            base = self._dir()
+            self._check_meta(base, create=True)
+            self._truncate_partial_rows(base)
+            self._write_payloads(base, payloads)
+
+    def _write_payloads(self, base: str, payloads: Dict[str, bytes]) -> None:
+        # vectors first, docs last: readers size the store by the shortest file.
+        for name, payload in payloads.items():
+            with open(self._file(name, base), "ab") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _truncate_partial_rows(self, base: str) -> None:
+        """Drop any tail left by a writer that crashed mid-append (lock held)."""
+        rows = self._count_rows(base)
+        for name, row_bytes in self._row_files().items():
+            path = self._file(name, base)
+            if os.path.exists(path) and os.path.getsize(path) != rows * row_bytes:
+                os.truncate(path, rows * row_bytes)
+
+    def remove(self, child_ids: Sequence[UUID]) -> None:
+        """Tombstone rows; they are dropped from results until the next rebuild compacts them."""
+        if not child_ids:
+            return
+        with self._writer_lock():
+            with open(self._file("deleted.bin", self._dir()), "ab") as f:
+                f.write(b"".join(u.bytes for u in child_ids))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def reassign(self, child_ids: Sequence[UUID], document_id: UUID) -> int:
+        """
+        Move rows to another document by rewriting docs.bin in place (readers see
+        it through the shared mapping). Returns the number of rows updated.
+        """
+        if not child_ids:
+            return 0
+        wanted = np.frombuffer(b"".join(u.bytes for u in child_ids), dtype=f"V{_ID_BYTES}")
+        target = np.frombuffer(document_id.bytes, dtype=np.uint8)
+        updated = 0
+        with self._writer_lock():
+            base = self._dir()
+            rows = self._count_rows(base)
+            if rows == 0:
+                return 0
+            ids = np.memmap(
+                self._file("ids.bin", base), dtype=f"V{_ID_BYTES}", mode="r", shape=(rows,)
+            )
+            docs = np.memmap(
+                self._file("docs.bin", base), dtype=np.uint8, mode="r+", shape=(rows, _ID_BYTES)
+            )
+            for start in range(0, rows, _BLOCK_ROWS):
+                hits = np.nonzero(np.isin(ids[start : start + _BLOCK_ROWS], wanted))[0]
+                if hits.size:
+                    docs[start + hits] = target
+                    updated += int(hits.size)
+            docs.flush()
+            del ids, docs
+        return updated
+
+    # -- reading ---------------------------------------------------------------
+
+    def _size(self, name: str, base: str) -> int:
+        try:
+            return os.path.getsize(self._file(name, base))
+        except FileNotFoundError:
+            return 0
+
+    def _count_rows(self, base: str) -> int:
+        return min(
+            self._size(name, base) // row_bytes for name, row_bytes in self._row_files().items()
+        )
+
+    def _refresh(self) -> None:
+        """Remap the files if they grew or a rebuild switched the generation."""
+        # Resolved once, so every file below comes from the same generation.
+        base = self._dir()
+        rows = self._count_rows(base)
+
+        with self._lock:
+            if base != self._base or rows != self._rows:
+                kept = min(self._rows, rows) if base == self._base else 0
+                if base != self._base:
+                    self._deleted = set()
+                    self._deleted_size = 0
+                if rows == 0:
+                    self._vectors = self._full = self._ids = self._docs = None
+                else:
+                    self._check_meta(base, create=False)
+                    self._vectors = np.memmap(
+                        self._file("vectors.bin", base),
+                        dtype=self.row_dtype,
+                        mode="r",
+                        shape=(rows, self.row_width),
+                    )
+                    if self.quantized:
+                        self._full = np.memmap(
+                            self._file("full.bin", base), dtype=np.float32, mode="r", shape=(rows, self.dim)
+                        )
+                    self._ids = np.memmap(
+                        self._file("ids.bin", base), dtype=np.uint8, mode="r", shape=(rows, _ID_BYTES)
+                    )
+                    self._docs = np.memmap(
+                        self._file("docs.bin", base), dtype=np.uint64, mode="r", shape=(rows, 2)
+                    )
+                # Rows appended since the last refresh may reuse already-deleted ids.
+                appended = np.zeros(rows - kept, dtype=bool)
+                if self._deleted and rows > kept:
+                    appended = np.isin(self._id_view()[kept:], self._deleted_array(self._deleted))
+                self._tombstoned = np.concatenate([self._tombstoned[:kept], appended])
+                self._rows = rows
+                self._base = base
+
+            deleted_size = self._size("deleted.bin", base)
+            if deleted_size != self._deleted_size:
+                with open(self._file("deleted.bin", base), "rb") as f:
+                    f.seek(self._deleted_size)
+                    raw = f.read(deleted_size - self._deleted_size)
+                added = {raw[i : i + _ID_BYTES] for i in range(0, len(raw) - len(raw) % _ID_BYTES, _ID_BYTES)}
+                self._deleted |= added
+                self._deleted_size += len(raw) - len(raw) % _ID_BYTES
+                if added and self._rows:
+                    tombstoned = self._tombstoned.copy()
+                    tombstoned |= np.isin(self._id_view(), self._deleted_array(added))
+                    self._tombstoned = tombstoned
+
+    def _id_view(self) -> np.ndarray:
+        return self._ids.view(f"V{_ID_BYTES}").reshape(-1)
+
+    @staticmethod
+    def _deleted_array(ids: set) -> np.ndarray:
+        return np.frombuffer(b"".join(ids), dtype=f"V{_ID_BYTES}")
+
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        limit: int,
+        document_ids: Optional[Sequence[UUID]] = None,
+    ) -> List[str]:
+        self._refresh()
+        with self._lock:
+            vectors, full, ids, docs, tombstoned = (
+                self._vectors,
+                self._full,
+                self._ids,
+                self._docs,
+                self._tombstoned,
+            )
+        if vectors is None or limit <= 0:
+            return []
+
+        query = normalize(query_embedding)
+        encoded_query = encode_rows(query[None, :], self.storage)[0]
+
+        if document_ids:
+            wanted = _ids_to_array(document_ids)
+            mask = np.zeros(len(docs), dtype=bool)
+            for hi, lo in wanted:
+                mask |= (docs[:, 0] == hi) & (docs[:, 1] == lo)
+            rows = np.nonzero(mask & ~tombstoned)[0]
+            live = int(rows.size)
+            if live == 0:
+                return []
+            scores = coarse_scores(vectors[rows], encoded_query, self.storage)
+        else:
+            rows = None
+            scores = np.empty(len(vectors), dtype=np.float32)
+            for start in range(0, len(vectors), _BLOCK_ROWS):
+                block = vectors[start : start + _BLOCK_ROWS]
+                scores[start : start + len(block)] = coarse_scores(
+                    block, encoded_query, self.storage
+                )
+
+            # Tombstoned rows rank last, so the top k below are all live rows.
+            scores[tombstoned] = -np.inf
+            live = len(scores) - int(np.count_nonzero(tombstoned))
+            if live == 0:
+                return []
+
+        # Over-fetch by the rescore factor when the coarse scores come from
+        # quantized vectors.
+        want = limit
+        if self.quantized:
+            want *= max(settings.vector_rescore_factor, 1)
+        k = min(live, want)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top_scores = scores[top]
+        if rows is not None:
+            top = rows[top]
+
+        if self.quantized:
+            # Exact rescoring; sorted row order keeps the memmap reads sequential.
+            top = np.sort(top)
+            top_scores = np.asarray(full[top], dtype=np.float32) @ query
+        top = top[np.argsort(-top_scores)]
+
+        return [str(UUID(bytes=ids[row].tobytes())) for row in top[:limit]]
+
+    # -- maintenance -------------------------------------------------------------
+
+    async def rebuild_from_db(self, *, batch_size: int = 10000) -> int:
+        """
+        Rewrite the store from chunk_embeddings in the configured storage format
+        (compacting tombstones) into a new generation directory, then switch the
+        `current` symlink to it in a single rename; readers pick it up on their
+        next search. This is also the migration path when vector_store_dtype
+        changes. Appends wait on the writer lock until the switch, so none are
+        lost; the lock and all file work run in threads.
+        """
+        count = 0
+        async with self._async_writer_lock():
+            generation = f"{_GENERATION_PREFIX}{time.time_ns()}"
+            base = os.path.join(self.path, generation)
+            await asyncio.to_thread(os.makedirs, base)
+            try:
+                stmt = (
+                    select(
+                        models.ChunkEmbedding.child_chunk_id,
+                        models.ChildChunk.document_id,
+                        models.ChunkEmbedding.embedding,
+                    )
+                    .join(
+                        models.ChildChunk,
+                        models.ChildChunk.id == models.ChunkEmbedding.child_chunk_id,
+                    )
+                    .execution_options(yield_per=batch_size)
+                )
+                async with async_session() as session:
+                    result = await session.stream(stmt)
+                    async for partition in result.partitions(batch_size):
+                        await asyncio.to_thread(self._write_partition, base, partition)
+                        count += len(partition)
+                await asyncio.to_thread(self._switch_generation, generation)
+            except BaseException:
+                await asyncio.to_thread(shutil.rmtree, base, True)
+                raise
+
+        logger.info("Rebuilt mmap vector store with %d rows (%s)", count, self.storage)
+        return count
+
+    def _write_partition(self, base: str, partition) -> None:
+        payloads = self._encode_payloads(
+            [r[0] for r in partition],
+            [r[1] for r in partition],
+            np.asarray([r[2] for r in partition]),
+        )
+        self._write_payloads(base, payloads)
+
+    def _switch_generation(self, generation: str) -> None:
+        """Point `current` at a fully written generation (writer lock held)."""
+        base = os.path.join(self.path, generation)
+        self._check_meta(base, create=True)
+        previous = self._dir()
+
+        link = os.path.join(self.path, _CURRENT)
+        tmp_link = link + ".tmp"
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_link)
+        os.symlink(generation, tmp_link)
+        os.replace(tmp_link, link)
+
+        # The generation just replaced stays until the next rebuild: a reader may
+        # have resolved it right before the switch and not opened its files yet.
+        for entry in os.listdir(self.path):
+            full = os.path.join(self.path, entry)
+            if entry.startswith(_GENERATION_PREFIX) and full not in (base, previous):
+                shutil.rmtree(full, ignore_errors=True)
+        if previous != self.path:
+            for name in [*self._row_files(), "full.bin", "deleted.bin", "meta.json"]:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(os.path.join(self.path, name))
+
+    def stats(self) -> dict:
+        self._refresh()
+        row_bytes = self._row_files()["vectors.bin"]
+        return {
+            "rows": self._rows,
+            "dim": self.dim,
+            "storage": self.storage,
+            "search_bytes": self._rows * row_bytes,
+            "rescore_bytes": self._rows * self.dim * 4 if self.quantized else 0,
+            "tombstones": len(self._deleted),
+        }
+
+
+_store: Optional[MmapVectorStore] = None
+
+
+def get_store() -> MmapVectorStore:
+    global _store
+    if _store is None:
+        _store = MmapVectorStore(
+            settings.vector_store_path,
+            settings.embedding_dim,
+            settings.vector_store_dtype,
+        )
+    return _store
+
+
+async def search(
+    *,
+    query_embedding: Sequence[float],
+    limit: int,
+    document_ids: Optional[Sequence[UUID]] = None,
+) -> List[str]:
+    # NumPy releases the GIL in the matmul, so a thread keeps the event loop responsive.
+    return await asyncio.to_thread(get_store().search, query_embedding, limit, document_ids)
+
+
+async def append(
+    child_ids: Sequence[UUID],
+    document_ids: Sequence[UUID],
+    vectors,
+) -> None:
+    await asyncio.to_thread(get_store().append, child_ids, document_ids, vectors)
+
+
+async def remove(child_ids: Sequence[UUID]) -> None:
+    await asyncio.to_thread(get_store().remove, child_ids)
+
+
+async def reassign(child_ids: Sequence[UUID], document_id: UUID) -> int:
+    return await asyncio.to_thread(get_store().reassign, child_ids, document_id)
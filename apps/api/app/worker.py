@@ -0,0 +1,157 @@
+"""
+Ingestion worker entry point.
+
+Run with `python -m app.worker`. Workers poll the `ingestion_jobs` table and run
+`ingest_document` with bounded concurrency, so API (query-serving) processes
+never parse or embed documents themselves.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import signal
+import socket
+from typing import Awaitable
+
+from .core.config import get_settings
+from .core.logging import configure_logging
+from .db.init_db import init_db
+from .services import job_queue, opensearch_index
+from .services.ingestion import ingest_document
+from .services.parser import shutdown_pool
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# How often (in poll iterations) to look for jobs abandoned by dead workers.
+_STALE_CHECK_EVERY = 60
+
+
+async def _renew_lease(job: job_queue.ClaimedJob, ingest: asyncio.Task) -> bool:
+    """
+    Heartbeat: renew the job's lease well before requeue_stale_jobs would expire
+    it. If another worker took the job over, cancel the ingestion and return True.
+    """
+    interval = max(settings.ingestion_job_lease_seconds / 3, 1.0)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if not await job_queue.renew_lease(job):
+                logger.warning(
+                    "Ingestion job %s lost its lease to another worker; stopping it", job.id
+                )
+                ingest.cancel()
+                return True
+        except Exception:
+            logger.warning("Failed to renew lease of ingestion job %s", job.id, exc_info=True)
+
+
+async def _record_outcome(job: job_queue.ClaimedJob, outcome: Awaitable[None]) -> None:
+    try:
+        await outcome
+    except Exception:
+        # The lease then expires and the job runs again.
+        logger.exception("Failed to record the outcome of ingestion job %s", job.id)
+
+
+async def _run_job(job: job_queue.ClaimedJob) -> None:
+    logger.info(
+        "Starting ingestion job %s document_id=%s attempt=%d",
+        job.id,
+        job.document_id,
+        job.attempts,
+    )
+    ingest = asyncio.create_task(ingest_document(document_id=job.document_id))
+    heartbeat = asyncio.create_task(_renew_lease(job, ingest))
+    try:
+        await ingest
+    except asyncio.CancelledError:
+        if not (heartbeat.done() and heartbeat.result()):
+            raise
+        # Its new owner ingests the document; nothing is recorded for this attempt.
+        return
+    except Exception as e:
+        await _record_outcome(job, job_queue.mark_failed(job, error=repr(e)))
+        return
+    finally:
+        heartbeat.cancel()
+    await _record_outcome(job, job_queue.mark_succeeded(job))
+    logger.info("Finished ingestion job %s document_id=%s", job.id, job.document_id)
+
+
+async def _run_jobs(jobs: list[job_queue.ClaimedJob]) -> None:
+    # Jobs of one bulk upload batch run concurrently, so their embedding calls are
+    # coalesced into full model batches by the micro-batcher. Large claims index
+    # in OpenSearch bulk ingest mode (relaxed refresh_interval until they finish).
+    large = sum(job.size_bytes for job in jobs) >= settings.opensearch_bulk_ingest_min_bytes
+    async with opensearch_index.bulk_ingest() if large else contextlib.nullcontext():
+        await asyncio.gather(*(_run_job(job) for job in jobs))
+
+
+async def run_worker(*, concurrency: int) -> None:
+    await init_db()
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows event loops don't support signal handlers.
+            pass
+
+    slots = asyncio.Semaphore(max(concurrency, 1))
+    running: set[asyncio.Task] = set()
+    polls = 0
+
+    logger.info("Ingestion worker %s started (concurrency=%d)", worker_id, concurrency)
+    while not stop.is_set():
+        if polls % _STALE_CHECK_EVERY == 0:
+            try:
+                await job_queue.requeue_stale_jobs()
+            except Exception:
+                logger.exception("Failed to requeue stale ingestion jobs")
+        polls += 1
+
+        await slots.acquire()
+        try:
+            jobs = await job_queue.claim_next_jobs(
+                worker_id, limit=settings.ingestion_batch_claim_size
+            )
+        except Exception:
+            logger.exception("Failed to claim ingestion job")
+            jobs = []
+
+        if not jobs:
+            slots.release()
+            try:
+                await asyncio.wait_for(
+                    stop.wait(), timeout=settings.ingestion_poll_interval_seconds
+                )
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        task = asyncio.create_task(_run_jobs(jobs))
+        running.add(task)
+        task.add_done_callback(running.discard)
+        task.add_done_callback(lambda _t: slots.release())
+
+    if running:
+        logger.info("Waiting for %d in-flight ingestion job(s) to finish", len(running))
+        await asyncio.gather(*running, return_exceptions=True)
+    await opensearch_index.close_client()
+
+
+def main() -> None:
+    configure_logging()
+    try:
+        asyncio.run(run_worker(concurrency=settings.ingestion_worker_concurrency))
+    finally:
+        shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
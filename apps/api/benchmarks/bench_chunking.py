@@ -0,0 +1,189 @@
+"""
+Chunking throughput and chunk quality: fixed windows vs. the boundary chunker.
+
+Both strategies chunk the same synthetic document (paragraphs of sentences over
+many pages) into parents and children with the configured sizes. The benchmark
+reports MB/s, chunk counts, and the share of children that end mid-sentence.
+With --tokenizer it also reports the share of children longer than the embedding
+model's input limit; those are truncated at embed time. A last section times the
+page mapping of the old linear scan against the bisect in _find_page_range.
+
+    python -m benchmarks.bench_chunking                  # character-sized children
+    python -m benchmarks.bench_chunking --tokenizer      # token-sized, loads the model
+
+Run from apps/api.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Callable, List, Tuple
+
+from app.core.config import get_settings
+from app.services import boundary_chunker
+from app.services.chunker import ChunkData, _find_page_range, chunk_text_block, iter_chunks
+
+settings = get_settings()
+
+_WORDS = (
+    "the a system query index vector document page chunk model retrieval answer "
+    "latency throughput memory storage cache batch token sentence paragraph result "
+    "performance configuration request response worker process"
+).split()
+
+
+def synthetic_pages(pages: int, seed: int) -> List[Tuple[int, str]]:
+    rng = random.Random(seed)
+    out = []
+    for page_no in range(1, pages + 1):
+        paragraphs = []
+        for _ in range(rng.randint(2, 6)):
+            sentences = [
+                " ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 28))).capitalize() + "."
+                for _ in range(rng.randint(2, 7))
+            ]
+            paragraphs.append(" ".join(sentences))
+        out.append((page_no, "\n\n".join(paragraphs)))
+    return out
+
+
+async def _pages(pages: List[Tuple[int, str]]):
+    for page in pages:
+        yield page
+
+
+def _ends_mid_sentence(chunk: ChunkData) -> bool:
+    return not chunk.text.rstrip().endswith((".", "!", "?"))
+
+
+def run_strategy(
+    name: str,
+    pages: List[Tuple[int, str]],
+    parents_fn: Callable,
+    children_fn: Callable[[ChunkData], List[ChunkData]],
+    token_lengths: Callable[[List[str]], List[int]] | None,
+    token_limit: int,
+) -> None:
+    async def collect() -> List[ChunkData]:
+        return [
+            p
+            async for p in parents_fn(
+                _pages(pages),
+                max_chars=settings.parent_chunk_chars,
+                overlap_chars=settings.parent_overlap_chars,
+            )
+        ]
+
+    started = time.perf_counter()
+    parents = asyncio.run(collect())
+    children = [c for p in parents for c in children_fn(p)]
+    elapsed = time.perf_counter() - started
+
+    total_chars = sum(len(text) for _, text in pages)
+    mid = sum(_ends_mid_sentence(c) for c in children) / max(len(children), 1)
+    over_col = f"{'-':>10}"
+    if token_lengths is not None:
+        lengths = token_lengths([c.text for c in children])
+        over_col = f"{sum(n > token_limit for n in lengths) / max(len(children), 1):>10.1%}"
+    print(
+        f"{name:<10}{total_chars / 2**20 / elapsed:>8.1f}{len(parents):>9}{len(children):>10}"
+        f"{mid:>11.1%}{over_col}"
+    )
+
+
+def _linear_page_range(page_offsets, char_start: int, char_end: int) -> Tuple[int, int]:
+    """The page mapping before bisect, for comparison."""
+    page_start, page_end = page_offsets[0][0], page_offsets[-1][0]
+    for page_no, start, end in page_offsets:
+        if end > char_start:
+            page_start = page_no
+            break
+    for page_no, start, end in reversed(page_offsets):
+        if start < char_end:
+            page_end = page_no
+            break
+    return page_start, page_end
+
+
+def run_page_mapping(pages: int, lookups: int, seed: int) -> None:
+    rng = random.Random(seed)
+    offsets, cursor = [], 0
+    for page_no in range(1, pages + 1):
+        length = rng.randint(500, 3000)
+        offsets.append((page_no, cursor, cursor + length))
+        cursor += length + 1
+    spans = []
+    for _ in range(lookups):
+        start = rng.randrange(cursor)
+        spans.append((start, start + settings.parent_chunk_chars))
+
+    print(f"\npage mapping: pages={pages} lookups={lookups}")
+    for name, fn in (("linear", _linear_page_range), ("bisect", _find_page_range)):
+        started = time.perf_counter()
+        for start, end in spans:
+            fn(offsets, start, end)
+        print(f"{name:<10}{(time.perf_counter() - started) * 1e6 / lookups:>8.1f} us/lookup")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tokenizer", action="store_true", help="size children with the embedding model tokenizer")
+    parser.add_argument("--mapping-pages", type=int, default=10_000)
+    parser.add_argument("--mapping-lookups", type=int, default=20_000)
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.pages, args.seed)
+
+    token_lengths = None
+    token_limit = 0
+    child_length, child_budget, child_overlap = (
+        boundary_chunker.char_lengths,
+        settings.child_chunk_chars,
+        settings.child_overlap_chars,
+    )
+    if args.tokenizer:
+        from app.services import embeddings
+
+        token_lengths = embeddings.token_lengths
+        token_limit = embeddings.max_input_tokens()
+        child_length = token_lengths
+        child_budget = settings.child_chunk_tokens or token_limit
+        child_overlap = settings.child_overlap_tokens
+
+    def fixed_children(parent: ChunkData) -> List[ChunkData]:
+        return chunk_text_block(
+            parent.text,
+            page_start=parent.page_start,
+            page_end=parent.page_end,
+            base_char_start=parent.char_start,
+            max_chars=settings.child_chunk_chars,
+            overlap_chars=settings.child_overlap_chars,
+        )
+
+    def boundary_children(parent: ChunkData) -> List[ChunkData]:
+        return boundary_chunker.chunk_block(
+            parent.text,
+            page_start=parent.page_start,
+            page_end=parent.page_end,
+            base_char_start=parent.char_start,
+            max_size=child_budget,
+            overlap=child_overlap,
+            length=child_length,
+        )
+
+    print(
+        f"pages={args.pages} parent_chars={settings.parent_chunk_chars} "
+        f"child_budget={child_budget} ({'tokens' if args.tokenizer else 'chars'})"
+    )
+    print(f"{'strategy':<10}{'MB/s':>8}{'parents':>9}{'children':>10}{'mid-sent.':>11}{'>limit':>10}")
+    run_strategy("fixed", pages, iter_chunks, fixed_children, token_lengths, token_limit)
+    run_strategy("boundary", pages, boundary_chunker.iter_chunks, boundary_children, token_lengths, token_limit)
+
+    run_page_mapping(args.mapping_pages, args.mapping_lookups, args.seed)
+
+
+if __name__ == "__main__":
+    main()
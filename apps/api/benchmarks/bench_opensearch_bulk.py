@@ -0,0 +1,139 @@
+"""
+OpenSearch indexing throughput: one sequential bulk stream vs. the parallel
+bulk path, with and without bulk ingest mode (relaxed refresh_interval).
+
+Synthetic chunk records are indexed into a scratch index created with the same
+settings and mappings as the chunk index, and removed afterwards. Every run
+reports documents indexed per second, including the final refresh.
+
+    python -m benchmarks.bench_opensearch_bulk --docs 50000
+    python -m benchmarks.bench_opensearch_bulk --chunk-sizes 250,500,1000 --workers 1,2,4
+
+Run from apps/api with OpenSearch reachable (OPENSEARCH_HOST / OPENSEARCH_PORT),
+and Postgres, through which bulk ingest mode is coordinated across processes.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+import uuid
+from typing import Any, Dict, List
+
+from opensearchpy.helpers import async_bulk
+
+from app.core.config import get_settings
+from app.services import opensearch_index
+
+settings = get_settings()
+
+_WORDS = (
+    "the a system query index vector document page chunk model retrieval answer "
+    "latency throughput memory storage cache batch token sentence paragraph result "
+    "performance configuration request response worker process"
+).split()
+
+
+def synthetic_records(count: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    document_id = str(uuid.uuid4())
+    records = []
+    for i in range(count):
+        text = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(120, 180)))
+        records.append(
+            {
+                "chunk_id": str(uuid.uuid4()),
+                "parent_id": str(uuid.uuid4()),
+                "document_id": document_id,
+                "tenant_id": "default",
+                "text": text,
+                "page_start": i // 10 + 1,
+                "page_end": i // 10 + 1,
+                "chunk_hash": hashlib.sha256(text.encode()).hexdigest(),
+                "filename": "bench.txt",
+            }
+        )
+    return records
+
+
+async def _reset_index() -> None:
+    client = opensearch_index.get_client()
+    await client.indices.delete(index=settings.opensearch_index, ignore=[404])
+    opensearch_index._index_ready = False
+    await opensearch_index.ensure_index()
+
+
+async def run_sequential(records: List[Dict[str, Any]]) -> float:
+    """The previous path: one async_bulk stream of 500-action requests."""
+    await _reset_index()
+    client = opensearch_index.get_client()
+    started = time.perf_counter()
+    await async_bulk(
+        client,
+        (
+            {
+                "_op_type": "index",
+                "_index": settings.opensearch_index,
+                "_id": r["chunk_id"],
+                "_source": r,
+            }
+            for r in records
+        ),
+    )
+    await client.indices.refresh(index=settings.opensearch_index)
+    return len(records) / (time.perf_counter() - started)
+
+
+async def run_parallel(records: List[Dict[str, Any]], *, bulk_mode: bool) -> float:
+    await _reset_index()
+    started = time.perf_counter()
+    if bulk_mode:
+        async with opensearch_index.bulk_ingest():
+            await opensearch_index.index_chunks(records)
+    else:
+        await opensearch_index.index_chunks(records)
+        await opensearch_index.get_client().indices.refresh(index=settings.opensearch_index)
+    return len(records) / (time.perf_counter() - started)
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    records = synthetic_records(args.docs, args.seed)
+    settings.opensearch_index = f"{settings.opensearch_index}_bench"
+    try:
+        print(f"docs={args.docs} index={settings.opensearch_index}")
+        print(f"{'path':<22}{'chunk':>7}{'workers':>9}{'docs/s':>10}")
+        print(f"{'sequential':<22}{500:>7}{1:>9}{await run_sequential(records):>10.0f}")
+        for chunk_size in args.chunk_sizes:
+            for workers in args.workers:
+                settings.opensearch_bulk_chunk_size = chunk_size
+                settings.opensearch_bulk_workers = workers
+                for bulk_mode in (False, True):
+                    rate = await run_parallel(records, bulk_mode=bulk_mode)
+                    name = "parallel+bulk mode" if bulk_mode else "parallel"
+                    print(f"{name:<22}{chunk_size:>7}{workers:>9}{rate:>10.0f}")
+    finally:
+        try:
+            await opensearch_index.get_client().indices.delete(
+                index=settings.opensearch_index, ignore=[404]
+            )
+        finally:
+            await opensearch_index.close_client()
+
+
+def _ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-sizes", type=_ints, default=[500, 1000])
+    parser.add_argument("--workers", type=_ints, default=[2, 4])
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
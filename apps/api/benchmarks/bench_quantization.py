@@ -0,0 +1,111 @@
+"""
+Recall vs. memory for the embedding storage formats in vector_store_mmap.
+
+Ground truth is exact float32 cosine search; each format is measured with and
+without full-precision rescoring of the top k * rescore_factor candidates.
+
+    python -m benchmarks.bench_quantization                 # synthetic clustered corpus
+    python -m benchmarks.bench_quantization --from-db       # sample of chunk_embeddings
+
+Run from apps/api.
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.services.vector_store_mmap import (
+    STORAGE_FORMATS,
+    coarse_scores,
+    encode_rows,
+    is_quantized,
+    normalize,
+)
+
+
+def synthetic_corpus(rows: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Clustered vectors: uniform random data makes every format look alike."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows)
+    noise = rng.standard_normal((rows, dim)).astype(np.float32) * 0.6
+    return normalize(centers[labels] + noise)
+
+
+async def load_from_db(limit: int) -> np.ndarray:
+    from sqlalchemy import select
+
+    from app.db import models
+    from app.db.session import async_session
+
+    async with async_session() as session:
+        rows = (
+            await session.execute(select(models.ChunkEmbedding.embedding).limit(limit))
+        ).scalars().all()
+    return normalize(np.asarray(rows, dtype=np.float32))
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def run(corpus: np.ndarray, queries: np.ndarray, k: int, rescore_factor: int) -> None:
+    truth = [set(top_k(corpus @ q, k)) for q in queries]
+    dim = corpus.shape[1]
+
+    print(f"rows={len(corpus)} dim={dim} queries={len(queries)} k={k} rescore_factor={rescore_factor}")
+    print(f"{'format':<10}{'bytes/vec':>10}{'index MiB':>11}{'recall':>9}{'+rescore':>10}{'ms/query':>10}")
+    for storage in STORAGE_FORMATS:
+        encoded = encode_rows(corpus, storage)
+        row_bytes = encoded[0].nbytes
+
+        recall = rescored = 0.0
+        started = time.perf_counter()
+        for q, expected in zip(queries, truth):
+            scores = coarse_scores(encoded, encode_rows(q[None, :], storage)[0], storage)
+            recall += len(expected & set(top_k(scores, k))) / k
+
+            candidates = top_k(scores, k * rescore_factor)
+            exact = corpus[candidates] @ q
+            rescored += len(expected & set(candidates[np.argsort(-exact)[:k]])) / k
+        elapsed_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+        rescore_col = f"{rescored / len(queries):>10.3f}" if is_quantized(storage) else f"{'-':>10}"
+        print(
+            f"{storage:<10}{row_bytes:>10}{len(corpus) * row_bytes / 2**20:>11.1f}"
+            f"{recall / len(queries):>9.3f}{rescore_col}{elapsed_ms:>10.1f}"
+        )
+    print("(int8/binary rescoring also keeps a float32 copy on disk; only candidate rows are read)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--from-db", action="store_true", help="sample vectors from chunk_embeddings")
+    args = parser.parse_args()
+
+    if args.from_db:
+        corpus = asyncio.run(load_from_db(args.rows))
+    else:
+        corpus = synthetic_corpus(args.rows, args.dim, args.clusters, args.seed)
+
+    # Queries are perturbed corpus vectors, like a question close to some passage.
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.integers(0, len(corpus), args.queries)
+    queries = normalize(corpus[picks] + rng.standard_normal((args.queries, corpus.shape[1])) * 0.03)
+
+    run(corpus, queries, args.k, args.rescore_factor)
+
+
+if __name__ == "__main__":
+    main()
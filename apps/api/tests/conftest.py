@@ -0,0 +1,16 @@
+import sys
+import types
+
+try:
+    import sentence_transformers  # noqa: F401
+except ImportError:
+    # The models are only loaded on first use; tests never load one, so a stub
+    # lets them import the services without the (large) package installed.
+    class _NotInstalled:
+        def __init__(self, *args, **kwargs):
+            raise RuntimeError("sentence-transformers is not installed")
+
+    stub = types.ModuleType("sentence_transformers")
+    stub.SentenceTransformer = _NotInstalled
+    stub.CrossEncoder = _NotInstalled
+    sys.modules["sentence_transformers"] = stub
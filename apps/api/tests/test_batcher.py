@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app.services.batcher import MicroBatcher
+
+
+def _upper_calls():
+    calls = []
+
+    def fn(items):
+        calls.append(list(items))
+        return [item.upper() for item in items]
+
+    return fn, calls
+
+
+async def test_concurrent_submits_share_one_batch():
+    fn, calls = _upper_calls()
+    batcher = MicroBatcher(fn, max_batch_items=100, max_wait_ms=50)
+    results = await asyncio.gather(
+        batcher.submit(["ccc", "a"]),
+        batcher.submit(["bb"]),
+        batcher.submit(["dddd", "e", "ff"]),
+    )
+    assert results == [["CCC", "A"], ["BB"], ["DDDD", "E", "FF"]]
+    assert len(calls) == 1
+    # Inputs are sorted by length before the call, results mapped back.
+    assert [len(item) for item in calls[0]] == sorted(len(item) for item in calls[0])
+    assert batcher.stats()["requests"] == 3
+
+
+async def test_batch_is_cut_at_max_items():
+    fn, calls = _upper_calls()
+    batcher = MicroBatcher(fn, max_batch_items=4, max_wait_ms=50)
+    results = await asyncio.gather(*(batcher.submit(["x", "y"]) for _ in range(4)))
+    assert results == [["X", "Y"]] * 4
+    assert all(len(call) <= 4 for call in calls)
+    assert sum(len(call) for call in calls) == 8
+
+
+async def test_full_request_bypasses_the_queue():
+    fn, calls = _upper_calls()
+    batcher = MicroBatcher(fn, max_batch_items=2, max_wait_ms=1000)
+    assert await asyncio.wait_for(batcher.submit(["ab", "c", "de"]), timeout=1) == ["AB", "C", "DE"]
+    assert batcher.stats()["batches"] == 0  # ran directly, not through the runner
+    assert await batcher.submit([]) == []
+
+
+async def test_errors_reach_every_caller_of_the_batch():
+    def fn(items):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(fn, max_batch_items=10, max_wait_ms=20)
+    results = await asyncio.gather(
+        batcher.submit(["a"]), batcher.submit(["b"]), return_exceptions=True
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    # The runner survives the failure.
+    batcher.fn = lambda items: items
+    assert await batcher.submit(["c"]) == ["c"]
+
+
+async def test_cancelled_caller_is_skipped():
+    fn, calls = _upper_calls()
+    batcher = MicroBatcher(fn, max_batch_items=10, max_wait_ms=50)
+    cancelled = asyncio.ensure_future(batcher.submit(["gone"]))
+    kept = asyncio.ensure_future(batcher.submit(["kept"]))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    assert await kept == ["KEPT"]
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    assert calls == [["kept"]]
+
+
+def test_runner_restarts_on_a_new_event_loop():
+    fn, _ = _upper_calls()
+    batcher = MicroBatcher(fn, max_batch_items=10, max_wait_ms=1)
+    assert asyncio.run(batcher.submit(["a"])) == ["A"]
+    assert asyncio.run(batcher.submit(["b"])) == ["B"]
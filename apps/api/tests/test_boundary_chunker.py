@@ -0,0 +1,87 @@
+import random
+from typing import AsyncIterator, List, Sequence, Tuple
+
+import pytest
+
+from app.services import boundary_chunker
+
+_WORDS = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu".split()
+
+
+async def _stream(pieces: Sequence[Tuple[int, str]]) -> AsyncIterator[Tuple[int, str]]:
+    for piece in pieces:
+        yield piece
+
+
+async def _collect(chunks) -> List:
+    return [chunk async for chunk in chunks]
+
+
+def _prose(seed: int, count: int) -> List[Tuple[int, str]]:
+    """Pages of short sentences and paragraphs (every sentence fits the budgets below)."""
+    rng = random.Random(seed)
+    pages = []
+    for page_no in range(1, count + 1):
+        paragraphs = []
+        for _ in range(rng.randint(1, 4)):
+            sentences = [
+                " ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 12))).capitalize() + "."
+                for _ in range(rng.randint(1, 6))
+            ]
+            paragraphs.append(" ".join(sentences))
+        pages.append((page_no, "\n\n".join(paragraphs)))
+    return pages
+
+
+@pytest.mark.parametrize("max_chars,overlap_chars", [(300, 60), (800, 100), (150, 0)])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+async def test_boundary_streaming_matches_single_pass(seed, max_chars, overlap_chars):
+    pages = _prose(seed, 20)
+    # A single page holding everything is packed in one pass at the end.
+    single = await _collect(
+        boundary_chunker.iter_chunks(
+            _stream([(1, "\n".join(text for _, text in pages))]),
+            max_chars=max_chars,
+            overlap_chars=overlap_chars,
+        )
+    )
+    streamed = await _collect(
+        boundary_chunker.iter_chunks(
+            _stream(pages), max_chars=max_chars, overlap_chars=overlap_chars
+        )
+    )
+    assert [(c.text, c.char_start, c.char_end) for c in streamed] == [
+        (c.text, c.char_start, c.char_end) for c in single
+    ]
+
+
+async def test_boundary_chunks_respect_budget_and_pages():
+    pages = _prose(4, 10)
+    chunks = await _collect(
+        boundary_chunker.iter_chunks(_stream(pages), max_chars=400, overlap_chars=50)
+    )
+    full_text = "\n".join(text for _, text in pages)
+    assert chunks
+    for chunk in chunks:
+        assert len(chunk.text) <= 400
+        assert full_text[chunk.char_start : chunk.char_end] == chunk.text
+        assert 1 <= chunk.page_start <= chunk.page_end <= len(pages)
+        # Chunks end on a sentence boundary.
+        assert chunk.text.endswith(".")
+
+
+def test_boundary_chunk_block_uses_length_function():
+    text = " ".join(["Short sentence here."] * 30)
+    chunks = boundary_chunker.chunk_block(
+        text,
+        page_start=2,
+        page_end=3,
+        base_char_start=100,
+        max_size=10,
+        overlap=0,
+        length=lambda texts: [len(t.split()) for t in texts],
+    )
+    assert all(len(c.text.split()) <= 10 for c in chunks)
+    assert all((c.page_start, c.page_end) == (2, 3) for c in chunks)
+    assert chunks[0].char_start == 100
+    assert " ".join(c.text for c in chunks) == text
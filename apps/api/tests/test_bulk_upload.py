@@ -0,0 +1,91 @@
+import io
+import zipfile
+
+import pytest
+from fastapi import UploadFile
+
+from app.services import bulk_upload
+from app.services.bulk_upload import BulkUploadError
+
+
+def _upload(name, data):
+    return UploadFile(io.BytesIO(data), filename=name)
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(bulk_upload.settings, "bulk_upload_max_files", 3)
+    monkeypatch.setattr(bulk_upload.settings, "bulk_upload_max_bytes", 1000)
+
+
+def test_archives_are_expanded_and_hashed(limits):
+    archive = _zip({"a.txt": b"one", "docs/b.txt": b"two", ".hidden": b"x", "__MACOSX/c": b"x"})
+    files = bulk_upload._collect_files([_upload("batch.zip", archive), _upload("c.pdf", b"three")])
+    assert [f.filename for f in files] == ["a.txt", "docs/b.txt", "c.pdf"]
+    assert [f.size_bytes for f in files] == [3, 3, 5]
+    assert files[0].content_type == "text/plain"
+    assert len({f.sha256 for f in files}) == 3
+
+
+def test_file_count_limit_counts_archive_members(limits):
+    archive = _zip({f"{i}.txt": b"x" for i in range(4)})
+    with pytest.raises(BulkUploadError, match="Too many files"):
+        bulk_upload._collect_files([_upload("batch.zip", archive)])
+
+
+def test_byte_limit_counts_uncompressed_members(limits):
+    # The archive itself is within the limit; what it expands to is not.
+    archive = _zip({"big.txt": b"\0" * 5000})
+    assert len(archive) < bulk_upload.settings.bulk_upload_max_bytes
+    with pytest.raises(BulkUploadError, match="too large"):
+        bulk_upload._collect_files([_upload("batch.zip", archive)])
+
+
+def test_byte_limit_counts_plain_uploads(limits):
+    with pytest.raises(BulkUploadError, match="too large"):
+        bulk_upload._collect_files([_upload("a.txt", b"x" * 600), _upload("b.txt", b"y" * 600)])
+
+
+def test_unreadable_archive_is_rejected(limits):
+    with pytest.raises(BulkUploadError, match="Unreadable archive"):
+        bulk_upload._collect_files([_upload("broken.zip", b"not a zip")])
+
+
+async def test_documents_are_inserted_in_bounded_statements(monkeypatch):
+    statements = []
+    commits = []
+
+    class _Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def scalars(self, stmt):
+            rows = stmt.compile().params
+            statements.append(rows)
+            return [value for key, value in rows.items() if key.startswith("id_m")]
+
+        async def commit(self):
+            commits.append(True)
+
+    monkeypatch.setattr(bulk_upload, "async_session", _Session)
+    items = [
+        bulk_upload._BulkFile(
+            filename=f"{i}.txt", content_type="text/plain", file=io.BytesIO(), sha256=str(i)
+        )
+        for i in range(2500)
+    ]
+    await bulk_upload._insert_documents(items)
+    assert [len(s) // 9 for s in statements] == [1000, 1000, 500]
+    assert len(commits) == 1
+    assert not any(item.duplicate for item in items)
@@ -0,0 +1,91 @@
+import struct
+import uuid
+
+import numpy as np
+import pytest
+
+from app.services import bulk_writer
+from app.services.bulk_writer import ChildRow, ParentRow
+
+
+def test_vector_binary_format_round_trips():
+    vector = np.array([0.5, -1.25, 3.0], dtype=np.float32)
+    data = bulk_writer._encode_vector(vector)
+    # int16 dim, int16 unused, then big-endian float4s.
+    assert struct.unpack_from(">HH", data) == (3, 0)
+    assert len(data) == 4 + 3 * 4
+    assert np.array_equal(bulk_writer._decode_vector(data), vector)
+    assert bulk_writer._decode_vector(bulk_writer._encode_vector([1, 2])).dtype == np.float32
+
+
+class _Connection:
+    def __init__(self, fail_on=None):
+        self.log = []
+        self.fail_on = fail_on
+
+    def transaction(self):
+        log = self.log
+
+        class _Transaction:
+            async def __aenter__(self):
+                log.append("begin")
+
+            async def __aexit__(self, exc_type, *exc):
+                log.append("rollback" if exc_type else "commit")
+                return False
+
+        return _Transaction()
+
+    async def copy_records_to_table(self, table, *, records, columns):
+        if table == self.fail_on:
+            raise RuntimeError("copy failed")
+        self.log.append((table, columns, list(records)))
+
+
+def _rows(children=3):
+    document_id, parent_id = uuid.uuid4(), uuid.uuid4()
+    parents = [ParentRow(parent_id, document_id, 1, 2, 0, 100, "parent", "hp")]
+    return parents, [
+        ChildRow(uuid.uuid4(), document_id, parent_id, 1, 1, i * 10, i * 10 + 5, f"c{i}", f"h{i}")
+        for i in range(children)
+    ]
+
+
+async def test_chunks_and_embeddings_are_copied_in_one_transaction(monkeypatch):
+    monkeypatch.setattr(bulk_writer.settings, "bulk_write_batch_rows", 2)
+    conn = _Connection()
+    parents, children = _rows()
+    vectors = [np.full(2, i, dtype=np.float32) for i in range(3)]
+    await bulk_writer.write_chunks(conn, parents, children, embeddings=vectors, model_name="m")
+
+    assert conn.log[0] == "begin" and conn.log[-1] == "commit"
+    copies = conn.log[1:-1]
+    assert [table for table, _, _ in copies] == [
+        "parent_chunks", "child_chunks", "child_chunks", "chunk_embeddings", "chunk_embeddings",
+    ]
+    _, columns, (parent,) = copies[0]
+    assert dict(zip(columns, parent))["text"] == "parent"
+    child = dict(zip(copies[1][1], copies[1][2][0]))
+    assert (child["id"], child["parent_id"], child["chunk_hash"]) == (
+        children[0].id, parents[0].id, "h0",
+    )
+    embeddings = copies[3][2] + copies[4][2]
+    assert [row[0] for row in embeddings] == [c.id for c in children]
+    assert all(row[2] == "m" for row in embeddings)
+
+
+async def test_failed_copy_rolls_back_the_batch():
+    conn = _Connection(fail_on="chunk_embeddings")
+    parents, children = _rows()
+    with pytest.raises(RuntimeError):
+        await bulk_writer.write_chunks(
+            conn, parents, children, embeddings=[[0.0]] * 3, model_name="m"
+        )
+    assert conn.log[-1] == "rollback"
+
+
+async def test_chunks_without_embeddings():
+    conn = _Connection()
+    parents, children = _rows()
+    await bulk_writer.write_chunks(conn, parents, children)
+    assert [entry[0] for entry in conn.log[1:-1]] == ["parent_chunks", "child_chunks"]
@@ -0,0 +1,83 @@
+import pytest
+
+from app.services import cache
+from app.services.cache import SizedLRUCache, TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_ttl_cache_expires_entries(clock):
+    c = TTLCache(max_entries=10, ttl_seconds=5)
+    c.set("a", 1)
+    assert c.get("a") == 1
+    clock[0] += 5
+    assert c.get("a") is None
+    assert len(c) == 0
+    assert (c.hits, c.misses) == (1, 1)
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    c = TTLCache(max_entries=2, ttl_seconds=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert (c.get("a"), c.get("c")) == (1, 3)
+    assert c.evictions == 1
+
+
+def test_ttl_cache_disabled_and_discard(clock):
+    disabled = TTLCache(max_entries=0, ttl_seconds=60)
+    disabled.set("a", 1)
+    assert disabled.get("a") is None
+
+    c = TTLCache(max_entries=5, ttl_seconds=60)
+    c.set("a", 1)
+    c.discard("a")
+    c.discard("missing")
+    assert c.get("a") is None
+
+
+def _sized(max_bytes, evicted=None):
+    return SizedLRUCache(
+        max_bytes=max_bytes,
+        size_of=lambda key, value: len(value),
+        on_evict=(lambda key, value: evicted.append(key)) if evicted is not None else None,
+    )
+
+
+def test_sized_cache_evicts_by_total_size():
+    evicted = []
+    c = _sized(10, evicted)
+    c.set("a", "xxxx")
+    c.set("b", "xxxx")
+    c.get("a")
+    c.set("c", "xxxx")
+    assert evicted == ["b"]
+    assert c.current_bytes == 8
+    assert c.get("b") is None and c.get("a") == "xxxx"
+
+
+def test_sized_cache_replaces_and_discards():
+    c = _sized(10)
+    c.set("a", "xxxx")
+    c.set("a", "xx")
+    assert c.current_bytes == 2
+    c.discard("a")
+    assert c.current_bytes == 0 and len(c) == 0
+    c.set("b", "x")
+    c.clear()
+    assert c.current_bytes == 0 and c.get("b") is None
+
+
+def test_sized_cache_skips_entries_larger_than_budget():
+    c = _sized(3)
+    assert c.set("big", "xxxx") is False
+    assert c.get("big") is None
+    assert c.current_bytes == 0
@@ -0,0 +1,38 @@
+import uuid
+
+from app.services.chunk_cache import CachedDocument, CachedParent, ChunkCache
+
+
+def _parent(document_id, text="x" * 100):
+    return CachedParent(document_id=document_id, char_start=0, page_start=1, page_end=1, text=text)
+
+
+def test_rejected_parent_is_not_indexed():
+    c = ChunkCache(max_bytes=1000)
+    document_id, parent_id = uuid.uuid4(), uuid.uuid4()
+    c.put_parent(parent_id, _parent(document_id, "x" * 5000))
+    assert c.get_parents([parent_id]) == {}
+    assert c.stats()["documents_indexed"] == 0
+
+
+def test_evicted_parent_is_unindexed():
+    c = ChunkCache(max_bytes=800)
+    document_id = uuid.uuid4()
+    for _ in range(5):
+        c.put_parent(uuid.uuid4(), _parent(document_id))
+    assert 0 < c.stats()["entries"] < 5
+    c.invalidate_document(document_id)
+    assert c.stats()["entries"] == 0
+    assert c.stats()["documents_indexed"] == 0
+
+
+def test_invalidate_document_drops_its_entries_only():
+    c = ChunkCache(max_bytes=10_000)
+    gone, kept = uuid.uuid4(), uuid.uuid4()
+    gone_parent, kept_parent = uuid.uuid4(), uuid.uuid4()
+    c.put_parent(gone_parent, _parent(gone))
+    c.put_parent(kept_parent, _parent(kept))
+    c.put_document(gone, CachedDocument("a.txt", "text/plain", "default"))
+    c.invalidate_document(gone)
+    assert c.get_parents([gone_parent, kept_parent]).keys() == {kept_parent}
+    assert c.get_documents([gone]) == {}
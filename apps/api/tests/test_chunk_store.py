@@ -0,0 +1,88 @@
+import pytest
+
+from app.services import chunk_store
+
+
+class _Store:
+    """chunk_contents as a set of hashes, with the state of the open session."""
+
+    def __init__(self, stored):
+        self.stored = set(stored)
+        self.in_transaction = False
+        self.lock_reads = 0
+        self.inserted = []
+        self.on_lock = None
+
+    def session(self):
+        store = self
+
+        class _Session:
+            async def __aenter__(self):
+                store.in_transaction = True
+                return self
+
+            async def __aexit__(self, *exc):
+                store.in_transaction = False
+                return False
+
+            async def scalars(self, stmt):
+                if stmt._for_update_arg is not None:
+                    store.lock_reads += 1
+                    if store.on_lock is not None:
+                        store.on_lock()
+                return list(store.stored)
+
+            async def commit(self):
+                pass
+
+            async def rollback(self):
+                pass
+
+        return _Session()
+
+
+@pytest.fixture
+def store(monkeypatch):
+    s = _Store({"a"})
+    embedded = []
+
+    async def embed_texts(texts):
+        assert not s.in_transaction, "inference must not run inside a transaction"
+        embedded.extend(texts)
+        return [[float(len(t))] for t in texts]
+
+    async def insert_contents(session, texts, missing, vectors):
+        s.inserted.extend(missing)
+        s.stored.update(missing)
+
+    monkeypatch.setattr(chunk_store, "async_session", s.session)
+    monkeypatch.setattr(chunk_store, "embed_texts", embed_texts)
+    monkeypatch.setattr(chunk_store, "_insert_contents", insert_contents)
+    s.embedded = embedded
+    return s
+
+
+async def test_only_new_texts_are_embedded_and_stored(store):
+    stats = await chunk_store.store_contents({"a": "known", "b": "new", "c": "other"})
+    assert sorted(store.embedded) == ["new", "other"]
+    assert sorted(store.inserted) == ["b", "c"]
+    assert (stats.total, stats.hits, stats.misses) == (3, 1, 2)
+
+
+async def test_nothing_is_written_when_every_text_is_stored(store):
+    stats = await chunk_store.store_contents({"a": "known"})
+    assert store.embedded == [] and store.inserted == []
+    assert stats.hits == 1
+
+
+async def test_contents_collected_meanwhile_are_embedded_again(store):
+    # remove_unreferenced deletes "a" between the first check and the locked one.
+    def collect():
+        store.stored.discard("a")
+        store.on_lock = None
+
+    store.on_lock = collect
+    await chunk_store.store_contents({"a": "known", "b": "new"})
+    assert sorted(store.embedded) == ["known", "new"]
+    assert sorted(store.inserted) == ["a", "b"]
+    assert store.lock_reads == 2
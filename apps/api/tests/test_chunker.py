@@ -0,0 +1,52 @@
+import random
+from typing import AsyncIterator, List, Sequence, Tuple
+
+import pytest
+
+from app.services.chunker import iter_chunks, simple_chunk
+
+_WORDS = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu".split()
+
+
+async def _stream(pieces: Sequence[Tuple[int, str]]) -> AsyncIterator[Tuple[int, str]]:
+    for piece in pieces:
+        yield piece
+
+
+async def _collect(chunks) -> List:
+    return [chunk async for chunk in chunks]
+
+
+def _pages(seed: int, count: int) -> List[Tuple[int, str]]:
+    rng = random.Random(seed)
+    return [
+        (page_no, " ".join(rng.choice(_WORDS) for _ in range(rng.randint(0, 400))))
+        for page_no in range(1, count + 1)
+    ]
+
+
+@pytest.mark.parametrize("max_chars,overlap_chars", [(200, 20), (1000, 100), (64, 0), (50, 49)])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+async def test_iter_chunks_matches_simple_chunk(seed, max_chars, overlap_chars):
+    pages = _pages(seed, 12)
+    expected = simple_chunk(pages, max_chars=max_chars, overlap_chars=overlap_chars)
+    streamed = await _collect(
+        iter_chunks(_stream(pages), max_chars=max_chars, overlap_chars=overlap_chars)
+    )
+    assert streamed == expected
+
+
+async def test_iter_chunks_joins_pieces_of_one_page():
+    pages = _pages(3, 6)
+    pieces = []
+    for page_no, text in pages:
+        cut = len(text) // 3
+        pieces += [(page_no, text[:cut]), (page_no, text[cut:])]
+    expected = simple_chunk(pages, max_chars=300, overlap_chars=30)
+    streamed = await _collect(iter_chunks(_stream(pieces), max_chars=300, overlap_chars=30))
+    assert streamed == expected
+
+
+async def test_iter_chunks_empty_input():
+    assert await _collect(iter_chunks(_stream([]))) == []
+    assert await _collect(iter_chunks(_stream([(1, "   ")]))) == simple_chunk([(1, "   ")])
@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+from uuid import uuid4
+
+from app.services.generator import CitationTracker
+
+
+def _chunks(n):
+    return [
+        SimpleNamespace(
+            chunk_id=uuid4(),
+            document_id=uuid4(),
+            filename=f"doc{i}.pdf",
+            page_start=i,
+            page_end=i,
+            text=f"text of chunk {i}",
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def _feed_all(tracker, tokens):
+    cited = []
+    for token in tokens:
+        cited += [idx for idx, _ in tracker.feed(token)]
+    return cited
+
+
+def test_markers_split_across_tokens():
+    chunks = _chunks(3)
+    tracker = CitationTracker(chunks)
+    cited = _feed_all(tracker, ["The answer", " is here [", "P", "2", "] and [P", "1]."])
+    assert cited == [2, 1]
+    assert tracker.text == "The answer is here [P2] and [P1]."
+    assert [c.chunk_id for c in tracker.final_citations()] == [
+        chunks[0].chunk_id,
+        chunks[1].chunk_id,
+    ]
+
+
+def test_repeated_and_unknown_markers():
+    tracker = CitationTracker(_chunks(2))
+    cited = _feed_all(tracker, ["[P1] again [P1], ", "bogus [P7] [P0] [x] ", "[P2]"])
+    assert cited == [1, 2]
+
+
+def test_citation_fields():
+    chunks = _chunks(1)
+    tracker = CitationTracker(chunks)
+    [(idx, citation)] = tracker.feed("[P1]")
+    assert idx == 1
+    assert citation.document_id == chunks[0].document_id
+    assert citation.filename == "doc1.pdf"
+    assert (citation.page_start, citation.page_end) == (1, 1)
+    assert citation.excerpt == "text of chunk 1"
+
+
+def test_final_citations_fall_back_to_top_chunk():
+    chunks = _chunks(2)
+    tracker = CitationTracker(chunks)
+    _feed_all(tracker, ["No markers at all."])
+    assert [c.chunk_id for c in tracker.final_citations()] == [chunks[0].chunk_id]
+    assert CitationTracker([]).final_citations() == []
@@ -0,0 +1,57 @@
+import random
+import sqlite3
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import sqlite
+
+from app.db import models
+from app.services.hydration import _slice_window, _sql_window
+
+
+@pytest.fixture
+def db():
+    # SQLite stands in for Postgres: same arithmetic, with the missing functions added.
+    conn = sqlite3.connect(":memory:")
+    conn.create_function("greatest", -1, max)
+    conn.create_function("least", -1, min)
+    conn.create_function("char_length", 1, len)
+    conn.execute("CREATE TABLE parent_chunks (id TEXT, char_start INTEGER, text TEXT)")
+    conn.execute(
+        "CREATE TABLE child_chunks (id TEXT, parent_id TEXT, char_start INTEGER, char_end INTEGER)"
+    )
+    yield conn
+    conn.close()
+
+
+def _sql_slice(db, window_chars, parent_start, text, child_start, child_end):
+    db.execute("DELETE FROM parent_chunks")
+    db.execute("DELETE FROM child_chunks")
+    db.execute("INSERT INTO parent_chunks VALUES ('p', ?, ?)", (parent_start, text))
+    db.execute("INSERT INTO child_chunks VALUES ('c', 'p', ?, ?)", (child_start, child_end))
+    child, parent = models.ChildChunk, models.ParentChunk
+    stmt = select(_sql_window(window_chars)).select_from(
+        child.__table__.join(parent.__table__, child.parent_id == parent.id)
+    )
+    compiled = stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+    return db.execute(str(compiled)).fetchone()[0]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_sql_window_matches_python_window(db, seed):
+    rng = random.Random(seed)
+    text = "".join(rng.choice("abc def\n") for _ in range(rng.randint(0, 3000)))
+    parent_start = rng.choice([None, rng.randint(0, 10_000)])
+    base = parent_start or 0
+    child_start = rng.choice([None, base + rng.randint(-50, len(text) + 50)])
+    child_end = rng.choice([None, (child_start or base) + rng.randint(-20, 1200)])
+    window_chars = rng.choice([1, 2, 100, 1500, 5000])
+
+    expected = _slice_window(
+        text,
+        rel_start=(child_start or 0) - base,
+        rel_end=(child_end or 0) - base,
+        window_chars=window_chars,
+    )
+    got = _sql_slice(db, window_chars, parent_start, text, child_start, child_end)
+    assert (got or "").strip() == expected
@@ -0,0 +1,93 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import ingestion
+
+
+async def _noop():
+    pass
+
+
+class _Result:
+    def __init__(self, rows=(), rowcount=0):
+        self._rows = list(rows)
+        self.rowcount = rowcount
+
+    def all(self):
+        return self._rows
+
+
+class _Session:
+    def __init__(self, children, *, commit_fails=False):
+        self.children = children
+        self.commit_fails = commit_fails
+        self.committed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get(self, model, key):
+        return SimpleNamespace(id=key, s3_bucket="b", s3_key="k")
+
+    async def execute(self, stmt):
+        if stmt.table.name == "child_chunks":
+            return _Result(self.children)
+        return _Result(rowcount=1)
+
+    async def commit(self):
+        if self.commit_fails:
+            raise RuntimeError("commit failed")
+        self.committed = True
+
+
+@pytest.fixture
+def mmap(monkeypatch):
+    removed = []
+
+    async def remove(ids):
+        removed.extend(ids)
+
+    async def delete_document_chunks(document_id):
+        pass
+
+    monkeypatch.setattr(ingestion.settings, "vector_backend", "mmap")
+    monkeypatch.setattr(ingestion.settings, "chunk_store", "per_document")
+    monkeypatch.setattr(ingestion.vector_store_mmap, "remove", remove)
+    monkeypatch.setattr(ingestion, "delete_document_chunks", delete_document_chunks)
+    monkeypatch.setattr(ingestion, "_bump_corpus_generation", _noop)
+    s3 = SimpleNamespace(delete_object=lambda **kwargs: None)
+    monkeypatch.setattr(ingestion, "_get_s3_client", lambda: s3)
+    return removed
+
+
+def _children(count):
+    return [SimpleNamespace(id=uuid.uuid4(), chunk_hash="h") for _ in range(count)]
+
+
+async def test_purge_leaves_the_mmap_store_to_the_caller(mmap):
+    children = _children(3)
+    purged = await ingestion._purge_document_chunks(_Session(children), uuid.uuid4())
+    assert mmap == []
+    assert purged.parents == 1
+    assert purged.child_ids == [c.id for c in children]
+
+
+async def test_delete_tombstones_vectors_after_the_commit(mmap, monkeypatch):
+    children = _children(2)
+    monkeypatch.setattr(ingestion, "async_session", lambda: _Session(children))
+    assert await ingestion.delete_document(uuid.uuid4())
+    assert mmap == [c.id for c in children]
+
+
+async def test_failed_commit_keeps_vectors_searchable(mmap, monkeypatch):
+    monkeypatch.setattr(
+        ingestion, "async_session", lambda: _Session(_children(2), commit_fails=True)
+    )
+    with pytest.raises(RuntimeError):
+        await ingestion.delete_document(uuid.uuid4())
+    assert mmap == []
@@ -0,0 +1,136 @@
+import contextlib
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.db import models
+from app.services import job_queue
+
+
+@pytest.fixture
+def retry_settings(monkeypatch):
+    monkeypatch.setattr(job_queue.settings, "ingestion_retry_base_seconds", 10.0)
+    monkeypatch.setattr(job_queue.settings, "ingestion_retry_max_seconds", 100.0)
+
+
+@pytest.mark.parametrize(
+    "attempts,low,high",
+    [(1, 5, 10), (2, 10, 20), (3, 20, 40), (4, 40, 80), (5, 50, 100), (12, 50, 100)],
+)
+def test_backoff_is_exponential_with_jitter_and_capped(retry_settings, attempts, low, high):
+    delays = [job_queue._backoff_seconds(attempts) for _ in range(200)]
+    assert all(low <= d <= high for d in delays)
+    assert len(set(delays)) > 1
+
+
+def _sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_runnable_jobs_skip_locked_smallest_first():
+    sql = _sql(job_queue._runnable_jobs())
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "ORDER BY ingestion_jobs.priority ASC, ingestion_jobs.created_at ASC" in sql
+
+
+def test_finishing_a_job_requires_the_same_claim():
+    job = job_queue.ClaimedJob(
+        id=uuid4(), document_id=uuid4(), attempts=2, max_attempts=5, worker_id="host:1"
+    )
+    sql = _sql(
+        models.IngestionJob.__table__.update().where(*job_queue._still_claimed(job))
+    )
+    for column in ("id", "status", "locked_by", "attempts"):
+        assert f"ingestion_jobs.{column} = " in sql
+
+
+def _job(batch_id=None, priority=0):
+    return SimpleNamespace(
+        id=uuid4(),
+        document_id=uuid4(),
+        status=models.JobStatus.queued.value,
+        attempts=0,
+        max_attempts=5,
+        priority=priority,
+        batch_id=batch_id,
+        locked_by=None,
+        locked_at=None,
+    )
+
+
+class _FakeSession:
+    def __init__(self, first, batch):
+        self.first = first
+        self.batch = batch
+        self.batch_queries = []
+
+    def begin(self):
+        return contextlib.nullcontext()
+
+    async def scalar(self, query):
+        return self.first
+
+    async def scalars(self, query):
+        self.batch_queries.append(query)
+        limit = query._limit_clause.value
+        return SimpleNamespace(all=lambda: self.batch[:limit])
+
+
+@pytest.fixture
+def fake_session(monkeypatch):
+    holder = {}
+
+    def install(first, batch=()):
+        holder["session"] = _FakeSession(first, list(batch))
+
+        @contextlib.asynccontextmanager
+        async def async_session():
+            yield holder["session"]
+
+        monkeypatch.setattr(job_queue, "async_session", async_session)
+        return holder["session"]
+
+    return install
+
+
+async def test_claim_returns_nothing_when_queue_is_empty(fake_session):
+    fake_session(None)
+    assert await job_queue.claim_next_jobs("w", limit=4) == []
+
+
+async def test_claim_single_job(fake_session):
+    job = _job(priority=123)
+    session = fake_session(job, [_job()])
+    [claimed] = await job_queue.claim_next_jobs("host:1", limit=4)
+
+    assert session.batch_queries == []  # not part of a batch
+    assert claimed == job_queue.ClaimedJob(
+        id=job.id,
+        document_id=job.document_id,
+        attempts=1,
+        max_attempts=5,
+        size_bytes=123,
+        worker_id="host:1",
+    )
+    assert job.status == models.JobStatus.running.value
+    assert job.locked_by == "host:1"
+
+
+async def test_claim_takes_more_jobs_of_the_same_batch(fake_session):
+    batch_id = uuid4()
+    first = _job(batch_id)
+    others = [_job(batch_id) for _ in range(5)]
+    session = fake_session(first, others)
+
+    claimed = await job_queue.claim_next_jobs("w", limit=3)
+
+    assert [c.id for c in claimed] == [first.id, others[0].id, others[1].id]
+    assert all(c.attempts == 1 for c in claimed)
+    assert all(j.status == models.JobStatus.running.value for j in [first, *others[:2]])
+    assert others[2].status == models.JobStatus.queued.value
+    assert "ingestion_jobs.batch_id = " in _sql(session.batch_queries[0])
+
+    fake_session(_job(uuid4()), others)
+    assert len(await job_queue.claim_next_jobs("w", limit=1)) == 1
@@ -0,0 +1,70 @@
+import uuid
+
+import numpy as np
+import pytest
+
+from app.services import reranker
+
+
+class _Session:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        rows = self.rows
+
+        class _Result:
+            def all(self):
+                return rows
+
+        return _Result()
+
+
+@pytest.fixture
+def encoded(monkeypatch):
+    texts = []
+
+    async def embed_query(text):
+        return [1.0, 0.0]
+
+    async def embed_texts(batch):
+        texts.extend(batch)
+        return [np.array([0.0, 1.0], dtype=np.float32) for _ in batch]
+
+    monkeypatch.setattr(reranker, "embed_query", embed_query)
+    monkeypatch.setattr(reranker, "embed_texts", embed_texts)
+    monkeypatch.setattr(reranker.settings, "chunk_store", "per_document")
+    return texts
+
+
+async def test_bi_encoder_scores_use_stored_embeddings(encoded, monkeypatch):
+    stored, unstored = uuid.uuid4(), uuid.uuid4()
+    session = _Session([(stored, np.array([2.0, 0.0], dtype=np.float32))])
+    monkeypatch.setattr(reranker, "async_session", lambda: session)
+
+    scores = await reranker._bi_encoder_scores(
+        "q", [str(stored), str(unstored), "not-a-uuid"], ["a", "b", "c"], ["ha", "hb", "hc"]
+    )
+    assert scores == pytest.approx([1.0, 0.0, 0.0])
+    # Only candidates without a stored vector reach the model.
+    assert encoded == ["b", "c"]
+    assert "chunk_embeddings" in str(session.statements[0])
+
+
+async def test_content_addressed_store_is_read_by_hash(encoded, monkeypatch):
+    monkeypatch.setattr(reranker.settings, "chunk_store", "content_addressed")
+    session = _Session([("ha", np.array([1.0, 1.0], dtype=np.float32))])
+    monkeypatch.setattr(reranker, "async_session", lambda: session)
+
+    scores = await reranker._bi_encoder_scores("q", ["x", "y"], ["a", "b"], ["ha", "hb"])
+    assert scores == pytest.approx([2 ** -0.5, 0.0])
+    assert encoded == ["b"]
+    assert "chunk_contents" in str(session.statements[0])
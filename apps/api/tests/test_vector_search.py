@@ -0,0 +1,82 @@
+import uuid
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services import vector_search
+
+_KEYS = [uuid.uuid4() for _ in range(5)]
+
+
+class _Result:
+    def scalars(self):
+        return self
+
+    def all(self):
+        return list(_KEYS)
+
+
+class _Session:
+    def __init__(self):
+        self.settings = {}
+        self.query = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, params=None):
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        if "set_config" in sql:
+            literals = sql.split("'")[1::2]
+            self.settings[literals[0]] = params["v"] if params else literals[1]
+        else:
+            self.query = sql
+        return _Result()
+
+
+@pytest.fixture
+def session(monkeypatch):
+    s = _Session()
+    monkeypatch.setattr(vector_search, "async_session", lambda: s)
+    monkeypatch.setattr(vector_search.settings, "vector_backend", "pgvector")
+    monkeypatch.setattr(vector_search.settings, "vector_index_type", "hnsw")
+    monkeypatch.setattr(vector_search.settings, "vector_index_quantization", "none")
+    return s
+
+
+async def _search(document_ids=None):
+    return await vector_search.vector_search_child_chunks(
+        query_embedding=[0.1] * vector_search.settings.embedding_dim,
+        limit=len(_KEYS),
+        document_ids=document_ids,
+    )
+
+
+async def test_filtered_search_scans_the_index_iteratively(session, monkeypatch):
+    monkeypatch.setattr(vector_search.settings, "vector_iterative_scan", "relaxed_order")
+    found = await _search([uuid.uuid4()])
+    assert found == [str(k) for k in _KEYS]
+    assert session.settings["hnsw.iterative_scan"] == "relaxed_order"
+    assert "enable_indexscan" not in session.settings
+    # Relaxed order: the rows are re-sorted by exact distance outside the index scan.
+    assert session.query.count("ORDER BY") == 2
+    assert session.query.count("LIMIT") == 2
+
+
+async def test_filtered_search_without_iterative_scan_is_exact(session, monkeypatch):
+    monkeypatch.setattr(vector_search.settings, "vector_iterative_scan", "")
+    await _search([uuid.uuid4()])
+    assert session.settings["enable_indexscan"] == "off"
+    assert "hnsw.iterative_scan" not in session.settings
+
+
+async def test_unfiltered_search_uses_the_index(session, monkeypatch):
+    monkeypatch.setattr(vector_search.settings, "vector_iterative_scan", "relaxed_order")
+    await _search()
+    assert int(session.settings["hnsw.ef_search"]) >= len(_KEYS)
+    assert "hnsw.iterative_scan" not in session.settings
+    assert "enable_indexscan" not in session.settings
+    assert session.query.count("ORDER BY") == 1
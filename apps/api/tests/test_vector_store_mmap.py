@@ -0,0 +1,144 @@
+import contextlib
+import os
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from app.services import vector_store_mmap
+from app.services.vector_store_mmap import MmapVectorStore
+
+DIM = 16
+
+
+def _vectors(rng, n):
+    return rng.normal(size=(n, DIM)).astype(np.float32)
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.mark.parametrize("storage", vector_store_mmap.STORAGE_FORMATS)
+def test_search_ranks_nearest_first(tmp_path, rng, storage):
+    store = MmapVectorStore(str(tmp_path), DIM, storage)
+    ids = [uuid4() for _ in range(200)]
+    vectors = _vectors(rng, 200)
+    store.append(ids, [uuid4()] * 200, vectors)
+
+    query = vectors[17] + 0.01 * rng.normal(size=DIM)
+    assert store.search(query, 5)[0] == str(ids[17])
+    assert len(store.search(query, 5)) == 5
+    assert store.search(query, 0) == []
+
+
+def test_search_filters_by_document(tmp_path, rng):
+    store = MmapVectorStore(str(tmp_path), DIM, "float32")
+    doc_a, doc_b = uuid4(), uuid4()
+    ids = [uuid4() for _ in range(20)]
+    store.append(ids, [doc_a] * 10 + [doc_b] * 10, _vectors(rng, 20))
+
+    found = store.search(rng.normal(size=DIM), 20, document_ids=[doc_b])
+    assert set(found) == {str(i) for i in ids[10:]}
+    assert store.search(rng.normal(size=DIM), 5, document_ids=[uuid4()]) == []
+
+
+@pytest.mark.parametrize("storage", ["float16", "binary"])
+def test_tombstones_never_shorten_results(tmp_path, rng, storage):
+    store = MmapVectorStore(str(tmp_path), DIM, storage)
+    doc = uuid4()
+    query = rng.normal(size=DIM)
+    # 50 near-duplicates of the query outrank everything else, then get deleted.
+    near = [uuid4() for _ in range(50)]
+    far = [uuid4() for _ in range(50)]
+    store.append(near, [doc] * 50, query + 0.01 * _vectors(rng, 50))
+    store.append(far, [doc] * 50, _vectors(rng, 50))
+    store.remove(near)
+
+    deleted = {str(i) for i in near}
+    for document_ids in (None, [doc]):
+        found = store.search(query, 10, document_ids=document_ids)
+        assert len(found) == 10
+        assert not deleted & set(found)
+    assert store.stats()["tombstones"] == 50
+
+
+def test_other_processes_see_appends_and_removals(tmp_path, rng):
+    writer = MmapVectorStore(str(tmp_path), DIM, "float16")
+    reader = MmapVectorStore(str(tmp_path), DIM, "float16")
+    assert reader.search(rng.normal(size=DIM), 5) == []
+
+    ids = [uuid4() for _ in range(3)]
+    vectors = _vectors(rng, 3)
+    writer.append(ids, [uuid4()] * 3, vectors)
+    assert reader.search(vectors[0], 1) == [str(ids[0])]
+
+    writer.remove([ids[0]])
+    assert str(ids[0]) not in reader.search(vectors[0], 3)
+
+
+def test_reassign_moves_rows_to_another_document(tmp_path, rng):
+    store = MmapVectorStore(str(tmp_path), DIM, "float32")
+    old_doc, new_doc = uuid4(), uuid4()
+    ids = [uuid4() for _ in range(4)]
+    store.append(ids, [old_doc] * 4, _vectors(rng, 4))
+
+    assert store.reassign(ids[:2], new_doc) == 2
+    found = store.search(rng.normal(size=DIM), 4, document_ids=[new_doc])
+    assert set(found) == {str(i) for i in ids[:2]}
+
+
+def test_mixed_formats_are_refused(tmp_path, rng):
+    MmapVectorStore(str(tmp_path), DIM, "float16").append([uuid4()], [uuid4()], _vectors(rng, 1))
+    with pytest.raises(RuntimeError, match="rebuild"):
+        MmapVectorStore(str(tmp_path), DIM, "int8").append([uuid4()], [uuid4()], _vectors(rng, 1))
+
+
+async def test_rebuild_switches_generation(tmp_path, rng, monkeypatch):
+    store = MmapVectorStore(str(tmp_path), DIM, "int8")
+    reader = MmapVectorStore(str(tmp_path), DIM, "int8")
+    doc = uuid4()
+    ids = [uuid4() for _ in range(30)]
+    vectors = _vectors(rng, 30)
+    store.append(ids, [doc] * 30, vectors)
+    store.remove(ids[:10])
+    assert reader.search(vectors[20], 1) == [str(ids[20])]
+
+    # What chunk_embeddings holds: the live rows.
+    rows = [(ids[i], doc, vectors[i]) for i in range(10, 30)]
+
+    class Result:
+        async def partitions(self, size):
+            for i in range(0, len(rows), size):
+                yield rows[i : i + size]
+
+    class Session:
+        async def stream(self, stmt):
+            return Result()
+
+    @contextlib.asynccontextmanager
+    async def session():
+        yield Session()
+
+    monkeypatch.setattr(vector_store_mmap, "async_session", session)
+
+    generations = []
+    for _ in range(3):
+        assert await store.rebuild_from_db(batch_size=7) == 20
+        generations.append(os.readlink(tmp_path / "current"))
+        assert reader.search(vectors[20], 1) == [str(ids[20])]
+        assert reader.stats()["rows"] == 20
+        assert reader.stats()["tombstones"] == 0
+
+    # The previous generation is kept for readers that resolved it; older ones go.
+    kept = sorted(p.name for p in tmp_path.iterdir() if p.name.startswith("gen-"))
+    assert kept == sorted(generations[-2:])
+    assert not (tmp_path / "vectors.bin").exists()
+
+    # Appends and removals land in the current generation.
+    new_id = uuid4()
+    store.append([new_id], [doc], vectors[:1])
+    assert str(new_id) in reader.search(vectors[0], 2)
+    store.remove([new_id])
+    assert str(new_id) not in reader.search(vectors[0], 2)
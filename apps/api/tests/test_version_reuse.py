@@ -0,0 +1,58 @@
+from collections import deque
+from uuid import uuid4
+
+from app.services.chunker import ChunkData
+from app.services.ingestion import _VersionReuse
+
+
+def _parent(chunk_hash, char_start, pages=(1, 1)):
+    return ChunkData(
+        text="",
+        page_start=pages[0],
+        page_end=pages[1],
+        char_start=char_start,
+        char_end=char_start + 100,
+        chunk_hash=chunk_hash,
+    )
+
+
+def test_claim_moves_matching_parents_with_offset_shift():
+    old_a, old_b = uuid4(), uuid4()
+    reuse = _VersionReuse(
+        previous_id=uuid4(),
+        available={"a": deque([(old_a, 0)]), "b": deque([(old_b, 500)])},
+    )
+    new_b = uuid4()
+    assert reuse.claim(new_b, _parent("b", 650, pages=(3, 4)))
+    assert reuse.moves == [(old_b, new_b, 150, 3, 4)]
+
+
+def test_claim_unknown_or_exhausted_hash():
+    old = uuid4()
+    reuse = _VersionReuse(previous_id=uuid4(), available={"a": deque([(old, 10)])})
+    assert not reuse.claim(uuid4(), _parent("zzz", 0))
+    assert reuse.claim(uuid4(), _parent("a", 10))
+    # Each old parent is reused at most once.
+    assert not reuse.claim(uuid4(), _parent("a", 900))
+    assert len(reuse.moves) == 1
+
+
+def test_claim_repeated_text_in_document_order():
+    first, second = uuid4(), uuid4()
+    reuse = _VersionReuse(
+        previous_id=uuid4(), available={"dup": deque([(first, 0), (second, 4000)])}
+    )
+    new_first, new_second = uuid4(), uuid4()
+    assert reuse.claim(new_first, _parent("dup", 100))
+    assert reuse.claim(new_second, _parent("dup", 4100))
+    assert [(m[0], m[1], m[2]) for m in reuse.moves] == [
+        (first, new_first, 100),
+        (second, new_second, 100),
+    ]
+
+
+def test_claim_without_old_offset():
+    old = uuid4()
+    reuse = _VersionReuse(previous_id=uuid4(), available={"a": deque([(old, None)])})
+    assert reuse.claim(uuid4(), _parent("a", 42))
+    assert reuse.moves[0][2] == 42
@@ -0,0 +1,69 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app import worker
+from app.services.job_queue import ClaimedJob
+
+
+@pytest.fixture
+def job(monkeypatch):
+    monkeypatch.setattr(worker.settings, "ingestion_job_lease_seconds", 3)
+    return ClaimedJob(
+        id=uuid.uuid4(), document_id=uuid.uuid4(), attempts=1, max_attempts=5, worker_id="w"
+    )
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    calls = []
+
+    async def mark_succeeded(job):
+        calls.append("succeeded")
+
+    async def mark_failed(job, *, error):
+        calls.append("failed")
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(worker.job_queue, "mark_succeeded", mark_succeeded)
+    monkeypatch.setattr(worker.job_queue, "mark_failed", mark_failed)
+    return calls
+
+
+async def test_lost_lease_cancels_the_ingestion(job, recorded, monkeypatch):
+    stopped = asyncio.Event()
+
+    async def ingest_document(document_id):
+        try:
+            await asyncio.sleep(60)
+        finally:
+            stopped.set()
+
+    async def renew_lease(job):
+        return False
+
+    monkeypatch.setattr(worker, "ingest_document", ingest_document)
+    monkeypatch.setattr(worker.job_queue, "renew_lease", renew_lease)
+    await asyncio.wait_for(worker._run_job(job), timeout=5)
+    assert stopped.is_set()
+    assert recorded == []
+
+
+async def test_failure_to_record_an_outcome_is_logged(job, recorded, monkeypatch, caplog):
+    async def ingest_document(document_id):
+        raise ValueError("unparseable")
+
+    monkeypatch.setattr(worker, "ingest_document", ingest_document)
+    await worker._run_job(job)
+    assert recorded == ["failed"]
+    assert "Failed to record the outcome" in caplog.text
+
+
+async def test_successful_job_is_recorded(job, recorded, monkeypatch):
+    async def ingest_document(document_id):
+        return None
+
+    monkeypatch.setattr(worker, "ingest_document", ingest_document)
+    await worker._run_job(job)
+    assert recorded == ["succeeded"]